@@ -0,0 +1,171 @@
+"""initial schema
+
+Схема совпадает с той, что создавал Base.metadata.create_all до перехода
+на Alembic. Такую базу не создавать заново, а отметить ревизией:
+
+    alembic stamp 0001
+    alembic upgrade head
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('telegram_id', sa.Integer(), nullable=True),
+        sa.Column('username', sa.String(length=255), nullable=True),
+        sa.Column('first_name', sa.String(length=255), nullable=True),
+        sa.Column('last_name', sa.String(length=255), nullable=True),
+        sa.Column('gender', sa.String(length=10), nullable=True),
+        sa.Column('age', sa.Integer(), nullable=True),
+        sa.Column('height', sa.Float(), nullable=True),
+        sa.Column('weight', sa.Float(), nullable=True),
+        sa.Column('target_weight', sa.Float(), nullable=True),
+        sa.Column('goal', sa.Enum('WEIGHT_LOSS', 'MUSCLE_GAIN', 'MAINTAIN', 'TONE', name='goal'), nullable=True),
+        sa.Column('activity_level', sa.Enum('SEDENTARY', 'LIGHT', 'MODERATE', 'ACTIVE', 'VERY_ACTIVE', name='activitylevel'), nullable=True),
+        sa.Column('dietary_restrictions', sa.JSON(), nullable=True),
+        sa.Column('allergies', sa.JSON(), nullable=True),
+        sa.Column('budget', sa.String(length=20), nullable=True),
+        sa.Column('preferred_cuisines', sa.JSON(), nullable=True),
+        sa.Column('meals_per_day', sa.Integer(), nullable=True),
+        sa.Column('excluded_foods', sa.JSON(), nullable=True),
+        sa.Column('bmr', sa.Float(), nullable=True),
+        sa.Column('tdee', sa.Float(), nullable=True),
+        sa.Column('daily_calories', sa.Integer(), nullable=True),
+        sa.Column('daily_protein', sa.Integer(), nullable=True),
+        sa.Column('daily_carbs', sa.Integer(), nullable=True),
+        sa.Column('daily_fats', sa.Integer(), nullable=True),
+        sa.Column('status', sa.Enum('TRIAL', 'ACTIVE', 'EXPIRED', 'CANCELLED', name='userstatus'), nullable=True),
+        sa.Column('trial_start', sa.DateTime(), nullable=True),
+        sa.Column('subscription_start', sa.DateTime(), nullable=True),
+        sa.Column('subscription_end', sa.DateTime(), nullable=True),
+        sa.Column('subscription_type', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('last_activity', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_telegram_id'), 'users', ['telegram_id'], unique=True)
+
+    op.create_table(
+        'meal_plans',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('week_number', sa.Integer(), nullable=True),
+        sa.Column('day_number', sa.Integer(), nullable=True),
+        sa.Column('breakfast', sa.JSON(), nullable=True),
+        sa.Column('lunch', sa.JSON(), nullable=True),
+        sa.Column('dinner', sa.JSON(), nullable=True),
+        sa.Column('snack', sa.JSON(), nullable=True),
+        sa.Column('total_calories', sa.Integer(), nullable=True),
+        sa.Column('total_protein', sa.Integer(), nullable=True),
+        sa.Column('total_carbs', sa.Integer(), nullable=True),
+        sa.Column('total_fats', sa.Integer(), nullable=True),
+        sa.Column('shopping_list', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table(
+        'workout_plans',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('week_number', sa.Integer(), nullable=True),
+        sa.Column('day_number', sa.Integer(), nullable=True),
+        sa.Column('workout_type', sa.String(length=50), nullable=True),
+        sa.Column('duration_minutes', sa.Integer(), nullable=True),
+        sa.Column('difficulty', sa.String(length=20), nullable=True),
+        sa.Column('exercises', sa.JSON(), nullable=True),
+        sa.Column('calories_burned', sa.Integer(), nullable=True),
+        sa.Column('completed', sa.Boolean(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table(
+        'daily_checkins',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('date', sa.DateTime(), nullable=True),
+        sa.Column('morning_weight', sa.Float(), nullable=True),
+        sa.Column('sleep_hours', sa.Float(), nullable=True),
+        sa.Column('mood', sa.String(length=20), nullable=True),
+        sa.Column('water_ml', sa.Integer(), nullable=True),
+        sa.Column('steps', sa.Integer(), nullable=True),
+        sa.Column('workout_completed', sa.Boolean(), nullable=True),
+        sa.Column('breakfast_photo', sa.String(length=255), nullable=True),
+        sa.Column('lunch_photo', sa.String(length=255), nullable=True),
+        sa.Column('dinner_photo', sa.String(length=255), nullable=True),
+        sa.Column('snack_photos', sa.JSON(), nullable=True),
+        sa.Column('estimated_calories', sa.Integer(), nullable=True),
+        sa.Column('adherence_score', sa.Integer(), nullable=True),
+        sa.Column('daily_notes', sa.Text(), nullable=True),
+        sa.Column('challenges', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table(
+        'weight_logs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('weight', sa.Float(), nullable=True),
+        sa.Column('date', sa.DateTime(), nullable=True),
+        sa.Column('waist_cm', sa.Float(), nullable=True),
+        sa.Column('hips_cm', sa.Float(), nullable=True),
+        sa.Column('chest_cm', sa.Float(), nullable=True),
+        sa.Column('photo_url', sa.String(length=255), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table(
+        'payments',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('amount', sa.Integer(), nullable=True),
+        sa.Column('currency', sa.String(length=3), nullable=True),
+        sa.Column('subscription_type', sa.String(length=20), nullable=True),
+        sa.Column('provider', sa.String(length=50), nullable=True),
+        sa.Column('provider_payment_id', sa.String(length=255), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('paid_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('provider_payment_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('payments')
+    op.drop_table('weight_logs')
+    op.drop_table('daily_checkins')
+    op.drop_table('workout_plans')
+    op.drop_table('meal_plans')
+    op.drop_index(op.f('ix_users_telegram_id'), table_name='users')
+    op.drop_table('users')
+    sa.Enum(name='userstatus').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='activitylevel').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='goal').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,50 @@
+"""hot query indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (имя, таблица, колонки)
+INDEXES = [
+    ('ix_daily_checkins_user_date', 'daily_checkins', ['user_id', 'date']),
+    ('ix_weight_logs_user_date', 'weight_logs', ['user_id', 'date']),
+    ('ix_meal_plans_user_active_week_day', 'meal_plans', ['user_id', 'is_active', 'week_number', 'day_number']),
+    ('ix_workout_plans_user_week_day', 'workout_plans', ['user_id', 'week_number', 'day_number']),
+    ('ix_users_status_subscription_end', 'users', ['status', 'subscription_end']),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY не блокирует запись, но не работает в транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True
+            )
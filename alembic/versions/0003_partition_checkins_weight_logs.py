@@ -0,0 +1,155 @@
+"""partition daily_checkins and weight_logs by month
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+CHECKIN_COLUMNS = [
+    'id', 'user_id', 'date', 'morning_weight', 'sleep_hours', 'mood', 'water_ml', 'steps',
+    'workout_completed', 'breakfast_photo', 'lunch_photo', 'dinner_photo', 'snack_photos',
+    'estimated_calories', 'adherence_score', 'daily_notes', 'challenges', 'created_at',
+]
+WEIGHT_LOG_COLUMNS = [
+    'id', 'user_id', 'weight', 'date', 'waist_cm', 'hips_cm', 'chest_cm', 'photo_url',
+]
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _rename_to_legacy(table: str, indexes: Sequence[str]) -> None:
+    # Имена индексов и последовательностей общие на схему - освобождаем их
+    op.execute(f'ALTER TABLE {table} RENAME TO {table}_legacy')
+    op.execute(f'ALTER INDEX {table}_pkey RENAME TO {table}_legacy_pkey')
+    op.execute(f'ALTER SEQUENCE {table}_id_seq RENAME TO {table}_legacy_id_seq')
+    for index in indexes:
+        op.execute(f'ALTER INDEX {index} RENAME TO {index}_legacy')
+
+
+def _create_partitions(table: str, key_sql: str) -> None:
+    """Партиции от первого месяца с данными до MONTHS_AHEAD вперед и DEFAULT"""
+    first = op.get_bind().execute(
+        sa.text(f'SELECT min({key_sql})::date FROM {table}_legacy')
+    ).scalar()
+    current = date.today().replace(day=1)
+    month = min(first.replace(day=1), current) if first else current
+
+    while month <= _add_months(current, MONTHS_AHEAD):
+        following = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE {table}_{month:%Y_%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+        )
+        month = following
+
+    op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+
+def _copy_from_legacy(table: str, columns: Sequence[str], key_column: str, key_sql: str) -> None:
+    """Перенос строк в партиционированную таблицу с сохранением id"""
+    target = [column for column in columns if column != key_column] + [key_column]
+    source = [column for column in columns if column != key_column] + [key_sql]
+    op.execute(
+        f'INSERT INTO {table} ({", ".join(target)}) '
+        f'SELECT {", ".join(source)} FROM {table}_legacy'
+    )
+    op.execute(
+        f"SELECT setval('{table}_id_seq', COALESCE((SELECT max(id) FROM {table}), 0) + 1, false)"
+    )
+    op.execute(f'DROP TABLE {table}_legacy')
+
+
+def upgrade() -> None:
+    # daily_checkins: новый ключ checkin_date (день чек-ина)
+    _rename_to_legacy('daily_checkins', ['ix_daily_checkins_user_date'])
+    op.create_table(
+        'daily_checkins',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('checkin_date', sa.Date(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('date', sa.DateTime(), nullable=True),
+        sa.Column('morning_weight', sa.Float(), nullable=True),
+        sa.Column('sleep_hours', sa.Float(), nullable=True),
+        sa.Column('mood', sa.String(length=20), nullable=True),
+        sa.Column('water_ml', sa.Integer(), nullable=True),
+        sa.Column('steps', sa.Integer(), nullable=True),
+        sa.Column('workout_completed', sa.Boolean(), nullable=True),
+        sa.Column('breakfast_photo', sa.String(length=255), nullable=True),
+        sa.Column('lunch_photo', sa.String(length=255), nullable=True),
+        sa.Column('dinner_photo', sa.String(length=255), nullable=True),
+        sa.Column('snack_photos', sa.JSON(), nullable=True),
+        sa.Column('estimated_calories', sa.Integer(), nullable=True),
+        sa.Column('adherence_score', sa.Integer(), nullable=True),
+        sa.Column('daily_notes', sa.Text(), nullable=True),
+        sa.Column('challenges', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id', 'checkin_date'),
+        postgresql_partition_by='RANGE (checkin_date)'
+    )
+    op.create_index('ix_daily_checkins_user_checkin_date', 'daily_checkins', ['user_id', 'checkin_date'])
+    checkin_key = 'COALESCE(date, created_at, now())::date'
+    _create_partitions('daily_checkins', checkin_key)
+    _copy_from_legacy('daily_checkins', CHECKIN_COLUMNS, 'checkin_date', checkin_key)
+
+    # weight_logs: ключ - время взвешивания
+    _rename_to_legacy('weight_logs', ['ix_weight_logs_user_date'])
+    op.create_table(
+        'weight_logs',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('weight', sa.Float(), nullable=True),
+        sa.Column('date', sa.DateTime(), nullable=False),
+        sa.Column('waist_cm', sa.Float(), nullable=True),
+        sa.Column('hips_cm', sa.Float(), nullable=True),
+        sa.Column('chest_cm', sa.Float(), nullable=True),
+        sa.Column('photo_url', sa.String(length=255), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id', 'date'),
+        postgresql_partition_by='RANGE (date)'
+    )
+    op.create_index('ix_weight_logs_user_date', 'weight_logs', ['user_id', 'date'])
+    weight_key = 'COALESCE(date, now())'
+    _create_partitions('weight_logs', weight_key)
+    _copy_from_legacy('weight_logs', WEIGHT_LOG_COLUMNS, 'date', weight_key)
+
+
+def downgrade() -> None:
+    for table, columns, index in [
+        ('daily_checkins', CHECKIN_COLUMNS, ('ix_daily_checkins_user_date', ['user_id', 'date'])),
+        ('weight_logs', WEIGHT_LOG_COLUMNS, ('ix_weight_logs_user_date', ['user_id', 'date'])),
+    ]:
+        column_list = ', '.join(columns)
+        op.execute(f'CREATE TABLE {table}_plain (LIKE {table} INCLUDING DEFAULTS)')
+        op.execute(f'ALTER TABLE {table}_plain DROP COLUMN IF EXISTS checkin_date')
+        op.execute(f'ALTER TABLE {table}_plain ALTER COLUMN date DROP NOT NULL')
+        op.execute(f'INSERT INTO {table}_plain ({column_list}) SELECT {column_list} FROM {table}')
+        # CASCADE снимает и default id, ссылающийся на последовательность старой таблицы
+        op.execute(f'DROP TABLE {table} CASCADE')
+        op.execute(f'ALTER TABLE {table}_plain RENAME TO {table}')
+        op.execute(f'CREATE SEQUENCE {table}_id_seq OWNED BY {table}.id')
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{table}_id_seq')")
+        op.execute(
+            f"SELECT setval('{table}_id_seq', COALESCE((SELECT max(id) FROM {table}), 0) + 1, false)"
+        )
+        op.create_primary_key(f'{table}_pkey', table, ['id'])
+        op.create_foreign_key(f'{table}_user_id_fkey', table, 'users', ['user_id'], ['id'])
+        op.create_index(index[0], table, index[1])
@@ -0,0 +1,101 @@
+"""unique daily check-in per user and JSONB snack photos
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Поля, которые при склейке дублей берутся из последней непустой записи
+LATEST_VALUE_COLUMNS = [
+    'morning_weight', 'sleep_hours', 'mood', 'breakfast_photo', 'lunch_photo', 'dinner_photo',
+    'adherence_score', 'daily_notes', 'challenges',
+]
+
+
+def upgrade() -> None:
+    op.execute(
+        'ALTER TABLE daily_checkins ALTER COLUMN snack_photos TYPE JSONB USING snack_photos::jsonb'
+    )
+
+    # Склеиваем дубли за день (гонка select-then-insert) в строку с минимальным id
+    latest = ',\n'.join(
+        f'(array_agg({column} ORDER BY id DESC) FILTER (WHERE {column} IS NOT NULL))[1] AS {column}'
+        for column in LATEST_VALUE_COLUMNS
+    )
+    assignments = ', '.join(f'{column} = merged.{column}' for column in LATEST_VALUE_COLUMNS)
+    op.execute(f"""
+        WITH merged AS (
+            SELECT
+                user_id,
+                checkin_date,
+                min(id) AS keep_id,
+                {latest},
+                max(water_ml) AS water_ml,
+                max(steps) AS steps,
+                bool_or(workout_completed) AS workout_completed,
+                sum(estimated_calories) AS estimated_calories
+            FROM daily_checkins
+            GROUP BY user_id, checkin_date
+            HAVING count(*) > 1
+        ),
+        photos AS (
+            SELECT
+                d.user_id,
+                d.checkin_date,
+                COALESCE(
+                    jsonb_agg(photo ORDER BY d.id) FILTER (WHERE photo IS NOT NULL),
+                    '[]'::jsonb
+                ) AS snack_photos
+            FROM daily_checkins d
+            JOIN merged USING (user_id, checkin_date)
+            LEFT JOIN LATERAL jsonb_array_elements(
+                CASE WHEN jsonb_typeof(d.snack_photos) = 'array' THEN d.snack_photos ELSE '[]'::jsonb END
+            ) AS photo ON true
+            GROUP BY d.user_id, d.checkin_date
+        ),
+        updated AS (
+            UPDATE daily_checkins
+            SET {assignments},
+                water_ml = merged.water_ml,
+                steps = merged.steps,
+                workout_completed = merged.workout_completed,
+                estimated_calories = merged.estimated_calories,
+                snack_photos = photos.snack_photos
+            FROM merged
+            JOIN photos USING (user_id, checkin_date)
+            WHERE daily_checkins.id = merged.keep_id
+              AND daily_checkins.checkin_date = merged.checkin_date
+        )
+        DELETE FROM daily_checkins
+        USING merged
+        WHERE daily_checkins.user_id = merged.user_id
+          AND daily_checkins.checkin_date = merged.checkin_date
+          AND daily_checkins.id <> merged.keep_id
+    """)
+
+    # Уникальный ключ заменяет обычный индекс (user_id, checkin_date)
+    op.drop_index('ix_daily_checkins_user_checkin_date', table_name='daily_checkins')
+    op.create_unique_constraint(
+        'uq_daily_checkins_user_checkin_date',
+        'daily_checkins',
+        ['user_id', 'checkin_date']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_daily_checkins_user_checkin_date', 'daily_checkins', type_='unique')
+    op.create_index('ix_daily_checkins_user_checkin_date', 'daily_checkins', ['user_id', 'checkin_date'])
+    op.execute(
+        'ALTER TABLE daily_checkins ALTER COLUMN snack_photos TYPE JSON USING snack_photos::json'
+    )
@@ -0,0 +1,164 @@
+"""dish catalog referenced from meal plans
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+import hashlib
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MEAL_TYPES = ['breakfast', 'lunch', 'dinner', 'snack']
+BATCH_SIZE = 5000
+
+# Копия нормализации core.services.dish_service на момент миграции:
+# хеши перенесенных блюд совпадают с хешами новых
+BASE_CALORIES = 100
+
+
+def _per_portion(value, portion):
+    return round(float(value or 0) / portion * 2) / 2
+
+
+def _normalize(meal):
+    calories = float(meal.get('calories') or 0)
+    portion = calories / BASE_CALORIES if calories > 0 else 1.0
+    content = {
+        'name': meal.get('name') or '',
+        'calories': BASE_CALORIES if calories > 0 else 0,
+        'protein': _per_portion(meal.get('protein'), portion),
+        'carbs': _per_portion(meal.get('carbs'), portion),
+        'fats': _per_portion(meal.get('fats'), portion),
+        'ingredients': meal.get('ingredients') or [],
+        'recipe': meal.get('recipe') or '',
+    }
+    return content, portion
+
+
+def _hash(content):
+    payload = json.dumps(content, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _backfill() -> None:
+    """Перенос JSON-блюд в каталог пачками по id"""
+    bind = op.get_bind()
+    dishes = sa.table(
+        'dishes',
+        sa.column('content_hash', sa.String), sa.column('name', sa.String),
+        sa.column('calories', sa.Integer), sa.column('protein', sa.Float),
+        sa.column('carbs', sa.Float), sa.column('fats', sa.Float),
+        sa.column('ingredients', sa.JSON), sa.column('recipe', sa.Text),
+    )
+    assignments = ', '.join(
+        f'{meal}_dish_id = :{meal}_dish_id, {meal}_portion = :{meal}_portion' for meal in MEAL_TYPES
+    )
+    last_id = 0
+
+    while True:
+        rows = bind.execute(sa.text(
+            f'SELECT id, {", ".join(MEAL_TYPES)} FROM meal_plans WHERE id > :last_id ORDER BY id LIMIT :limit'
+        ), {'last_id': last_id, 'limit': BATCH_SIZE}).mappings().all()
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+
+        contents, updates = {}, []
+        for row in rows:
+            values = {'id': row['id']}
+            for meal_type in MEAL_TYPES:
+                meal = row[meal_type]
+                if isinstance(meal, str):
+                    meal = json.loads(meal)
+                if not meal:
+                    values[f'{meal_type}_dish_id'] = values[f'{meal_type}_portion'] = None
+                    continue
+                content, portion = _normalize(meal)
+                digest = _hash(content)
+                contents[digest] = content
+                values[f'{meal_type}_dish_id'] = digest
+                values[f'{meal_type}_portion'] = portion
+            updates.append(values)
+
+        if contents:
+            bind.execute(
+                pg_insert(dishes)
+                .values([dict(content, content_hash=digest) for digest, content in contents.items()])
+                .on_conflict_do_nothing(index_elements=['content_hash'])
+            )
+        ids = dict(bind.execute(
+            sa.text('SELECT content_hash, id FROM dishes WHERE content_hash = ANY(:hashes)'),
+            {'hashes': list(contents)}
+        ).all())
+
+        for values in updates:
+            for meal_type in MEAL_TYPES:
+                digest = values[f'{meal_type}_dish_id']
+                values[f'{meal_type}_dish_id'] = ids.get(digest)
+        bind.execute(sa.text(f'UPDATE meal_plans SET {assignments} WHERE id = :id'), updates)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'dishes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=True),
+        sa.Column('calories', sa.Integer(), nullable=True),
+        sa.Column('protein', sa.Float(), nullable=True),
+        sa.Column('carbs', sa.Float(), nullable=True),
+        sa.Column('fats', sa.Float(), nullable=True),
+        sa.Column('ingredients', sa.JSON(), nullable=True),
+        sa.Column('recipe', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('content_hash')
+    )
+    for meal_type in MEAL_TYPES:
+        op.add_column('meal_plans', sa.Column(f'{meal_type}_dish_id', sa.Integer(), nullable=True))
+        op.add_column('meal_plans', sa.Column(f'{meal_type}_portion', sa.Float(), nullable=True))
+        op.create_foreign_key(
+            f'meal_plans_{meal_type}_dish_id_fkey', 'meal_plans', 'dishes', [f'{meal_type}_dish_id'], ['id']
+        )
+
+    _backfill()
+
+    for meal_type in MEAL_TYPES:
+        op.drop_column('meal_plans', meal_type)
+
+
+def downgrade() -> None:
+    for meal_type in MEAL_TYPES:
+        op.add_column('meal_plans', sa.Column(meal_type, sa.JSON(), nullable=True))
+        # Блюдо каталога, пересчитанное на порцию, как было в JSON
+        op.execute(f"""
+            UPDATE meal_plans SET {meal_type} = json_build_object(
+                'type', '{meal_type}',
+                'name', d.name,
+                'calories', round(d.calories * COALESCE(meal_plans.{meal_type}_portion, 1)),
+                'protein', round((d.protein * COALESCE(meal_plans.{meal_type}_portion, 1))::numeric),
+                'carbs', round((d.carbs * COALESCE(meal_plans.{meal_type}_portion, 1))::numeric),
+                'fats', round((d.fats * COALESCE(meal_plans.{meal_type}_portion, 1))::numeric),
+                'ingredients', d.ingredients,
+                'recipe', d.recipe
+            )
+            FROM dishes d
+            WHERE d.id = meal_plans.{meal_type}_dish_id
+        """)
+        op.drop_constraint(f'meal_plans_{meal_type}_dish_id_fkey', 'meal_plans', type_='foreignkey')
+        op.drop_column('meal_plans', f'{meal_type}_dish_id')
+        op.drop_column('meal_plans', f'{meal_type}_portion')
+
+    op.drop_table('dishes')
@@ -0,0 +1,183 @@
+"""exercise library and workout templates referenced from workout plans
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Копия библиотеки core.workout_library на момент миграции:
+# результат не зависит от текущих моделей и списков
+ANY_GOAL = 'any'
+
+EXERCISES = [
+    ('Приседания', 'Приседай до параллели бедер с полом', 'Держи спину прямо, колени не выходят за носки'),
+    ('Отжимания от колен', 'Отжимания с упором на колени', 'Держи корпус прямым, опускайся медленно'),
+    ('Планка', 'Статическое удержание положения', 'Не прогибай поясницу, дыши ровно'),
+    ('Выпады', 'Попеременные выпады вперед', 'Колено не касается пола, держи баланс'),
+    ('Приседания с прыжком', 'Приседание с выпрыгиванием вверх', None),
+    ('Отжимания', 'Классические отжимания', None),
+    ('Берпи', 'Комплексное упражнение', None),
+    ('Альпинист', 'Бег в упоре лежа', None),
+    ('Приседания на одной ноге', None, None),
+    ('Отжимания с хлопком', None, None),
+    ('Берпи с отжиманием', None, None),
+    ('Прыжки на тумбу', None, None),
+    ('Планка с подъемом ног', None, None),
+    ('Ходьба на месте', 'Разминка', None),
+    ('Прыжки звездочкой', None, None),
+    ('Высокие колени', None, None),
+    ('Бег на месте', None, None),
+    ('Интервальный бег', '30 сек быстро, 30 сек отдых', None),
+    ('Прыжки на скакалке', None, None),
+]
+
+_CARDIO_ADVANCED = [
+    ('Интервальный бег', {'duration': 30, 'sets': 8, 'rest': 30}),
+    ('Берпи', {'sets': 4, 'reps': 15, 'rest': 45}),
+    ('Прыжки на скакалке', {'duration': 120, 'sets': 3, 'rest': 60}),
+]
+
+# (тип, сложность, длительность, упражнения с параметрами); цель - ANY_GOAL
+TEMPLATES = [
+    ('strength', 'beginner', 30, [
+        ('Приседания', {'sets': 3, 'reps': 12, 'rest': 60}),
+        ('Отжимания от колен', {'sets': 3, 'reps': 10, 'rest': 60}),
+        ('Планка', {'duration': 30, 'sets': 3, 'rest': 45}),
+        ('Выпады', {'sets': 3, 'reps': 10, 'rest': 60}),
+    ]),
+    ('strength', 'intermediate', 45, [
+        ('Приседания с прыжком', {'sets': 4, 'reps': 15, 'rest': 45}),
+        ('Отжимания', {'sets': 4, 'reps': 15, 'rest': 45}),
+        ('Берпи', {'sets': 3, 'reps': 10, 'rest': 60}),
+        ('Альпинист', {'duration': 45, 'sets': 3, 'rest': 45}),
+        ('Планка', {'duration': 60, 'sets': 3, 'rest': 45}),
+    ]),
+    ('strength', 'advanced', 45, [
+        ('Приседания на одной ноге', {'sets': 4, 'reps': 10, 'rest': 60}),
+        ('Отжимания с хлопком', {'sets': 4, 'reps': 12, 'rest': 60}),
+        ('Берпи с отжиманием', {'sets': 4, 'reps': 15, 'rest': 60}),
+        ('Прыжки на тумбу', {'sets': 4, 'reps': 12, 'rest': 60}),
+        ('Планка с подъемом ног', {'duration': 90, 'sets': 3, 'rest': 45}),
+    ]),
+    ('cardio', 'beginner', 30, [
+        ('Ходьба на месте', {'duration': 300}),
+        ('Прыжки звездочкой', {'duration': 30, 'sets': 3, 'rest': 30}),
+        ('Высокие колени', {'duration': 30, 'sets': 3, 'rest': 30}),
+        ('Бег на месте', {'duration': 60, 'sets': 3, 'rest': 45}),
+    ]),
+    ('cardio', 'intermediate', 45, _CARDIO_ADVANCED),
+    ('cardio', 'advanced', 45, _CARDIO_ADVANCED),
+]
+
+
+def _seed() -> None:
+    """Библиотека упражнений и шаблоны; шаблоны ссылаются на id упражнений"""
+    exercises = sa.table(
+        'exercises',
+        sa.column('id', sa.Integer), sa.column('name', sa.String),
+        sa.column('description', sa.Text), sa.column('tips', sa.Text),
+    )
+    templates = sa.table(
+        'workout_templates',
+        sa.column('workout_type', sa.String), sa.column('difficulty', sa.String),
+        sa.column('goal', sa.String), sa.column('duration_minutes', sa.Integer),
+        sa.column('exercises', sa.JSON),
+    )
+
+    op.bulk_insert(exercises, [
+        {'name': name, 'description': description, 'tips': tips}
+        for name, description, tips in EXERCISES
+    ])
+    exercise_ids = dict(op.get_bind().execute(sa.select(exercises.c.name, exercises.c.id)).all())
+
+    op.bulk_insert(templates, [
+        {
+            'workout_type': workout_type,
+            'difficulty': difficulty,
+            'goal': ANY_GOAL,
+            'duration_minutes': duration_minutes,
+            'exercises': [dict(params, exercise_id=exercise_ids[name]) for name, params in items],
+        }
+        for workout_type, difficulty, duration_minutes, items in TEMPLATES
+    ])
+
+
+def upgrade() -> None:
+    op.create_table(
+        'exercises',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('tips', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    op.create_table(
+        'workout_templates',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('workout_type', sa.String(length=50), nullable=False),
+        sa.Column('difficulty', sa.String(length=20), nullable=False),
+        sa.Column('goal', sa.String(length=20), nullable=False),
+        sa.Column('duration_minutes', sa.Integer(), nullable=True),
+        sa.Column('exercises', sa.JSON(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('workout_type', 'difficulty', 'goal', name='uq_workout_templates_type_difficulty_goal')
+    )
+    _seed()
+
+    op.add_column('workout_plans', sa.Column('template_id', sa.Integer(), nullable=True))
+    op.add_column('workout_plans', sa.Column('overrides', sa.JSON(), nullable=True))
+    op.create_foreign_key(
+        'workout_plans_template_id_fkey', 'workout_plans', 'workout_templates', ['template_id'], ['id']
+    )
+
+    # Планы генерировались из тех же списков - правок нет, достаточно ссылки
+    op.execute(f"""
+        UPDATE workout_plans p SET template_id = t.id
+        FROM workout_templates t
+        WHERE t.workout_type = p.workout_type
+          AND t.difficulty = p.difficulty
+          AND t.goal = '{ANY_GOAL}'
+    """)
+    # Дни отдыха больше не хранятся
+    op.execute("DELETE FROM workout_plans WHERE workout_type = 'rest' AND NOT COALESCE(completed, false)")
+    op.drop_column('workout_plans', 'exercises')
+
+
+def downgrade() -> None:
+    op.add_column('workout_plans', sa.Column('exercises', sa.JSON(), nullable=True))
+    # Упражнения шаблона с описаниями библиотеки (правки плана не переносятся)
+    op.execute("""
+        UPDATE workout_plans p SET exercises = (
+            SELECT json_agg(
+                json_strip_nulls(
+                    (item.value::jsonb - 'exercise_id'
+                     || jsonb_build_object('name', e.name, 'description', e.description, 'tips', e.tips))::json
+                )
+                ORDER BY item.ordinality
+            )
+            FROM workout_templates t
+            CROSS JOIN LATERAL json_array_elements(t.exercises) WITH ORDINALITY AS item(value, ordinality)
+            JOIN exercises e ON e.id = (item.value->>'exercise_id')::int
+            WHERE t.id = p.template_id
+        )
+        WHERE p.template_id IS NOT NULL
+    """)
+    op.drop_constraint('workout_plans_template_id_fkey', 'workout_plans', type_='foreignkey')
+    op.drop_column('workout_plans', 'overrides')
+    op.drop_column('workout_plans', 'template_id')
+    op.drop_table('workout_templates')
+    op.drop_table('exercises')
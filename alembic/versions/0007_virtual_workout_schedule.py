@@ -0,0 +1,50 @@
+"""virtual workout schedule: keep only completions and deviations
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('program_start', sa.Date(), nullable=True))
+    op.execute('UPDATE users SET program_start = created_at::date WHERE created_at IS NOT NULL')
+
+    op.add_column('workout_plans', sa.Column('scheduled_date', sa.Date(), nullable=True))
+    # Невыполненные строки заранее сгенерированного плана теперь вычисляются
+    op.execute('DELETE FROM workout_plans WHERE NOT COALESCE(completed, false)')
+    op.execute('UPDATE workout_plans SET scheduled_date = COALESCE(completed_at, created_at, now())::date')
+    # Несколько выполнений за день (week_number не вычислялся) - оставляем последнее
+    op.execute("""
+        DELETE FROM workout_plans p
+        USING workout_plans newer
+        WHERE newer.user_id = p.user_id
+          AND newer.scheduled_date = p.scheduled_date
+          AND newer.id > p.id
+    """)
+
+    op.drop_index('ix_workout_plans_user_week_day', table_name='workout_plans')
+    op.create_unique_constraint(
+        'uq_workout_plans_user_scheduled_date', 'workout_plans', ['user_id', 'scheduled_date']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_workout_plans_user_scheduled_date', 'workout_plans', type_='unique')
+    op.create_index(
+        'ix_workout_plans_user_week_day', 'workout_plans', ['user_id', 'week_number', 'day_number']
+    )
+    op.drop_column('workout_plans', 'scheduled_date')
+    op.drop_column('users', 'program_start')
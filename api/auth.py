@@ -0,0 +1,106 @@
+"""Авторизация API: initData Telegram WebApp и подписанные токены сессии.
+
+Клиент WebApp отправляет initData в /api/auth/telegram и получает
+короткоживущий токен (JWT HS256). В токене - id пользователя, telegram_id
+и статус подписки, поэтому проверка запроса - одна HMAC без обращения к БД.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+from urllib.parse import parse_qsl
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+from config import settings
+from core.models import User
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def _token_secret() -> bytes:
+    """Ключ подписи токенов; без API_TOKEN_SECRET - производный от токена бота"""
+    if settings.API_TOKEN_SECRET:
+        return settings.API_TOKEN_SECRET.encode("utf-8")
+    return hmac.new(b"ApiToken", settings.BOT_TOKEN.encode("utf-8"), hashlib.sha256).digest()
+
+_TOKEN_HEADER = _b64encode(json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(",", ":")).encode("utf-8"))
+
+def verify_init_data(init_data: str, max_age: int = settings.WEBAPP_AUTH_MAX_AGE) -> Dict[str, Any]:
+    """Проверить подпись initData WebApp, вернуть поля (user - уже dict).
+
+    secret = HMAC_SHA256(key="WebAppData", msg=bot_token),
+    hash = HMAC_SHA256(key=secret, msg=поля "k=v" по алфавиту через "\\n").
+    """
+    fields = dict(parse_qsl(init_data, keep_blank_values=True))
+    received_hash = fields.pop("hash", None)
+    if not received_hash:
+        raise ValueError("initData has no hash")
+
+    data_check_string = "\n".join(f"{key}={value}" for key, value in sorted(fields.items()))
+    secret = hmac.new(b"WebAppData", settings.BOT_TOKEN.encode("utf-8"), hashlib.sha256).digest()
+    expected_hash = hmac.new(secret, data_check_string.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    if not hmac.compare_digest(expected_hash, received_hash):
+        raise ValueError("initData signature mismatch")
+
+    auth_date = int(fields.get("auth_date") or 0)
+    if time.time() - auth_date > max_age:
+        raise ValueError("initData is expired")
+
+    if "user" in fields:
+        fields["user"] = json.loads(fields["user"])
+
+    return fields
+
+@dataclass(frozen=True)
+class TokenClaims:
+    """Данные токена сессии (статус - на момент выдачи)"""
+    user_id: int
+    telegram_id: int
+    status: str
+    expires_at: int
+
+def issue_token(user: User, ttl: int = settings.API_TOKEN_TTL) -> Tuple[str, int]:
+    """(токен, срок жизни в секундах) для пользователя"""
+    now = int(time.time())
+    claims = {
+        "sub": str(user.telegram_id),
+        "uid": user.id,
+        "status": getattr(user.status, "value", user.status),
+        "iat": now,
+        "exp": now + ttl
+    }
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    signing_input = f"{_TOKEN_HEADER}.{payload}".encode("ascii")
+    signature = _b64encode(hmac.new(_token_secret(), signing_input, hashlib.sha256).digest())
+    return f"{_TOKEN_HEADER}.{payload}.{signature}", ttl
+
+def decode_token(token: str) -> TokenClaims:
+    """Проверить подпись и срок токена (ValueError - токен недействителен)"""
+    try:
+        header, payload, signature = token.split(".")
+    except ValueError:
+        raise ValueError("Malformed token")
+
+    if header != _TOKEN_HEADER:
+        raise ValueError("Unsupported token header")
+
+    expected = hmac.new(_token_secret(), f"{header}.{payload}".encode("ascii"), hashlib.sha256).digest()
+    if not hmac.compare_digest(_b64encode(expected), signature):
+        raise ValueError("Token signature mismatch")
+
+    claims = json.loads(_b64decode(payload))
+    if claims["exp"] < time.time():
+        raise ValueError("Token is expired")
+
+    return TokenClaims(
+        user_id=claims["uid"],
+        telegram_id=int(claims["sub"]),
+        status=claims["status"],
+        expires_at=claims["exp"]
+    )
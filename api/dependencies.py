@@ -1,49 +1,54 @@
 from fastapi import Depends, HTTPException, Header
-from typing import Optional
+from typing import AsyncIterator, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from api.auth import TokenClaims, decode_token
+from core.database import unit_of_work
 from core.services.user_service import UserService
 from core.models import User
 
 user_service = UserService()
 
-async def get_current_user(
+async def db_unit_of_work() -> AsyncIterator[AsyncSession]:
+    """Одна сессия БД и одна транзакция на запрос"""
+    async with unit_of_work() as session:
+        yield session
+
+async def get_token_claims(
     authorization: Optional[str] = Header(None)
-) -> User:
-    """Получение текущего пользователя по токену"""
+) -> TokenClaims:
+    """Данные токена сессии из "Authorization: Bearer <token>" (без БД)"""
     if not authorization:
         raise HTTPException(status_code=401, detail="Authorization header missing")
     
-    # Простая проверка токена (в продакшене использовать JWT)
-    # Токен формата: "Bearer {telegram_id}:{secret_hash}"
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Invalid authentication scheme")
+    
     try:
-        scheme, token = authorization.split()
-        if scheme.lower() != "bearer":
-            raise HTTPException(status_code=401, detail="Invalid authentication scheme")
-        
-        telegram_id, secret_hash = token.split(":")
-        telegram_id = int(telegram_id)
-        
-        # В продакшене проверять хеш
-        # if not verify_secret_hash(telegram_id, secret_hash):
-        #     raise HTTPException(status_code=401, detail="Invalid token")
-        
-        user = await user_service.get_user(telegram_id=telegram_id)
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        return user
-        
-    except (ValueError, AttributeError):
-        raise HTTPException(status_code=401, detail="Invalid token format")
+        return decode_token(token.strip())
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
 
-async def get_admin_user(
-    user: User = Depends(get_current_user)
+async def get_current_user(
+    claims: TokenClaims = Depends(get_token_claims)
 ) -> User:
+    """Профиль текущего пользователя (из кеша профилей) - для эндпоинтов,
+    которым нужна строка users, а не только id из токена"""
+    user = await user_service.get_user(telegram_id=claims.telegram_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    return user
+
+async def get_admin_user(
+    claims: TokenClaims = Depends(get_token_claims)
+) -> TokenClaims:
     """Проверка прав администратора"""
     # В продакшене добавить поле is_admin в модель User
     admin_ids = [123456789]  # Telegram ID администраторов
     
-    if user.telegram_id not in admin_ids:
+    if claims.telegram_id not in admin_ids:
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    return user
\ No newline at end of file
+    return claims
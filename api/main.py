@@ -1,14 +1,18 @@
-from fastapi import FastAPI, HTTPException, Depends, Header
+from fastapi import FastAPI, HTTPException, Depends, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import logging
 
-from api.routers import webhook, users, analytics, admin
-from core.database import init_db
+from api.routers import webhook, users, analytics, admin, auth
+from api.dependencies import db_unit_of_work
+from core.database import dispose_engines, init_db, set_database_role
+from core.metrics import render_metrics
 from config import settings
 
 logger = logging.getLogger(__name__)
 
+set_database_role("api")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Управление жизненным циклом приложения"""
@@ -18,6 +22,7 @@ async def lifespan(app: FastAPI):
     yield
     # Shutdown
     logger.info("Shutting down...")
+    await dispose_engines()
 
 app = FastAPI(
     title="Fitness Bot API",
@@ -34,11 +39,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Подключение роутеров
-app.include_router(webhook.router, prefix="/webhook", tags=["webhook"])
-app.include_router(users.router, prefix="/api/users", tags=["users"])
-app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"])
-app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
+# Подключение роутеров (сессия БД - одна на запрос)
+uow = [Depends(db_unit_of_work)]
+app.include_router(webhook.router, prefix="/webhook", tags=["webhook"], dependencies=uow)
+app.include_router(auth.router, prefix="/api/auth", tags=["auth"], dependencies=uow)
+app.include_router(users.router, prefix="/api/users", tags=["users"], dependencies=uow)
+app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"], dependencies=uow)
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"], dependencies=uow)
 
 @app.get("/")
 async def root():
@@ -46,4 +53,9 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, headers={"Content-Type": content_type})
@@ -1,12 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from datetime import datetime
 from typing import List, Optional
 
 from api.schemas import UserResponse, BroadcastMessage
 from core.services.admin_service import AdminService
+from core.services.export_service import ExportService
 from api.dependencies import get_admin_user
 
 router = APIRouter()
 admin_service = AdminService()
+export_service = ExportService()
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8"
+}
 
 @router.get("/users", response_model=List[UserResponse])
 async def get_all_users(
@@ -64,4 +73,32 @@ async def generate_promo_code(
         max_uses,
         expires_days
     )
-    return {"promo_code": promo_code}
\ No newline at end of file
+    return {"promo_code": promo_code}
+
+@router.get("/export/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: str = "ndjson",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    gzip: bool = False,
+    admin=Depends(get_admin_user)
+):
+    """Потоковая выгрузка users, payments или checkins (NDJSON/CSV).
+
+    Вместо постраничного обхода: одна выгрузка серверным курсором,
+    since/until - по дате создания (у чек-инов - по дате чек-ина),
+    since включается, until - нет. Для чек-инов берутся дни, которые
+    пересекаются с периодом.
+    """
+    try:
+        chunks = export_service.stream(dataset, format, since, until, compress=gzip)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    filename = f"{dataset}.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        chunks,
+        media_type="application/gzip" if gzip else EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
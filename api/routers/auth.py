@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException
+
+from api.auth import issue_token, verify_init_data
+from api.schemas import TokenResponse, WebAppAuthRequest
+from core.services.user_service import UserService
+
+router = APIRouter()
+user_service = UserService()
+
+@router.post("/telegram", response_model=TokenResponse)
+async def telegram_webapp_login(request: WebAppAuthRequest):
+    """Обмен initData Telegram WebApp на токен сессии"""
+    try:
+        init_data = verify_init_data(request.init_data)
+        telegram_id = int(init_data["user"]["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=401, detail="Invalid initData")
+    
+    # Профиль из кеша: повторные входы не ходят в БД
+    user = await user_service.get_user(telegram_id=telegram_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found, start the bot first")
+    
+    token, expires_in = issue_token(user)
+    return TokenResponse(access_token=token, expires_in=expires_in)
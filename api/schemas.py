@@ -50,4 +50,12 @@ class ProgressResponse(BaseModel):
 class BroadcastMessage(BaseModel):
     text: str
     target_status: Optional[str] = None
-    include_photo: Optional[str] = None
\ No newline at end of file
+    include_photo: Optional[str] = None
+
+class WebAppAuthRequest(BaseModel):
+    init_data: str  # Telegram.WebApp.initData как есть
+
+class TokenResponse(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int
@@ -8,11 +8,14 @@ from states.user_states import CheckInStates
 from keyboards.inline import (
     get_morning_checkin_keyboard,
     get_mood_keyboard,
-    get_workout_confirmation_keyboard
+    get_workout_confirmation_keyboard,
+    get_water_keyboard
 )
+from core.database import release_unit_of_work
 from core.services.checkin_service import CheckInService
 from core.services.storage_service import StorageService
 from utils.ai_helpers import analyze_food_photo
+from utils.validators import validate_water, validate_steps
 
 router = Router()
 checkin_service = CheckInService()
@@ -132,6 +135,9 @@ async def process_food_photo(message: Message, state: FSMContext):
     """Обработка фото еды"""
     photo: PhotoSize = message.photo[-1]  # Берем самое большое фото
     
+    # Загрузка в S3 и анализ моделью - без открытой транзакции
+    await release_unit_of_work()
+    
     # Сохранение фото в S3
     file_info = await message.bot.get_file(photo.file_id)
     photo_url = await storage_service.save_photo(
@@ -164,4 +170,63 @@ async def process_food_photo(message: Message, state: FSMContext):
     )
     
     await message.answer("Отличная работа сегодня! Увидимся завтра! 🌙")
-    await state.clear()
\ No newline at end of file
+    await state.clear()
+
+@router.message(F.text == "💧 Отметить воду")
+async def start_water_log(message: Message):
+    """Быстрая отметка воды"""
+    await message.answer(
+        "Сколько воды ты выпил? 💧",
+        reply_markup=get_water_keyboard()
+    )
+
+@router.callback_query(F.data.startswith("water_add_"))
+async def add_water(callback: CallbackQuery):
+    """Прибавить воду одним нажатием"""
+    amount = int(callback.data.replace("water_add_", ""))
+    checkin = await checkin_service.add_counters(callback.from_user.id, water_ml=amount)
+    
+    if not checkin:
+        await callback.answer("Сначала пройди регистрацию: /start", show_alert=True)
+        return
+    
+    # Ответ на callback без редактирования сообщения: кнопки остаются для следующих нажатий
+    await callback.answer(f"💧 +{amount} мл, за сегодня: {checkin.water_ml} мл")
+
+@router.callback_query(F.data == "water_custom")
+async def request_water_amount(callback: CallbackQuery, state: FSMContext):
+    """Запрос произвольного количества воды"""
+    await callback.message.edit_text("Введи количество воды в мл:")
+    await state.set_state(CheckInStates.water_intake)
+
+@router.message(CheckInStates.water_intake)
+async def process_water_amount(message: Message, state: FSMContext):
+    """Обработка введенного количества воды"""
+    if not message.text or not validate_water(message.text) or int(message.text) == 0:
+        await message.answer("Пожалуйста, введи количество в мл (1-10000)")
+        return
+    
+    checkin = await checkin_service.add_counters(message.from_user.id, water_ml=int(message.text))
+    await state.clear()
+    
+    if checkin:
+        await message.answer(f"✅ Записал! Воды за сегодня: {checkin.water_ml} мл 💧")
+
+@router.message(F.text == "👟 Записать шаги")
+async def request_steps(message: Message, state: FSMContext):
+    """Запрос количества шагов"""
+    await message.answer("Сколько шагов добавить? Введи число:")
+    await state.set_state(CheckInStates.steps_count)
+
+@router.message(CheckInStates.steps_count)
+async def process_steps(message: Message, state: FSMContext):
+    """Обработка введенного количества шагов"""
+    if not message.text or not validate_steps(message.text) or int(message.text) == 0:
+        await message.answer("Пожалуйста, введи количество шагов (1-100000)")
+        return
+    
+    checkin = await checkin_service.add_counters(message.from_user.id, steps=int(message.text))
+    await state.clear()
+    
+    if checkin:
+        await message.answer(f"✅ Записал! Шагов за сегодня: {checkin.steps} 👟")
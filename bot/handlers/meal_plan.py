@@ -1,7 +1,7 @@
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 from states.user_states import MealPlanStates
 from keyboards.inline import (
@@ -9,14 +9,27 @@ from keyboards.inline import (
     get_replace_meal_keyboard,
     get_meal_type_keyboard
 )
+from core.database import enqueue_after_commit, release_unit_of_work
+from core.models import MealPlan
 from core.services.user_service import UserService
 from core.services.nutrition_service import NutritionService
-from utils.ai_helpers import generate_meal_replacement
+from utils.ai_helpers import generate_meal_replacement, get_cached_meal_replacement
+from utils.ingredients import categorize_shopping_list
 
 router = Router()
 user_service = UserService()
 nutrition_service = NutritionService()
 
+async def get_week_plans(state: FSMContext) -> List[MealPlan]:
+    """Планы недели из кеша: в FSM хранится только id пользователя"""
+    data = await state.get_data()
+    user_id = data.get("user_id")
+    
+    if user_id is None:
+        return []
+    
+    return await user_service.get_meal_plans(user_id, week=1)
+
 @router.message(F.text == "📊 Мой план")
 async def show_meal_plan(message: Message, state: FSMContext):
     """Показать план питания"""
@@ -35,13 +48,13 @@ async def show_meal_plan(message: Message, state: FSMContext):
         )
         # Запускаем генерацию
         from workers.tasks import generate_meal_plan_task
-        generate_meal_plan_task.delay(user.id)
+        enqueue_after_commit(generate_meal_plan_task, user.id)
         return
     
     # Показываем план на первый день
     await show_day_plan(message, meal_plans[0], day=1)
     await state.set_state(MealPlanStates.viewing_day)
-    await state.update_data(current_day=1, meal_plans=meal_plans)
+    await state.update_data(current_day=1, user_id=user.id)
 
 async def show_day_plan(message: Message, meal_plan: Any, day: int):
     """Показать план на конкретный день"""
@@ -93,8 +106,7 @@ async def show_day_plan(message: Message, meal_plan: Any, day: int):
 async def switch_day(callback: CallbackQuery, state: FSMContext):
     """Переключение между днями"""
     day = int(callback.data.split("_")[2])
-    data = await state.get_data()
-    meal_plans = data.get("meal_plans", [])
+    meal_plans = await get_week_plans(state)
     
     if 0 < day <= len(meal_plans):
         await show_day_plan(callback.message, meal_plans[day-1], day)
@@ -122,22 +134,32 @@ async def process_replacement(callback: CallbackQuery, state: FSMContext):
     day = int(parts[2])
     meal_type = parts[3]  # breakfast, lunch, dinner, snack
     
-    data = await state.get_data()
-    meal_plans = data.get("meal_plans", [])
+    meal_plans = await get_week_plans(state)
     
     if day <= len(meal_plans):
         meal_plan = meal_plans[day-1]
         current_meal = getattr(meal_plan, meal_type)
         
         if current_meal:
-            await callback.message.edit_text("Генерирую замену... ⏳")
-            
-            # Генерация замены через AI
-            replacement = await generate_meal_replacement(
+            # Сначала кеш: популярные замены показываем сразу, без модели
+            replacement = await get_cached_meal_replacement(
                 current_meal,
                 replacement_type
             )
             
+            if replacement is None:
+                await callback.message.edit_text("Генерирую замену... ⏳")
+                
+                # Не держим транзакцию и соединение, пока отвечает модель
+                await release_unit_of_work()
+                
+                # Генерация замены через AI
+                replacement = await generate_meal_replacement(
+                    current_meal,
+                    replacement_type,
+                    check_cache=False
+                )
+            
             # Обновляем план в БД
             await nutrition_service.update_meal(
                 meal_plan.id,
@@ -175,7 +197,7 @@ async def process_replacement(callback: CallbackQuery, state: FSMContext):
 async def show_shopping_list(callback: CallbackQuery, state: FSMContext):
     """Показать список покупок"""
     data = await state.get_data()
-    meal_plans = data.get("meal_plans", [])
+    meal_plans = await get_week_plans(state)
     
     if not meal_plans:
         await callback.answer("План питания не загружен", show_alert=True)
@@ -199,26 +221,8 @@ async def show_shopping_list(callback: CallbackQuery, state: FSMContext):
     # Формируем текст
     text = "🛒 **Список покупок на неделю:**\n\n"
     
-    categories = {
-        "Мясо/Рыба": ["курица", "говядина", "рыба", "индейка", "свинина"],
-        "Молочные": ["молоко", "творог", "сыр", "йогурт", "кефир"],
-        "Овощи": ["помидор", "огурец", "капуста", "морковь", "лук"],
-        "Фрукты": ["яблоко", "банан", "апельсин", "груша", "ягоды"],
-        "Крупы": ["рис", "гречка", "овсянка", "макароны", "хлеб"],
-        "Другое": []
-    }
-    
-    categorized = {cat: [] for cat in categories}
-    
-    for item, amount in shopping_list.items():
-        added = False
-        for category, keywords in categories.items():
-            if any(keyword in item.lower() for keyword in keywords):
-                categorized[category].append(f"• {item}: {amount}")
-                added = True
-                break
-        if not added:
-            categorized["Другое"].append(f"• {item}: {amount}")
+    # Категоризация за один проход по списку (префиксное дерево основ)
+    categorized = categorize_shopping_list(shopping_list)
     
     for category, items in categorized.items():
         if items:
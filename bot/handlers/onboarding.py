@@ -2,6 +2,7 @@ from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from typing import Dict, Any
+from datetime import date
 
 from states.user_states import OnboardingStates
 from keyboards.inline import (
@@ -11,6 +12,7 @@ from keyboards.inline import (
     get_meal_count_keyboard,
     get_restrictions_keyboard
 )
+from core.database import enqueue_after_commit
 from core.services.user_service import UserService
 from core.services.nutrition_service import NutritionService
 from utils.validators import validate_age, validate_height, validate_weight
@@ -132,8 +134,10 @@ async def finalize_onboarding(message: Message, state: FSMContext):
     data = await state.get_data()
     
     # Сохранение данных пользователя
+    # С этого дня считается расписание тренировок (core/workout_schedule.py)
     user = await user_service.update_user_profile(
         telegram_id=message.chat.id,
+        program_start=date.today(),
         **data
     )
     
@@ -161,8 +165,9 @@ async def finalize_onboarding(message: Message, state: FSMContext):
         "Сейчас я создам для тебя меню на неделю..."
     )
     
-    # Запуск генерации меню в фоне
+    # Запуск генерации меню в фоне - после коммита, иначе воркер
+    # не увидит только что записанные калории и БЖУ
     from workers.tasks import generate_meal_plan_task
-    generate_meal_plan_task.delay(user.id)
+    enqueue_after_commit(generate_meal_plan_task, user.id)
     
     await state.clear()
\ No newline at end of file
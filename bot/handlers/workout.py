@@ -1,16 +1,22 @@
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import asyncio
+import logging
 
 from states.user_states import WorkoutStates
 from keyboards.inline import get_workout_keyboard
+from core.database import enqueue_after_commit, release_unit_of_work
 from core.services.workout_service import WorkoutService
-from utils.ai_helpers import generate_workout_advice
+from core.services.advice_service import AdviceService
+from utils.ai_helpers import WORKOUT_ADVICE_FALLBACK
+
+logger = logging.getLogger(__name__)
 
 router = Router()
 workout_service = WorkoutService()
+advice_service = AdviceService()
 
 @router.message(F.text == "🏋️ Тренировка")
 async def show_workout(message: Message, state: FSMContext):
@@ -21,8 +27,8 @@ async def show_workout(message: Message, state: FSMContext):
         await message.answer("Сначала пройди регистрацию /start")
         return
     
-    # Получаем тренировку на сегодня
-    today_workout = await workout_service.get_today_workout(user.id)
+    # Тренировка на сегодня считается по расписанию программы
+    today_workout = await workout_service.get_today_workout(user)
     
     if not today_workout:
         await message.answer(
@@ -44,7 +50,7 @@ async def show_workout(message: Message, state: FSMContext):
     )
     
     await state.set_state(WorkoutStates.selecting_workout)
-    await state.update_data(workout_id=today_workout.id)
+    await state.update_data(workout_date=today_workout.scheduled_date.isoformat())
 
 async def format_workout_text(workout) -> str:
     """Форматирование текста тренировки"""
@@ -79,7 +85,13 @@ async def start_workout(callback: CallbackQuery, state: FSMContext):
     day = int(parts[3])
     
     data = await state.get_data()
-    workout_id = data.get("workout_id")
+    workout_date = date.fromisoformat(data.get("workout_date") or date.today().isoformat())
+    
+    user = await workout_service.get_user_by_telegram_id(callback.from_user.id)
+    
+    if not user:
+        await callback.answer("Пользователь не найден", show_alert=True)
+        return
     
     await callback.message.edit_text(
         "🏃‍♂️ Отлично! Начинаем тренировку!\n\n"
@@ -90,7 +102,15 @@ async def start_workout(callback: CallbackQuery, state: FSMContext):
     await state.set_state(WorkoutStates.in_progress)
     
     # Получаем тренировку
-    workout = await workout_service.get_workout_by_id(workout_id)
+    workout = await workout_service.get_workout_for_date(user, workout_date)
+    
+    if not workout:
+        await callback.message.answer("На этот день тренировка не запланирована 😊")
+        await state.clear()
+        return
+    
+    # Тренировка идет минутами: соединение возвращаем в пул до ее конца
+    await release_unit_of_work()
     
     # Проходим по упражнениям
     for i, exercise in enumerate(workout.exercises, 1):
@@ -109,7 +129,7 @@ async def start_workout(callback: CallbackQuery, state: FSMContext):
             await asyncio.sleep(min(exercise_time, 180))  # Максимум 3 минуты
     
     # Завершение тренировки
-    await complete_workout(callback.message, state, workout_id)
+    await complete_workout(callback.message, state, user, workout_date)
 
 async def show_exercise(message: Message, exercise: dict, current: int, total: int):
     """Показать упражнение"""
@@ -132,14 +152,28 @@ async def show_exercise(message: Message, exercise: dict, current: int, total: i
     
     await message.answer(text, parse_mode="Markdown")
 
-async def complete_workout(message: Message, state: FSMContext, workout_id: int):
+async def complete_workout(message: Message, state: FSMContext, user, workout_date: date):
     """Завершение тренировки"""
     # Отмечаем тренировку как выполненную
-    await workout_service.mark_workout_completed(workout_id)
-    
-    # Получаем данные пользователя для генерации совета
-    user_data = await state.get_data()
-    advice = await generate_workout_advice(user_data)
+    try:
+        await workout_service.mark_workout_completed(user, workout_date)
+    except ValueError as e:
+        # Расписание изменилось за время тренировки: отметить нечего,
+        # но пользователь после нескольких минут тренировки должен получить ответ
+        logger.warning(f"Workout completion was not recorded: {e}")
+    
+    # Совет берем из заранее сгенерированного пула - без ожидания модели
+    advice = await advice_service.pick_workout_advice(user) if user else None
+    
+    if advice is None:
+        advice = WORKOUT_ADVICE_FALLBACK
+        
+        bucket = advice_service.get_bucket(user.goal, user.activity_level, user.weight) if user else None
+        
+        # Пул бакета пуст - заполняем в фоне, одной задачей на бакет
+        if bucket and await advice_service.claim_refresh(bucket):
+            from workers.tasks import refresh_workout_advice_pool
+            enqueue_after_commit(refresh_workout_advice_pool, list(bucket))
     
     await message.answer(
         "🎉 **Поздравляю! Тренировка завершена!**\n\n"
@@ -219,9 +253,9 @@ async def show_workout_history(callback: CallbackQuery):
     text = "📊 **История тренировок:**\n\n"
     
     for workout in history:
-        date = workout.completed_at.strftime("%d.%m")
+        day = workout.scheduled_date.strftime("%d.%m")
         emoji = "✅" if workout.completed else "⏭"
-        text += f"{emoji} {date} - {workout.workout_type} ({workout.duration_minutes} мин)\n"
+        text += f"{emoji} {day} - {workout.workout_type} ({workout.duration_minutes} мин)\n"
     
     # Статистика
     total_workouts = len([w for w in history if w.completed])
@@ -141,6 +141,17 @@ def get_workout_confirmation_keyboard() -> InlineKeyboardMarkup:
     builder.adjust(1)
     return builder.as_markup()
 
+def get_water_keyboard() -> InlineKeyboardMarkup:
+    """Быстрая отметка воды"""
+    builder = InlineKeyboardBuilder()
+    
+    builder.button(text="🥛 +250 мл", callback_data="water_add_250")
+    builder.button(text="🍶 +500 мл", callback_data="water_add_500")
+    builder.button(text="✏️ Другое количество", callback_data="water_custom")
+    
+    builder.adjust(2, 1)
+    return builder.as_markup()
+
 def get_meal_plan_keyboard(day: int = 1) -> InlineKeyboardMarkup:
     """Клавиатура плана питания"""
     builder = InlineKeyboardBuilder()
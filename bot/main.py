@@ -1,8 +1,7 @@
 import asyncio
 import logging
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.redis import RedisStorage
-from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiogram.webhook.aiohttp_server import setup_application
 from aiohttp import web
 import redis.asyncio as redis
 
@@ -16,7 +15,13 @@ from handlers import (
     payment_router
 )
 from middlewares.subscription import SubscriptionMiddleware
-from core.database import init_db
+from middlewares.throttling import ThrottlingMiddleware
+from middlewares.fsm_buffer import BufferedFSMContextMiddleware
+from middlewares.database import UnitOfWorkMiddleware
+from states.storage import CompactRedisStorage
+from webhook import ChatOrderedRequestHandler, metrics_handler
+from core.database import dispose_engines, init_db
+from core.workout_library import workout_library
 
 # Настройка логирования
 logging.basicConfig(
@@ -28,6 +33,7 @@ logger = logging.getLogger(__name__)
 async def on_startup(bot: Bot):
     """Действия при запуске бота"""
     await init_db()
+    await workout_library.load()
     await bot.set_webhook(
         url=f"{settings.WEBHOOK_URL}/webhook",
         drop_pending_updates=True
@@ -37,25 +43,36 @@ async def on_startup(bot: Bot):
 async def on_shutdown(bot: Bot):
     """Действия при остановке бота"""
     await bot.delete_webhook(drop_pending_updates=True)
+    await dispose_engines()
     logger.info("Bot stopped")
 
-def create_app():
-    """Создание и настройка приложения"""
-    # Инициализация бота и диспетчера
-    bot = Bot(token=settings.BOT_TOKEN)
-    
-    # Redis для FSM Storage
+def create_storage() -> CompactRedisStorage:
+    """Redis для FSM Storage (msgpack, TTL по состояниям)"""
     redis_client = redis.Redis(
         host=settings.REDIS_HOST,
         port=settings.REDIS_PORT,
-        db=0,
-        decode_responses=True
+        db=0
     )
-    storage = RedisStorage(redis_client)
-    
-    dp = Dispatcher(storage=storage)
+    return CompactRedisStorage(redis_client)
+
+def create_dispatcher() -> Dispatcher:
+    """Создание диспетчера с middleware и роутерами"""
+    # Стандартный FSM middleware заменяем буферизующим:
+    # одно чтение и одна запись в Redis на апдейт
+    dp = Dispatcher(storage=create_storage(), disable_fsm=True)
+    dp.update.outer_middleware(BufferedFSMContextMiddleware(
+        storage=dp.fsm.storage,
+        strategy=dp.fsm.strategy,
+        events_isolation=dp.fsm.events_isolation
+    ))
+    # Все запросы сервисов за апдейт - в одной сессии и транзакции
+    dp.update.outer_middleware(UnitOfWorkMiddleware())
     
     # Регистрация middleware
+    # Flood control - outer, чтобы отсекать всплески до фильтров, БД и FSM-записей
+    throttling = ThrottlingMiddleware()
+    dp.message.outer_middleware(throttling)
+    dp.callback_query.outer_middleware(throttling)
     dp.message.middleware(SubscriptionMiddleware())
     
     # Регистрация роутеров
@@ -66,14 +83,24 @@ def create_app():
     dp.include_router(workout_router)
     dp.include_router(payment_router)
     
+    return dp
+
+def create_app():
+    """Создание и настройка приложения"""
+    # Инициализация бота и диспетчера
+    bot = Bot(token=settings.BOT_TOKEN)
+    dp = create_dispatcher()
+    
     # Регистрация startup/shutdown хендлеров
     dp.startup.register(on_startup)
     dp.shutdown.register(on_shutdown)
     
     # Создание веб-приложения для webhook
     app = web.Application()
-    webhook_handler = SimpleRequestHandler(dispatcher=dp, bot=bot)
+    # Ответ Telegram сразу, обработка - параллельно по чатам, по порядку внутри чата
+    webhook_handler = ChatOrderedRequestHandler(dispatcher=dp, bot=bot)
     webhook_handler.register(app, path="/webhook")
+    app.router.add_get("/metrics", metrics_handler)
     setup_application(app, dp, bot=bot)
     
     return app, bot, dp
@@ -81,36 +108,21 @@ def create_app():
 async def main():
     """Основная функция для polling режима (разработка)"""
     bot = Bot(token=settings.BOT_TOKEN)
-    
-    redis_client = redis.Redis(
-        host=settings.REDIS_HOST,
-        port=settings.REDIS_PORT,
-        db=0,
-        decode_responses=True
-    )
-    storage = RedisStorage(redis_client)
-    
-    dp = Dispatcher(storage=storage)
-    
-    # Регистрация middleware
-    dp.message.middleware(SubscriptionMiddleware())
-    
-    # Регистрация роутеров
-    dp.include_router(start_router)
-    dp.include_router(onboarding_router)
-    dp.include_router(daily_checkin_router)
-    dp.include_router(meal_plan_router)
-    dp.include_router(workout_router)
-    dp.include_router(payment_router)
+    dp = create_dispatcher()
     
     # Инициализация БД
     await init_db()
+    await workout_library.load()
     
     # Запуск polling
     await dp.start_polling(bot)
 
 if __name__ == "__main__":
-    if settings.USE_WEBHOOK:
+    if settings.USE_WEBHOOK and settings.BOT_SHARDS > 1:
+        # Production режим: приемник + N процессов-обработчиков
+        from sharding import run_sharded
+        run_sharded(settings.BOT_SHARDS)
+    elif settings.USE_WEBHOOK:
         # Production режим с webhook
         app, bot, dp = create_app()
         web.run_app(app, host="0.0.0.0", port=settings.WEBHOOK_PORT)
@@ -0,0 +1,23 @@
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from core.database import unit_of_work
+
+class UnitOfWorkMiddleware(BaseMiddleware):
+    """Одна сессия БД и одна транзакция на апдейт.
+
+    Хендлеры с долгими ожиданиями (тренировка, LLM) вызывают
+    release_unit_of_work(), чтобы не держать соединение пула.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        # Сессии сервисов присоединяются к этой через get_session()
+        async with unit_of_work() as session:
+            data["session"] = session
+            return await handler(event, data)
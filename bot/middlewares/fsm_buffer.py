@@ -0,0 +1,33 @@
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import Bot
+from aiogram.fsm.middleware import FSMContextMiddleware
+from aiogram.types import TelegramObject
+
+from states.context import BufferedFSMContext
+
+class BufferedFSMContextMiddleware(FSMContextMiddleware):
+    """FSM middleware: одно чтение и одна запись в storage на апдейт"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        bot: Bot = data["bot"]
+        context = self.resolve_event_context(bot, data)
+        data["fsm_storage"] = self.storage
+
+        if context is None:
+            return await handler(event, data)
+
+        async with self.events_isolation.lock(key=context.key):
+            state = BufferedFSMContext(storage=self.storage, key=context.key)
+            await state.load()
+            data.update({"state": state, "raw_state": await state.get_state()})
+
+            try:
+                return await handler(event, data)
+            finally:
+                # Изменения, сделанные до ошибки, сохраняются, как и без буфера
+                await state.flush()
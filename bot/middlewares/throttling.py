@@ -0,0 +1,143 @@
+import logging
+import time
+from typing import Callable, Dict, Any, Awaitable, Optional
+from aiogram import BaseMiddleware
+from aiogram.types import Message, CallbackQuery
+from prometheus_client import Counter
+
+from config import settings
+from core.redis_client import get_redis
+from states.user_states import OnboardingStates
+
+logger = logging.getLogger(__name__)
+
+THROTTLED_EVENTS = Counter(
+    "bot_throttled_events_total",
+    "События, отброшенные flood control",
+    ["action", "reason"]  # reason: duplicate, rate_limit
+)
+
+# Атомарная проверка за один запрос к Redis:
+# 1. повтор того же нажатия за dedupe_ms - склеиваем (возвращаем 2)
+# 2. скользящее окно событий пользователя по классу действий (возвращаем 1)
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local dedupe = tonumber(ARGV[5])
+
+if dedupe > 0 then
+    if not redis.call('SET', KEYS[2], '1', 'NX', 'PX', dedupe) then
+        return 2
+    end
+end
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, now - window)
+if redis.call('ZCARD', KEYS[1]) >= limit then
+    return 1
+end
+
+redis.call('ZADD', KEYS[1], now, ARGV[4])
+redis.call('PEXPIRE', KEYS[1], window)
+return 0
+"""
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Flood control: скользящее окно в Redis на пользователя и класс действий"""
+
+    # Лимиты по классам действий: (событий, окно в секундах)
+    RATE_LIMITS = {
+        "navigation": (8, 5),  # Переключение дней плана
+        "replacement": (3, 30),  # Замена блюда (AI)
+        "toggle": (12, 5),  # Переключатели ограничений в онбординге
+        "quick_log": (20, 10),  # Быстрая отметка воды
+        "callback": (15, 10),
+        "message": (20, 10)
+    }
+
+    # Повторное нажатие той же кнопки быстрее этого - дубль
+    DEDUPE_MS = 700
+
+    def __init__(self):
+        self._script = None
+
+    def _classify(self, event: Message | CallbackQuery, data: Dict[str, Any]) -> str:
+        """Класс действия события"""
+        if isinstance(event, Message):
+            return "message"
+
+        callback_data = event.data or ""
+
+        if callback_data.startswith("meal_day_"):
+            return "navigation"
+        if callback_data.startswith("replace_"):
+            return "replacement"
+        if callback_data.startswith("water_add_"):
+            return "quick_log"
+        if data.get("raw_state") == OnboardingStates.restrictions.state:
+            return "toggle"
+
+        return "callback"
+
+    async def _check(
+        self,
+        user_id: int,
+        action: str,
+        dedupe_token: Optional[str]
+    ) -> int:
+        """0 - пропустить, 1 - превышен лимит, 2 - дубль"""
+        limit, window = self.RATE_LIMITS[action]
+        now_ms = int(time.time() * 1000)
+
+        if self._script is None:
+            self._script = get_redis(settings.REDIS_CACHE_DB).register_script(
+                SLIDING_WINDOW_SCRIPT
+            )
+
+        return int(await self._script(
+            keys=[
+                f"throttle:{action}:{user_id}",
+                f"throttle:dedupe:{user_id}:{dedupe_token}"
+            ],
+            args=[
+                now_ms,
+                window * 1000,
+                limit,
+                f"{now_ms}:{time.perf_counter_ns()}",
+                self.DEDUPE_MS if dedupe_token else 0
+            ],
+            client=get_redis(settings.REDIS_CACHE_DB)
+        ))
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message | CallbackQuery,
+        data: Dict[str, Any]
+    ) -> Any:
+
+        if not event.from_user:
+            return await handler(event, data)
+
+        action = self._classify(event, data)
+        dedupe_token = event.data if isinstance(event, CallbackQuery) else None
+
+        try:
+            verdict = await self._check(event.from_user.id, action, dedupe_token)
+        except Exception as e:
+            # Недоступный Redis не должен блокировать бота
+            logger.warning(f"Throttling check failed: {e}")
+            return await handler(event, data)
+
+        if verdict == 0:
+            return await handler(event, data)
+
+        reason = "duplicate" if verdict == 2 else "rate_limit"
+        THROTTLED_EVENTS.labels(action, reason).inc()
+
+        # Отвечаем на callback без обращения к БД и FSM, чтобы убрать "часики"
+        if isinstance(event, CallbackQuery):
+            if verdict == 2:
+                await event.answer()
+            else:
+                await event.answer("Слишком часто, подожди пару секунд ⏳")
@@ -0,0 +1,276 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import time
+import zlib
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+import redis.asyncio as redis
+from aiogram import Bot
+from aiogram.methods import TelegramMethod
+from aiohttp import web
+from redis.exceptions import RedisError, ResponseError
+
+from config import settings
+from core.database import dispose_engines, init_db
+from core.metrics import mark_process_dead
+from core.workout_library import workout_library
+from webhook import ChatOrderedQueue, extract_order_key, metrics_handler
+
+logger = logging.getLogger(__name__)
+
+STREAM_PREFIX = "bot:updates"
+CONSUMER_GROUP = "bot-shards"
+READ_BATCH = 100  # Записей за один XREADGROUP
+# Паузы между повторами чтения при ошибках Redis, сек
+RETRY_BACKOFF_MIN = 0.5
+RETRY_BACKOFF_MAX = 30.0
+# Супервизор шардов: период проверки и пауза перед рестартом шарда,
+# упавшего быстрее SHARD_MIN_UPTIME (не крутим цикл падений)
+SHARD_CHECK_INTERVAL = 1.0
+SHARD_MIN_UPTIME = 10.0
+SHARD_RESTART_DELAY = 5.0
+
+def shard_for(update: Dict[str, Any], shards: int) -> int:
+    """Номер шарда апдейта: стабильный хеш от id чата.
+
+    Все апдейты одного чата попадают в один процесс - сохраняются
+    порядок и локальность FSM.
+    """
+    key = extract_order_key(update)
+    return zlib.crc32(str(key).encode("utf-8")) % shards
+
+def stream_key(shard: int) -> str:
+    return f"{STREAM_PREFIX}:{shard}"
+
+def _create_redis() -> redis.Redis:
+    return redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=0)
+
+def create_receiver_app(shards: int) -> web.Application:
+    """Приемник webhook: раскладывает апдейты по Redis Stream шардов"""
+    app = web.Application()
+    bot = Bot(token=settings.BOT_TOKEN)
+
+    async def handle_update(request: web.Request) -> web.Response:
+        body = await request.read()
+        try:
+            update = json.loads(body)
+        except ValueError:
+            logger.warning("Rejected webhook request with invalid JSON body")
+            return web.Response(status=400)
+
+        if not isinstance(update, dict):
+            return web.Response(status=400)
+
+        shard = shard_for(update, shards)
+
+        try:
+            await app["redis"].xadd(
+                stream_key(shard),
+                {"update": body},
+                maxlen=settings.BOT_SHARD_STREAM_MAXLEN,
+                approximate=True
+            )
+        except RedisError as e:
+            logger.error(f"Failed to enqueue update {update.get('update_id')}: {e}")
+            # Telegram повторит доставку позже
+            return web.Response(status=503)
+
+        return web.json_response({})
+
+    async def on_startup(app: web.Application):
+        app["redis"] = _create_redis()
+        await init_db()
+        # Приемник в БД не ходит - не держим соединения пула
+        await dispose_engines()
+        await bot.set_webhook(
+            url=f"{settings.WEBHOOK_URL}/webhook",
+            drop_pending_updates=True
+        )
+        logger.info(f"Webhook receiver started for {shards} shards")
+
+    async def on_shutdown(app: web.Application):
+        await bot.delete_webhook(drop_pending_updates=True)
+        await bot.session.close()
+        await app["redis"].aclose()
+
+    app.router.add_post("/webhook", handle_update)
+    # Метрики шардов - через общий PROMETHEUS_MULTIPROC_DIR
+    app.router.add_get("/metrics", metrics_handler)
+    app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
+
+    return app
+
+def _decode_entry(fields: Optional[Dict[bytes, bytes]]) -> Optional[Dict[str, Any]]:
+    """Апдейт из записи Stream; None - запись удалена обрезкой (MAXLEN) или битая"""
+    if not fields or b"update" not in fields:
+        return None
+
+    try:
+        update = json.loads(fields[b"update"])
+    except ValueError:
+        return None
+
+    return update if isinstance(update, dict) else None
+
+async def run_shard(shard: int) -> None:
+    """Обработчик одного шарда: читает свой Redis Stream и кормит диспетчер"""
+    from main import create_dispatcher
+
+    bot = Bot(token=settings.BOT_TOKEN)
+    dp = create_dispatcher()
+    redis_client = _create_redis()
+    # Шаблоны тренировок - в память процесса до первого апдейта
+    await workout_library.load()
+
+    stream = stream_key(shard)
+    consumer = f"shard-{shard}"
+
+    try:
+        await redis_client.xgroup_create(stream, CONSUMER_GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+    async def process(bot: Bot, update: Dict[str, Any]):
+        result = await dp.feed_raw_update(bot, update)
+        if isinstance(result, TelegramMethod):
+            await dp.silent_call_request(bot, result)
+
+    # Внутри шарда чаты по-прежнему обрабатываются параллельно
+    queue = ChatOrderedQueue(process)
+
+    # Сначала дочитываем свои неподтвержденные записи (после рестарта), затем новые
+    last_id = "0"
+    backoff = RETRY_BACKOFF_MIN
+    logger.info(f"Shard {shard} started")
+
+    try:
+        while True:
+            free = settings.WEBHOOK_MAX_PENDING - queue.pending
+            if free <= 0:
+                await asyncio.sleep(0.05)
+                continue
+
+            # Читаем не больше, чем примет очередь: отклоненная запись осталась бы
+            # в PEL до рестарта, а следующие апдейты ее чата обработались бы раньше
+            try:
+                response = await redis_client.xreadgroup(
+                    CONSUMER_GROUP,
+                    consumer,
+                    {stream: last_id},
+                    count=min(READ_BATCH, free),
+                    block=5000
+                )
+            except RedisError as e:
+                logger.error(f"Shard {shard} failed to read stream, retrying in {backoff:.1f}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, RETRY_BACKOFF_MAX)
+                continue
+
+            backoff = RETRY_BACKOFF_MIN
+            entries = response[0][1] if response else []
+
+            if last_id != ">":
+                if not entries:
+                    last_id = ">"
+                    continue
+                last_id = entries[-1][0]
+
+            for entry_id, fields in entries:
+                update = _decode_entry(fields)
+                if update is None:
+                    # Повтор не поможет: подтверждаем и пропускаем
+                    logger.error(f"Shard {shard} skipped undecodable stream entry {entry_id}")
+                    try:
+                        await redis_client.xack(stream, CONSUMER_GROUP, entry_id)
+                    except RedisError as e:
+                        logger.warning(f"Failed to ack stream entry {entry_id}: {e}")
+                    continue
+
+                accepted = queue.submit(
+                    bot,
+                    update,
+                    ack=partial(redis_client.xack, stream, CONSUMER_GROUP, entry_id)
+                )
+                if not accepted:
+                    # Не должно случиться: между чтением и submit очередь только
+                    # убывает. Супервизор перезапустит шард, тот дочитает PEL по порядку
+                    raise RuntimeError(f"Shard queue rejected stream entry {entry_id}")
+    finally:
+        await queue.close()
+        await bot.session.close()
+        await redis_client.aclose()
+
+def run_shard_process(shard: int) -> None:
+    """Точка входа процесса-шарда"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s - shard {shard} - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(run_shard(shard))
+
+async def supervise_shards(
+    processes: List[multiprocessing.Process],
+    start_shard: Callable[[int], multiprocessing.Process]
+) -> None:
+    """Перезапуск упавших процессов-шардов.
+
+    Без шарда его доля чатов остается без ответов, а приемник продолжает
+    писать в его Stream. Новый процесс дочитывает PEL с начала.
+    """
+    started = [time.monotonic()] * len(processes)
+
+    while True:
+        await asyncio.sleep(SHARD_CHECK_INTERVAL)
+
+        for shard, process in enumerate(processes):
+            if process.is_alive():
+                continue
+
+            process.join()
+            mark_process_dead(process.pid)
+            logger.error(f"Shard {shard} exited with code {process.exitcode}, restarting")
+
+            if time.monotonic() - started[shard] < SHARD_MIN_UPTIME:
+                await asyncio.sleep(SHARD_RESTART_DELAY)
+
+            processes[shard] = start_shard(shard)
+            started[shard] = time.monotonic()
+
+def run_sharded(shards: int) -> None:
+    """Запуск приемника webhook и N процессов-обработчиков под супервизором"""
+    context = multiprocessing.get_context("spawn")
+
+    def start_shard(shard: int) -> multiprocessing.Process:
+        process = context.Process(
+            target=run_shard_process, args=(shard,), name=f"bot-shard-{shard}", daemon=True
+        )
+        process.start()
+        return process
+
+    processes = [start_shard(shard) for shard in range(shards)]
+
+    app = create_receiver_app(shards)
+
+    async def start_supervisor(app: web.Application):
+        app["supervisor"] = asyncio.create_task(supervise_shards(processes, start_shard))
+
+    async def stop_supervisor(app: web.Application):
+        app["supervisor"].cancel()
+
+    app.on_startup.append(start_supervisor)
+    app.on_shutdown.append(stop_supervisor)
+
+    try:
+        web.run_app(app, host="0.0.0.0", port=settings.WEBHOOK_PORT)
+    finally:
+        # Необработанные записи останутся в Stream и будут дочитаны после рестарта
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+            mark_process_dead(process.pid)
@@ -0,0 +1,83 @@
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from states.storage import CompactRedisStorage
+
+class BufferedFSMContext(FSMContext):
+    """FSMContext, который читает состояние и данные один раз за апдейт.
+
+    Все изменения копятся в памяти и записываются методом flush
+    одной транзакцией после завершения хендлера.
+    """
+
+    def __init__(self, storage: BaseStorage, key: StorageKey):
+        super().__init__(storage=storage, key=key)
+        self._state: Optional[str] = None
+        self._data: Dict[str, Any] = {}
+        self._state_changed = False
+        self._data_changed = False
+
+    async def load(self) -> None:
+        """Загрузить состояние и данные из storage"""
+        if isinstance(self.storage, CompactRedisStorage):
+            self._state, self._data = await self.storage.get_snapshot(self.key)
+        else:
+            self._state = await self.storage.get_state(self.key)
+            self._data = await self.storage.get_data(self.key)
+
+        self._state_changed = False
+        self._data_changed = False
+
+    async def set_state(self, state: StateType = None) -> None:
+        self._state = state.state if isinstance(state, State) else state
+        self._state_changed = True
+
+    async def get_state(self) -> Optional[str]:
+        return self._state
+
+    async def set_data(self, data: Dict[str, Any]) -> None:
+        self._data = data.copy()
+        self._data_changed = True
+
+    async def get_data(self) -> Dict[str, Any]:
+        return self._data.copy()
+
+    async def update_data(
+        self,
+        data: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> Dict[str, Any]:
+        if data:
+            kwargs.update(data)
+        self._data.update(kwargs)
+        self._data_changed = True
+        return self._data.copy()
+
+    async def clear(self) -> None:
+        await self.set_state(None)
+        await self.set_data({})
+
+    async def flush(self) -> None:
+        """Записать накопленные изменения в storage"""
+        if not self._state_changed and not self._data_changed:
+            return
+
+        if isinstance(self.storage, CompactRedisStorage):
+            await self.storage.apply(
+                self.key,
+                self._state,
+                self._data,
+                state_changed=self._state_changed,
+                data_changed=self._data_changed
+            )
+        else:
+            if self._state_changed:
+                await self.storage.set_state(self.key, self._state)
+            if self._data_changed:
+                await self.storage.set_data(self.key, self._data)
+
+        self._state_changed = False
+        self._data_changed = False
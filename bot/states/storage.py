@@ -0,0 +1,200 @@
+import json
+import zlib
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Tuple
+
+import msgpack
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StateType, StorageKey
+from aiogram.fsm.storage.redis import KeyBuilder, RedisStorage
+from prometheus_client import Counter, Histogram
+from redis.asyncio import Redis
+
+from config import settings
+
+FSM_PAYLOAD_BYTES = Histogram(
+    "fsm_payload_bytes",
+    "Размер сохраняемых FSM-данных",
+    ["encoding"],  # msgpack, zlib
+    buckets=(64, 256, 1024, 4096, 16384, 65536, 262144)
+)
+FSM_COMPRESSION_SAVED_BYTES = Counter(
+    "fsm_compression_saved_bytes_total",
+    "Байты, сэкономленные сжатием FSM-данных"
+)
+
+# Префикс формата: 0x00 - msgpack, 0x01 - msgpack + zlib.
+# Старые данные RedisStorage в JSON начинаются с "{"
+_FORMAT_MSGPACK = b"\x00"
+_FORMAT_ZLIB = b"\x01"
+
+_EXT_DATETIME = 1
+_EXT_DATE = 2
+
+# TTL данных выравнивается по TTL состояния за один запрос
+_SET_DATA_SCRIPT = """
+local ttl = redis.call('TTL', KEYS[1])
+if ttl < 1 then
+    ttl = tonumber(ARGV[2])
+end
+redis.call('SET', KEYS[2], ARGV[1], 'EX', ttl)
+return ttl
+"""
+
+def _encode_ext(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return msgpack.ExtType(_EXT_DATETIME, value.isoformat().encode("utf-8"))
+    if isinstance(value, date):
+        return msgpack.ExtType(_EXT_DATE, value.isoformat().encode("utf-8"))
+    raise TypeError(f"Cannot serialize {type(value).__name__} to FSM storage")
+
+def _decode_ext(code: int, data: bytes) -> Any:
+    if code == _EXT_DATETIME:
+        return datetime.fromisoformat(data.decode("utf-8"))
+    if code == _EXT_DATE:
+        return date.fromisoformat(data.decode("utf-8"))
+    return msgpack.ExtType(code, data)
+
+class CompactRedisStorage(RedisStorage):
+    """FSM storage: msgpack + zlib для больших данных, TTL по группе состояний.
+
+    Redis-клиент должен работать с bytes (decode_responses=False).
+    """
+
+    # TTL (сек) по группам состояний: брошенные сценарии не живут вечно
+    STATE_TTLS = {
+        "OnboardingStates": 3 * 24 * 3600,
+        "CheckInStates": 12 * 3600,
+        "MealPlanStates": 6 * 3600,
+        "WorkoutStates": 3 * 3600,
+        "PaymentStates": 3600
+    }
+
+    def __init__(
+        self,
+        redis: Redis,
+        key_builder: Optional[KeyBuilder] = None,
+        default_ttl: int = settings.FSM_DEFAULT_TTL,
+        compress_threshold: int = settings.FSM_COMPRESS_THRESHOLD
+    ):
+        super().__init__(
+            redis=redis,
+            key_builder=key_builder,
+            state_ttl=default_ttl,
+            data_ttl=default_ttl
+        )
+        self.default_ttl = default_ttl
+        self.compress_threshold = compress_threshold
+        self._set_data_script = redis.register_script(_SET_DATA_SCRIPT)
+
+    def ttl_for_state(self, state: Optional[str]) -> int:
+        """TTL для состояния по его группе"""
+        if not state:
+            return self.default_ttl
+        return self.STATE_TTLS.get(state.split(":", 1)[0], self.default_ttl)
+
+    def encode(self, data: Dict[str, Any]) -> bytes:
+        """Сериализация данных FSM"""
+        packed = msgpack.packb(data, default=_encode_ext, use_bin_type=True)
+
+        if len(packed) >= self.compress_threshold:
+            compressed = zlib.compress(packed, 6)
+            if len(compressed) < len(packed):
+                FSM_COMPRESSION_SAVED_BYTES.inc(len(packed) - len(compressed))
+                FSM_PAYLOAD_BYTES.labels("zlib").observe(len(compressed) + 1)
+                return _FORMAT_ZLIB + compressed
+
+        FSM_PAYLOAD_BYTES.labels("msgpack").observe(len(packed) + 1)
+        return _FORMAT_MSGPACK + packed
+
+    def decode(self, value: bytes) -> Dict[str, Any]:
+        """Десериализация данных FSM (включая старый JSON-формат)"""
+        prefix, payload = value[:1], value[1:]
+
+        if prefix == _FORMAT_ZLIB:
+            payload = zlib.decompress(payload)
+        elif prefix != _FORMAT_MSGPACK:
+            return json.loads(value)
+
+        return msgpack.unpackb(payload, ext_hook=_decode_ext, raw=False)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state_key = self.key_builder.build(key, "state")
+
+        if state is None:
+            await self.redis.delete(state_key)
+            return
+
+        value = state.state if isinstance(state, State) else state
+        ttl = self.ttl_for_state(value)
+
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.set(state_key, value, ex=ttl)
+        pipe.expire(self.key_builder.build(key, "data"), ttl)
+        await pipe.execute()
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        data_key = self.key_builder.build(key, "data")
+
+        if not data:
+            await self.redis.delete(data_key)
+            return
+
+        await self._set_data_script(
+            keys=[self.key_builder.build(key, "state"), data_key],
+            args=[self.encode(data), self.default_ttl]
+        )
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        value = await self.redis.get(self.key_builder.build(key, "data"))
+
+        if value is None:
+            return {}
+
+        return self.decode(value)
+
+    async def get_snapshot(self, key: StorageKey) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Состояние и данные за один round trip"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get(self.key_builder.build(key, "state"))
+        pipe.get(self.key_builder.build(key, "data"))
+        state, data = await pipe.execute()
+
+        if isinstance(state, bytes):
+            state = state.decode("utf-8")
+
+        return state, self.decode(data) if data is not None else {}
+
+    async def apply(
+        self,
+        key: StorageKey,
+        state: Optional[str],
+        data: Dict[str, Any],
+        state_changed: bool = True,
+        data_changed: bool = True
+    ) -> None:
+        """Записать изменения состояния и данных одной транзакцией"""
+        if not state_changed and not data_changed:
+            return
+
+        state_key = self.key_builder.build(key, "state")
+        data_key = self.key_builder.build(key, "data")
+        ttl = self.ttl_for_state(state)
+
+        pipe = self.redis.pipeline(transaction=True)
+
+        if state_changed:
+            if state is None:
+                pipe.delete(state_key)
+            else:
+                pipe.set(state_key, state, ex=ttl)
+
+        if data_changed:
+            if data:
+                pipe.set(data_key, self.encode(data), ex=ttl)
+            else:
+                pipe.delete(data_key)
+        elif state is not None:
+            pipe.expire(data_key, ttl)
+
+        await pipe.execute()
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from config import settings
+from core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = Counter(
+    "ai_cache_requests_total",
+    "Обращения к кешу ответов AI",
+    ["namespace", "result"]  # result: local_hit, redis_hit, miss, error
+)
+CACHE_STORES = Counter(
+    "ai_cache_stores_total",
+    "Попытки записи в кеш ответов AI",
+    ["namespace", "result"]  # result: stored, too_large, error
+)
+CACHE_LOCAL_ENTRIES = Gauge(
+    "ai_cache_local_entries",
+    "Количество записей в локальном LRU",
+    ["namespace"]
+)
+CACHE_LOOKUP_SECONDS = Histogram(
+    "ai_cache_lookup_seconds",
+    "Время поиска в кеше ответов AI",
+    ["namespace"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+)
+
+class AIResponseCache:
+    """Content-addressed кеш ответов LLM.
+
+    Ключ - sha256 от нормализованных входных данных промпта.
+    Два уровня: LRU в памяти процесса и Redis с TTL.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: int = settings.AI_CACHE_TTL,
+        max_local_entries: int = settings.AI_CACHE_MAX_LOCAL_ENTRIES,
+        max_value_bytes: int = settings.AI_CACHE_MAX_VALUE_BYTES
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_local_entries = max_local_entries
+        self.max_value_bytes = max_value_bytes
+        self._local: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def make_key(self, payload: Dict[str, Any]) -> str:
+        """Ключ кеша по нормализованным входным данным"""
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+        return f"ai:{self.namespace}:{digest}"
+
+    async def get(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Получить ответ из кеша (None при промахе)"""
+        key = self.make_key(payload)
+        started = time.perf_counter()
+
+        try:
+            value = self._get_local(key)
+            if value is not None:
+                CACHE_REQUESTS.labels(self.namespace, "local_hit").inc()
+                return value
+
+            try:
+                raw = await get_redis(settings.REDIS_CACHE_DB).get(key)
+            except Exception as e:
+                # Недоступный Redis не должен ломать генерацию
+                logger.warning(f"AI cache read failed: {e}")
+                CACHE_REQUESTS.labels(self.namespace, "error").inc()
+                return None
+
+            if raw is None:
+                CACHE_REQUESTS.labels(self.namespace, "miss").inc()
+                return None
+
+            value = json.loads(raw)
+            self._set_local(key, value)
+            CACHE_REQUESTS.labels(self.namespace, "redis_hit").inc()
+            return value
+        finally:
+            CACHE_LOOKUP_SECONDS.labels(self.namespace).observe(time.perf_counter() - started)
+
+    async def set(self, payload: Dict[str, Any], value: Dict[str, Any]) -> None:
+        """Сохранить ответ в кеш"""
+        key = self.make_key(payload)
+        raw = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+        if len(raw) > self.max_value_bytes:
+            CACHE_STORES.labels(self.namespace, "too_large").inc()
+            return
+
+        self._set_local(key, value)
+
+        try:
+            await get_redis(settings.REDIS_CACHE_DB).set(key, raw, ex=self.ttl)
+            CACHE_STORES.labels(self.namespace, "stored").inc()
+        except Exception as e:
+            logger.warning(f"AI cache write failed: {e}")
+            CACHE_STORES.labels(self.namespace, "error").inc()
+
+    def _get_local(self, key: str) -> Optional[Dict[str, Any]]:
+        """Чтение из локального LRU с учетом TTL"""
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._local[key]
+            CACHE_LOCAL_ENTRIES.labels(self.namespace).set(len(self._local))
+            return None
+
+        self._local.move_to_end(key)
+        return value
+
+    def _set_local(self, key: str, value: Dict[str, Any]) -> None:
+        """Запись в локальный LRU с вытеснением старых записей"""
+        self._local[key] = (time.monotonic() + self.ttl, value)
+        self._local.move_to_end(key)
+
+        while len(self._local) > self.max_local_entries:
+            self._local.popitem(last=False)
+
+        CACHE_LOCAL_ENTRIES.labels(self.namespace).set(len(self._local))
@@ -1,8 +1,31 @@
-import openai
+import asyncio
 import base64
-from typing import Dict, Any, List
+import weakref
+from typing import Dict, Any, List, Optional
 import aiohttp
 from config import settings
+from utils.ai_cache import AIResponseCache
+
+meal_replacement_cache = AIResponseCache("meal_replacement")
+
+# Клиент на event loop: Celery-задачи запускают новый loop на каждый вызов
+_openai_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+WORKOUT_ADVICE_FALLBACK = (
+    "Отличная работа! Продолжай в том же духе и не забывай про регулярность тренировок!"
+)
+
+def get_openai_client():
+    """Клиент OpenAI (SDK импортируется при первом обращении, не при старте)"""
+    loop = asyncio.get_running_loop()
+    client = _openai_clients.get(loop)
+    
+    if client is None:
+        import openai
+        client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        _openai_clients[loop] = client
+    
+    return client
 
 async def analyze_food_photo(photo_url: str) -> Dict[str, Any]:
     """Анализ фото еды с помощью AI"""
@@ -15,7 +38,7 @@ async def analyze_food_photo(photo_url: str) -> Dict[str, Any]:
                 base64_image = base64.b64encode(image_data).decode('utf-8')
         
         # Отправка в OpenAI Vision API (или другой сервис)
-        client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        client = get_openai_client()
         
         response = await client.chat.completions.create(
             model="gpt-4-vision-preview",
@@ -59,11 +82,56 @@ async def analyze_food_photo(photo_url: str) -> Dict[str, Any]:
             "advice": "Не удалось проанализировать фото. Попробуй сделать фото при лучшем освещении."
         }
 
-async def generate_meal_replacement(
+def _normalize_text(text: str) -> str:
+    """Нормализация текста для ключа кеша"""
+    return " ".join(str(text).lower().replace("ё", "е").split())
+
+def _round_to(value: Any, step: int) -> int:
+    """Округление значения до шага (бакеты КБЖУ для ключа кеша)"""
+    try:
+        return int(round(float(value) / step) * step)
+    except (TypeError, ValueError):
+        return 0
+
+def _meal_replacement_cache_payload(
     meal_data: Dict[str, Any],
     replacement_type: str
+) -> Dict[str, Any]:
+    """Нормализованные входные данные промпта замены блюда.
+    
+    КБЖУ округляются до бакетов: у пользователей с близкими
+    калориями одно и то же блюдо попадает в один ключ.
+    """
+    return {
+        "name": _normalize_text(meal_data['name']),
+        "calories": _round_to(meal_data['calories'], 25),
+        "protein": _round_to(meal_data['protein'], 5),
+        "carbs": _round_to(meal_data['carbs'], 5),
+        "fats": _round_to(meal_data['fats'], 5),
+        "replacement_type": _normalize_text(replacement_type)
+    }
+
+async def get_cached_meal_replacement(
+    meal_data: Dict[str, Any],
+    replacement_type: str
+) -> Optional[Dict[str, Any]]:
+    """Замена блюда из кеша без обращения к модели"""
+    return await meal_replacement_cache.get(
+        _meal_replacement_cache_payload(meal_data, replacement_type)
+    )
+
+async def generate_meal_replacement(
+    meal_data: Dict[str, Any],
+    replacement_type: str,
+    check_cache: bool = True
 ) -> Dict[str, Any]:
     """Генерация замены блюда"""
+    cache_payload = _meal_replacement_cache_payload(meal_data, replacement_type)
+    
+    if check_cache:
+        cached = await meal_replacement_cache.get(cache_payload)
+        if cached is not None:
+            return cached
     
     prompt = f"""
     Текущее блюдо:
@@ -84,7 +152,7 @@ async def generate_meal_replacement(
     """
     
     try:
-        client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        client = get_openai_client()
         
         response = await client.chat.completions.create(
             model="gpt-4-turbo-preview",
@@ -96,7 +164,7 @@ async def generate_meal_replacement(
         )
         
         import json
-        return json.loads(response.choices[0].message.content)
+        replacement = json.loads(response.choices[0].message.content)
         
     except Exception as e:
         print(f"Error generating replacement: {e}")
@@ -110,6 +178,10 @@ async def generate_meal_replacement(
             "ingredients": ["Продукт 1", "Продукт 2"],
             "recipe": "Простой рецепт приготовления..."
         }
+    
+    # Заглушку при ошибке не кешируем - только реальные ответы модели
+    await meal_replacement_cache.set(cache_payload, replacement)
+    return replacement
 
 async def generate_workout_advice(user_data: Dict[str, Any]) -> str:
     """Генерация советов по тренировкам"""
@@ -125,7 +197,7 @@ async def generate_workout_advice(user_data: Dict[str, Any]) -> str:
     """
     
     try:
-        client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        client = get_openai_client()
         
         response = await client.chat.completions.create(
             model="gpt-3.5-turbo",
@@ -139,4 +211,4 @@ async def generate_workout_advice(user_data: Dict[str, Any]) -> str:
         return response.choices[0].message.content
         
     except Exception:
-        return "Отличная работа! Продолжай в том же духе и не забывай про регулярность тренировок!"
+        return WORKOUT_ADVICE_FALLBACK
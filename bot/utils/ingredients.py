@@ -0,0 +1,144 @@
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+OTHER_CATEGORY = "Другое"
+
+# Основы слов по категориям. Основа сопоставляется с началом слова
+# названия, поэтому покрывает падежи и числа: "помидор" -> помидоры, помидоров.
+# Основы подобраны так, чтобы не пересекаться с другими продуктами
+# ("куриц", а не "кур", иначе попадет "курага"). Основы из нескольких слов
+# ("масло сливоч") разрешают сочетания, где побеждало бы прилагательное.
+INGREDIENT_STEMS: Dict[str, Tuple[str, ...]] = {
+    "Мясо/Рыба": (
+        # Птица
+        "куриц", "курин", "цыпл", "бройлер", "грудк", "бедр", "окорочк", "крыл",
+        "индейк", "индюш", "утк", "утин", "гус", "перепел",
+        # Мясо
+        "говяд", "телят", "телячь", "свин", "баран", "ягнят", "ягнен", "кролик", "крольч",
+        "фарш", "вырезк", "филе", "стейк", "мяс", "ветчин", "бекон", "колбас",
+        "сосис", "сардельк", "печень", "печени", "печенк", "язык", "котлет", "тефтел", "фрикадел",
+        # Рыба и морепродукты
+        "рыб", "лосос", "семг", "форел", "горбуш", "кет", "нерк", "тунц", "тунец",
+        "треск", "минта", "хек", "судак", "щук", "карп", "окун", "скумбр", "сельд",
+        "селедк", "сардин", "килек", "кильк", "шпрот", "дорадо", "сибас", "тилапи",
+        "пангасиус", "палтус", "камбал", "кревет", "кальмар", "миди", "устриц",
+        "краб", "гребеш", "осьминог", "икр"
+    ),
+    "Молочные": (
+        "молок", "молоч", "кефир", "ряженк", "простокваш", "айран",
+        "йогурт", "творог", "творож", "сыр", "брынз", "фет", "моцарел", "пармезан",
+        "рикотт", "маскарпон", "сметан", "сливк", "сливоч",
+        "яйц", "яиц", "яичн", "яйца курин", "яйцо курин", "яйца перепел",
+        "масло сливоч", "сливочное масл", "белок", "желтк", "протеин", "казеин"
+    ),
+    "Овощи": (
+        "помидор", "томат", "черри", "огур", "капуст", "брокк", "цветн",
+        "брюссел", "кольраби", "морков", "лук", "порей", "чеснок", "чесноч",
+        "картоф", "картош", "батат", "свекл", "свёкл", "редис", "редьк", "репа",
+        "тыкв", "кабач", "цукин", "баклажан", "перец", "перц", "паприк",
+        "сельдер", "шпинат", "салат", "руккол", "айсберг", "романо", "латук",
+        "укроп", "петрушк", "кинз", "базилик", "щавел", "спарж", "фасол",
+        "горох", "горош", "нут", "чечевиц", "кукуруз", "гриб", "шампиньон",
+        "вешенк", "опят", "авокадо", "оливк", "маслин", "зелень", "зелени", "имбир",
+        "овощ"
+    ),
+    "Фрукты": (
+        "яблок", "яблоч", "банан", "апельсин", "мандарин", "грейпфрут",
+        "лимон", "лайм", "груш", "персик", "нектарин", "абрикос", "слив",
+        "вишн", "черешн", "виноград", "киви", "ананас", "манго", "папай",
+        "гранат", "хурм", "инжир", "финик", "дын", "арбуз", "ягод", "клубник",
+        "землян", "малин", "черник", "голубик", "брусник", "клюкв", "смородин",
+        "крыжовник", "ежевик", "облепих", "фрукт"
+    ),
+    "Крупы": (
+        "рис", "гречк", "гречнев", "овсян", "овес", "овёс", "геркулес", "мюсли",
+        "гранол", "хлопь", "пшен", "перловк", "перлов", "булгур", "кускус",
+        "киноа", "манк", "манн", "ячнев", "полб", "макарон", "спагетти", "паст",
+        "лапш", "феттучин", "пенне", "хлеб", "батон", "багет", "лаваш", "тортиль",
+        "хлебц", "сухар", "мук", "отруб", "крахмал"
+    ),
+    "Орехи/Сухофрукты": (
+        "орех", "миндал", "фундук", "кешью", "фисташ", "арахис", "пекан",
+        "макадами", "семечк", "семен", "кунжут", "льнян", "чиа",
+        "изюм", "курага", "чернослив", "сухофрукт", "цукат"
+    ),
+    "Бакалея": (
+        "масл", "оливков", "подсолнеч", "соус", "кетчуп", "майонез", "горчиц",
+        "уксус", "соев", "песто", "хумус", "тахин", "мед", "мёд", "сахар",
+        "сироп", "джем", "варень", "шоколад", "какао", "кофе", "чай", "соль",
+        "специ", "приправ", "корица", "куркум", "ваниль", "разрыхлит", "дрожж",
+        "бульон", "консерв", "печенье", "печенья", "пряник", "зефир", "пастил"
+    )
+}
+
+# Порядок вывода категорий в списке покупок
+CATEGORY_ORDER = list(INGREDIENT_STEMS) + [OTHER_CATEGORY]
+
+_WORD_RE = re.compile(r"[a-zа-я]+")
+
+class _StemTrie:
+    """Префиксное дерево основ слов"""
+
+    __slots__ = ("root",)
+
+    def __init__(self, stems: Dict[str, Iterable[str]]):
+        # Узел: символ -> дочерний узел, ключ "" - категория основы, оканчивающейся в узле
+        self.root: Dict = {}
+        for category, category_stems in stems.items():
+            for stem in category_stems:
+                self._insert(_normalize(stem), category)
+
+    def _insert(self, stem: str, category: str) -> None:
+        node = self.root
+        for char in stem:
+            node = node.setdefault(char, {})
+        # Первая категория побеждает при дублях основ
+        node.setdefault("", category)
+
+    def longest_match(self, text: str, start: int) -> Tuple[int, Optional[str]]:
+        """Самая длинная основа, начинающаяся с позиции start"""
+        node = self.root
+        best_length, best_category = 0, None
+
+        for length, char in enumerate(text[start:], 1):
+            node = node.get(char)
+            if node is None:
+                break
+            category = node.get("")
+            if category is not None:
+                best_length, best_category = length, category
+
+        return best_length, best_category
+
+def _normalize(text: str) -> str:
+    return text.lower().replace("ё", "е")
+
+# Дерево строится один раз при импорте
+_TRIE = _StemTrie(INGREDIENT_STEMS)
+
+@lru_cache(maxsize=4096)
+def categorize_ingredient(name: str) -> str:
+    """Категория продукта по названию.
+
+    Дерево обходится от начала каждого слова. Побеждает самая длинная
+    основа, при равенстве - основа из более раннего слова.
+    """
+    text = " ".join(_WORD_RE.findall(_normalize(name)))
+    best_length, best_category = 0, None
+
+    for match in _WORD_RE.finditer(text):
+        length, category = _TRIE.longest_match(text, match.start())
+        if length > best_length:
+            best_length, best_category = length, category
+
+    return best_category or OTHER_CATEGORY
+
+def categorize_shopping_list(items: Dict[str, str]) -> Dict[str, List[str]]:
+    """Разложить список покупок {продукт: количество} по категориям за один проход"""
+    categorized: Dict[str, List[str]] = {category: [] for category in CATEGORY_ORDER}
+
+    for item, amount in items.items():
+        categorized[categorize_ingredient(item)].append(f"• {item}: {amount}")
+
+    return categorized
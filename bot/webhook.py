@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set, Tuple
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+from prometheus_client import Counter, Gauge, Histogram
+
+from config import settings
+from core.metrics import render_metrics
+
+logger = logging.getLogger(__name__)
+
+PENDING_UPDATES = Gauge(
+    "webhook_pending_updates",
+    "Апдейты в очередях (ожидают и выполняются)"
+)
+ACTIVE_CHATS = Gauge(
+    "webhook_active_chats",
+    "Чаты с непустой очередью"
+)
+CHAT_QUEUE_DEPTH = Histogram(
+    "webhook_chat_queue_depth",
+    "Глубина очереди чата в момент постановки апдейта",
+    buckets=(1, 2, 3, 5, 10, 20, 50)
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "webhook_queue_wait_seconds",
+    "Время от получения апдейта до начала обработки"
+)
+UPDATE_SECONDS = Histogram(
+    "webhook_update_seconds",
+    "Время обработки апдейта"
+)
+REJECTED_UPDATES = Counter(
+    "webhook_rejected_updates_total",
+    "Апдейты, отклоненные из-за переполнения очередей"
+)
+
+_QueueItem = Tuple[Bot, Dict[str, Any], Optional[Callable[[], Awaitable[Any]]], float]
+
+# Поля апдейта, из которых берем чат (или пользователя) для упорядочивания
+_CHAT_FIELDS = (
+    "message",
+    "edited_message",
+    "channel_post",
+    "edited_channel_post",
+    "my_chat_member",
+    "chat_member",
+    "chat_join_request"
+)
+_USER_FIELDS = (
+    "callback_query",
+    "inline_query",
+    "chosen_inline_result",
+    "shipping_query",
+    "pre_checkout_query",
+    "poll_answer"
+)
+
+def extract_order_key(update: Dict[str, Any]) -> Any:
+    """Ключ упорядочивания апдейта: id чата, иначе id пользователя"""
+    for field in _CHAT_FIELDS:
+        event = update.get(field)
+        if event and event.get("chat"):
+            return event["chat"]["id"]
+
+    for field in _USER_FIELDS:
+        event = update.get(field)
+        if not event:
+            continue
+        # Callback от сообщения в чате - упорядочиваем вместе с сообщениями чата
+        message = event.get("message")
+        if message and message.get("chat"):
+            return message["chat"]["id"]
+        user = event.get("from") or event.get("user")
+        if user:
+            return user["id"]
+
+    # Апдейт без чата и пользователя - порядок не важен
+    return ("update", update.get("update_id"))
+
+class ChatOrderedQueue:
+    """Очереди апдейтов по чатам.
+
+    Разные чаты обрабатываются параллельно (не более max_concurrency
+    одновременно), апдейты одного чата - строго по очереди.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[Bot, Dict[str, Any]], Awaitable[Any]],
+        max_concurrency: int = settings.WEBHOOK_MAX_CONCURRENCY,
+        max_pending: int = settings.WEBHOOK_MAX_PENDING
+    ):
+        self._process = process
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._max_pending = max_pending
+        self._queues: Dict[Any, Deque[_QueueItem]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def submit(
+        self,
+        bot: Bot,
+        update: Dict[str, Any],
+        ack: Optional[Callable[[], Awaitable[Any]]] = None
+    ) -> bool:
+        """Поставить апдейт в очередь его чата (False при переполнении).
+
+        ack вызывается после обработки апдейта (например, XACK в Redis Stream).
+        """
+        if self._pending >= self._max_pending:
+            REJECTED_UPDATES.inc()
+            return False
+
+        key = extract_order_key(update)
+        item = (bot, update, ack, time.perf_counter())
+        self._pending += 1
+
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = deque([item])
+            self._queues[key] = queue
+            task = asyncio.create_task(self._drain(key, queue))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            queue.append(item)
+
+        CHAT_QUEUE_DEPTH.observe(len(queue))
+        self._update_gauges()
+        return True
+
+    async def _drain(self, key: Any, queue: Deque[_QueueItem]) -> None:
+        """Последовательная обработка очереди одного чата"""
+        try:
+            while queue:
+                # Апдейт остается в очереди до конца обработки, чтобы новые
+                # апдейты этого чата вставали за ним, а не запускали второй воркер
+                bot, update, ack, received_at = queue[0]
+
+                async with self._semaphore:
+                    started = time.perf_counter()
+                    QUEUE_WAIT_SECONDS.observe(started - received_at)
+                    try:
+                        await self._process(bot, update)
+                    except Exception:
+                        logger.exception(f"Failed to process update {update.get('update_id')}")
+                    finally:
+                        UPDATE_SECONDS.observe(time.perf_counter() - started)
+
+                if ack is not None:
+                    try:
+                        await ack()
+                    except Exception:
+                        logger.exception(f"Failed to ack update {update.get('update_id')}")
+
+                queue.popleft()
+                self._pending -= 1
+                self._update_gauges()
+        finally:
+            if self._queues.get(key) is queue:
+                del self._queues[key]
+            self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        PENDING_UPDATES.set(self._pending)
+        ACTIVE_CHATS.set(len(self._queues))
+
+    async def close(self, timeout: Optional[float] = 30) -> None:
+        """Дождаться обработки уже принятых апдейтов"""
+        if not self._tasks:
+            return
+
+        done, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        if pending:
+            logger.warning(f"Shutdown with {self._pending} unprocessed updates")
+            for task in pending:
+                task.cancel()
+
+class ChatOrderedRequestHandler(SimpleRequestHandler):
+    """Webhook-хендлер: сразу отвечает Telegram и обрабатывает апдейт в очереди чата"""
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        max_concurrency: int = settings.WEBHOOK_MAX_CONCURRENCY,
+        max_pending: int = settings.WEBHOOK_MAX_PENDING,
+        **data: Any
+    ):
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=True, **data)
+        self.queue = ChatOrderedQueue(
+            self._background_feed_update,
+            max_concurrency=max_concurrency,
+            max_pending=max_pending
+        )
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        update = await request.json(loads=bot.session.json_loads)
+
+        if not self.queue.submit(bot, update):
+            # Telegram повторит доставку позже
+            return web.Response(status=503)
+
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def close(self) -> None:
+        # Сначала дорабатываем очереди, потом закрываем сессию бота
+        await self.queue.close()
+        await super().close()
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    """GET /metrics для Prometheus"""
+    body, content_type = render_metrics()
+    return web.Response(body=body, headers={"Content-Type": content_type})
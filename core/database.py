@@ -1,55 +1,511 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from sqlalchemy import event, inspect, text
+from sqlalchemy.exc import DBAPIError
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Awaitable, Callable, List, Optional
+from uuid import uuid4
+import asyncio
 import logging
+import os
+import time
+import weakref
+
+from prometheus_client import Counter, Gauge, Histogram
 
 from config import settings
+from core.query_metrics import instrument_engine
 
 logger = logging.getLogger(__name__)
 
-# Создание движка БД
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=False,  # True для отладки SQL запросов
-    pool_size=20,
-    max_overflow=40,
-    pool_pre_ping=True,  # Проверка соединения перед использованием
-)
+# Пул на процесс по роли. uvicorn и Celery запускают несколько процессов:
+# соединений с Postgres до processes × (pool_size + max_overflow)
+POOL_PRESETS = {
+    "bot": {"pool_size": 10, "max_overflow": 10, "pool_timeout": 30},
+    "api": {"pool_size": 5, "max_overflow": 5, "pool_timeout": 10},
+    # Celery: asyncio.run на задачу - пул не переживает event loop задачи
+    "worker": {"poolclass": NullPool},
+    "script": {"poolclass": NullPool}
+}
 
-# Создание фабрики сессий
-async_session_maker = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Ожидание соединения из пула (с открытием нового, если пул не заполнен)",
+    ["role", "target"],  # target: primary, replica
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
 )
 
+_role = settings.DB_ROLE
+
+def set_database_role(role: str) -> None:
+    """Роль процесса для пресета пула. Вызывается точкой входа до первого запроса"""
+    global _role
+
+    if role not in POOL_PRESETS:
+        raise ValueError(f"Unknown database role: {role}")
+
+    _role = role
+
+def _timed_pool_class(role: str, target: str) -> type:
+    """AsyncAdaptedQueuePool, замеряющий ожидание checkout.
+
+    Класс на (роль, цель): пересозданный при dispose пул - того же класса.
+    """
+    wait = POOL_CHECKOUT_WAIT.labels(role, target)
+
+    class TimedQueuePool(AsyncAdaptedQueuePool):
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                wait.observe(time.perf_counter() - started)
+
+    return TimedQueuePool
+
+def _create_engine(url: str, target: str) -> AsyncEngine:
+    preset = dict(POOL_PRESETS[_role])
+
+    if "poolclass" not in preset:
+        preset["poolclass"] = _timed_pool_class(_role, target)
+        if settings.DB_POOL_SIZE is not None:
+            preset["pool_size"] = settings.DB_POOL_SIZE
+        if settings.DB_MAX_OVERFLOW is not None:
+            preset["max_overflow"] = settings.DB_MAX_OVERFLOW
+
+    connect_args = {}
+    if settings.DB_PGBOUNCER:
+        # PgBouncer в transaction mode: соседние запросы идут в разные серверные
+        # соединения, подготовленные выражения там не найдутся
+        connect_args = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__"
+        }
+
+    engine = create_async_engine(
+        url,
+        echo=False,  # True для отладки SQL запросов
+        pool_pre_ping=True,  # Проверка соединения перед использованием
+        connect_args=connect_args,
+        **preset
+    )
+    # Латентность и строки по отпечаткам запросов, лог медленных
+    instrument_engine(engine.sync_engine)
+    return engine
+
+class _Engines:
+    """Движки и фабрики сессий одного event loop"""
+
+    def __init__(self):
+        self.engine = _create_engine(settings.DATABASE_URL, "primary")
+        self.session_maker = async_sessionmaker(
+            self.engine,
+            class_=AsyncSession,
+            expire_on_commit=False
+        )
+
+        # Реплика для read-only запросов (опционально)
+        self.replica_engine = _create_engine(
+            settings.DATABASE_REPLICA_URL, "replica"
+        ) if settings.DATABASE_REPLICA_URL else None
+        self.replica_session_maker = async_sessionmaker(
+            self.replica_engine,
+            class_=ReplicaSession,
+            expire_on_commit=False
+        ) if self.replica_engine is not None else None
+
+    def all(self) -> List[AsyncEngine]:
+        return [e for e in (self.engine, self.replica_engine) if e is not None]
+
+# Соединения asyncpg привязаны к loop, в котором открыты: движки - на loop
+_engines: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _Engines]" = weakref.WeakKeyDictionary()
+
+def _engines_for_loop() -> _Engines:
+    """Движки текущего event loop, создаются при первом обращении"""
+    loop = asyncio.get_running_loop()
+    engines = _engines.get(loop)
+
+    if engines is None:
+        engines = _engines[loop] = _Engines()
+        logger.debug(f"Database engines created for role {_role} (pid {os.getpid()})")
+
+    return engines
+
+def _reset_after_fork() -> None:
+    """В дочернем процессе соединения родителя не закрываем - только забываем"""
+    for engines in list(_engines.values()):
+        for engine in engines.all():
+            engine.sync_engine.dispose(close=False)
+    _engines.clear()
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+def get_engine() -> AsyncEngine:
+    """Движок primary для текущего процесса и event loop"""
+    return _engines_for_loop().engine
+
+def get_session_maker() -> async_sessionmaker:
+    return _engines_for_loop().session_maker
+
+def get_replica_engine() -> Optional[AsyncEngine]:
+    return _engines_for_loop().replica_engine
+
+def get_replica_session_maker() -> Optional[async_sessionmaker]:
+    return _engines_for_loop().replica_session_maker
+
+async def dispose_engines() -> None:
+    """Закрыть пулы текущего event loop (остановка процесса, конец скрипта)"""
+    engines = _engines.pop(asyncio.get_running_loop(), None)
+
+    if engines is not None:
+        for engine in engines.all():
+            await engine.dispose()
+
 Base = declarative_base()
 
+READ_SESSIONS = Counter(
+    "db_read_sessions_total",
+    "Read-only сессии по целевой БД",
+    ["target"]  # replica, primary
+)
+READ_FALLBACKS = Counter(
+    "db_replica_read_fallbacks_total",
+    "Чтения, повторенные на primary после потери соединения с репликой"
+)
+REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds",
+    "Отставание реплики при последней проверке"
+)
+
+# Лаг 0, если реплика применила все полученные WAL (иначе на простаивающем
+# primary время последней транзакции растет и лаг завышается)
+REPLICA_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+class ReplicaRouter:
+    """Решает, можно ли читать с реплики. Результат проверки лага кешируется"""
+
+    def __init__(self, max_lag: float, check_interval: float):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._usable = False
+        self._checked_at = float("-inf")
+
+    async def is_usable(self) -> bool:
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return self._usable
+
+        try:
+            async with get_replica_engine().connect() as conn:
+                lag = float((await conn.execute(REPLICA_LAG_QUERY)).scalar_one())
+            REPLICA_LAG.set(lag)
+            self._usable = lag <= self.max_lag
+
+            if not self._usable:
+                logger.warning(f"Replica lag {lag:.1f}s exceeds limit, reading from primary")
+        except Exception as e:
+            logger.warning(f"Replica is unavailable, reading from primary: {e}")
+            self._usable = False
+
+        self._checked_at = time.monotonic()
+        return self._usable
+
+    def mark_unavailable(self) -> None:
+        """Не ходить на реплику до следующей проверки"""
+        self._usable = False
+        self._checked_at = time.monotonic()
+
+replica_router = ReplicaRouter(
+    settings.REPLICA_MAX_LAG_SECONDS,
+    settings.REPLICA_CHECK_INTERVAL
+)
+
+# Сессия текущей единицы работы (апдейт бота или HTTP-запрос)
+_current_session: ContextVar[Optional[AsyncSession]] = ContextVar("db_session", default=None)
+
+# Признак записи в сессии: после него get_read_session() читает из нее же.
+# Ставится и при flush ORM, и при любом INSERT/UPDATE/DELETE через execute
+# (в т.ч. ... RETURNING) - отдельные пути записи ничего не помечают сами
+@event.listens_for(Session, "after_flush")
+def _mark_writes(session, flush_context):
+    session.info["has_writes"] = True
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_statement_writes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["has_writes"] = True
+
+def _connection_lost(error: BaseException) -> bool:
+    return isinstance(error, (DBAPIError, OSError)) and getattr(error, "connection_invalidated", True)
+
+class ReplicaSession(AsyncSession):
+    """Сессия реплики: запрос, потерявший соединение с репликой, повторяется на primary.
+
+    Повтор - один раз на запрос; после него все запросы сессии идут на primary
+    (в сессию единицы работы, если она есть).
+    """
+
+    _primary: Optional[AsyncSession] = None
+    _owns_primary = False
+
+    def _primary_session(self) -> AsyncSession:
+        if self._primary is None:
+            self._primary = _current_session.get()
+            if self._primary is None:
+                self._primary = get_session_maker()()
+                self._owns_primary = True
+        return self._primary
+
+    async def _read(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        if self._primary is None:
+            try:
+                return await getattr(super(), method)(*args, **kwargs)
+            except Exception as e:
+                if not _connection_lost(e):
+                    raise
+                replica_router.mark_unavailable()
+                READ_FALLBACKS.inc()
+                logger.warning(f"Replica read failed, retrying on primary: {e}")
+
+        return await getattr(self._primary_session(), method)(*args, **kwargs)
+
+    async def execute(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._read("execute", *args, **kwargs)
+
+    async def scalar(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._read("scalar", *args, **kwargs)
+
+    async def scalars(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._read("scalars", *args, **kwargs)
+
+    async def get(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._read("get", *args, **kwargs)
+
+    async def close(self) -> None:
+        if self._owns_primary:
+            await self._primary.close()
+        await super().close()
+
+@asynccontextmanager
+async def unit_of_work():
+    """Одна сессия и транзакция на апдейт/запрос.
+
+    Все get_session() внутри используют эту сессию, коммит - один, в конце.
+    Соединение берется из пула только при первом запросе.
+    """
+    session = _current_session.get()
+    if session is not None:
+        # Вложенная единица работы присоединяется к внешней
+        yield session
+        return
+
+    async with get_session_maker()() as session:
+        token = _current_session.set(session)
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            session.info.pop("after_commit", None)
+            await session.rollback()
+            raise
+        finally:
+            _current_session.reset(token)
+            await session.close()
+
+        await _run_after_commit(session)
+
+def after_commit(session: AsyncSession, callback: Callable[[], Awaitable[Any]]) -> None:
+    """Выполнить callback после коммита транзакции сессии (инвалидация кешей).
+
+    Внутри unit_of_work() - после ее коммита; при откате callback отбрасывается.
+    """
+    session.info.setdefault("after_commit", []).append(callback)
+
+async def _run_after_commit(session: AsyncSession) -> None:
+    for callback in session.info.pop("after_commit", []):
+        try:
+            await callback()
+        except Exception as e:
+            logger.warning(f"After-commit callback failed: {e}")
+
+def current_session() -> Optional[AsyncSession]:
+    """Сессия активной единицы работы, если она есть"""
+    return _current_session.get()
+
+def enqueue_after_commit(task: Any, *args: Any, **kwargs: Any) -> None:
+    """Поставить задачу Celery в очередь после коммита текущей единицы работы.
+
+    Воркер читает БД своим соединением и до коммита не видит записанного.
+    Вне unit_of_work() изменения уже зафиксированы - задача ставится сразу.
+    """
+    session = _current_session.get()
+    if session is None:
+        task.delay(*args, **kwargs)
+        return
+
+    async def enqueue():
+        task.delay(*args, **kwargs)
+
+    after_commit(session, enqueue)
+
+async def release_unit_of_work() -> None:
+    """Зафиксировать текущую единицу работы и вернуть соединение в пул.
+
+    Вызывается перед долгими ожиданиями (sleep, LLM, загрузка файлов), чтобы
+    соединение не висело "idle in transaction". Следующий запрос откроет новую
+    транзакцию; ошибка после этого вызова откатит только ее.
+    """
+    session = _current_session.get()
+    if session is None:
+        return
+
+    await session.commit()
+    await _run_after_commit(session)
+
 @asynccontextmanager
 async def get_session():
-    """Контекстный менеджер для работы с сессией"""
-    async with async_session_maker() as session:
+    """Контекстный менеджер для работы с сессией.
+
+    Внутри unit_of_work() возвращает ее сессию и не коммитит:
+    методы сервисов делают flush, фиксирует изменения единица работы.
+    """
+    session = _current_session.get()
+    if session is not None:
+        yield session
+        return
+
+    async with get_session_maker()() as session:
         try:
             yield session
             await session.commit()
         except Exception:
+            session.info.pop("after_commit", None)
             await session.rollback()
             raise
         finally:
             await session.close()
 
+        await _run_after_commit(session)
+
+@asynccontextmanager
+async def get_read_session():
+    """Сессия для read-only запросов: реплика, если она доступна и не отстает.
+
+    Только для методов, которым допустимо отставание до REPLICA_MAX_LAG_SECONDS.
+    Изменения в такой сессии не коммитятся.
+    """
+    uow_session = _current_session.get()
+
+    # После записи в текущей единице работы читаем свои же изменения
+    if uow_session is not None and uow_session.info.get("has_writes"):
+        READ_SESSIONS.labels("primary").inc()
+        yield uow_session
+        return
+
+    use_replica = get_replica_engine() is not None and await replica_router.is_usable()
+
+    # Без реплики не берем второе соединение с primary
+    if uow_session is not None and not use_replica:
+        READ_SESSIONS.labels("primary").inc()
+        yield uow_session
+        return
+
+    READ_SESSIONS.labels("replica" if use_replica else "primary").inc()
+
+    async with (get_replica_session_maker() if use_replica else get_session_maker())() as session:
+        try:
+            yield session
+        except (DBAPIError, OSError) as e:
+            # Запросы сессии повторяются на primary сами (ReplicaSession); сюда
+            # доходят ошибки вне них - следующие чтения идут на primary
+            if use_replica and _connection_lost(e):
+                replica_router.mark_unavailable()
+            raise
+        finally:
+            await session.close()
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+def get_alembic_head() -> str:
+    """Ревизия head из каталога миграций"""
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    return ScriptDirectory.from_config(config).get_current_head()
+
+async def get_schema_revision() -> Optional[str]:
+    """Текущая ревизия схемы в БД (None - миграции не применялись)"""
+    async with get_engine().connect() as conn:
+        has_version_table = await conn.run_sync(
+            lambda sync_conn: inspect(sync_conn).has_table("alembic_version")
+        )
+        if not has_version_table:
+            return None
+
+        result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+        return result.scalar_one_or_none()
+
+# Ревизия, совпадающая со схемой, которую создавал create_all до Alembic
+PRE_ALEMBIC_REVISION = "0001"
+
+async def has_pre_alembic_schema() -> bool:
+    """Таблицы есть, а alembic_version нет: схема создана create_all до миграций"""
+    async with get_engine().connect() as conn:
+        return await conn.run_sync(
+            lambda sync_conn: inspect(sync_conn).has_table("users")
+            and not inspect(sync_conn).has_table("alembic_version")
+        )
+
 async def init_db():
-    """Инициализация БД (создание таблиц)"""
-    async with engine.begin() as conn:
-        # Импортируем модели, чтобы они были зарегистрированы
-        from core.models import User, MealPlan, WorkoutPlan, DailyCheckIn, WeightLog, Payment
-        
-        # Создаем таблицы
-        await conn.run_sync(Base.metadata.create_all)
-        logger.info("Database tables created successfully")
+    """Инициализация БД.
+
+    В проде схемой управляет Alembic: при старте только сверяем ревизию
+    (один запрос) вместо инспекции всех таблиц через create_all.
+    """
+    if settings.DB_AUTO_CREATE:
+        async with get_engine().begin() as conn:
+            # Импортируем модели, чтобы они были зарегистрированы
+            from core import models  # noqa: F401
+            from core.partitions import ensure_partitions
+            from core.workout_library import seed_workout_library
+
+            await conn.run_sync(Base.metadata.create_all)
+            await ensure_partitions(conn, settings.PARTITION_MONTHS_AHEAD)
+            await conn.run_sync(seed_workout_library)
+            logger.info("Database tables created successfully")
+        return
+
+    head = get_alembic_head()
+    current = await get_schema_revision()
+
+    if current is None and await has_pre_alembic_schema():
+        # upgrade head упал бы на 0001: таблицы уже есть
+        raise RuntimeError(
+            f"Database schema was created without Alembic. Run "
+            f"`alembic stamp {PRE_ALEMBIC_REVISION}` and then `alembic upgrade head` before starting"
+        )
+
+    if current != head:
+        raise RuntimeError(
+            f"Database schema is at revision {current}, expected {head}. "
+            f"Run `alembic upgrade head` before starting"
+        )
+
+    logger.info(f"Database schema is up to date ({current})")
 
 async def drop_db():
     """Удаление всех таблиц (для тестов)"""
-    async with engine.begin() as conn:
+    async with get_engine().begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
         logger.info("Database tables dropped")
\ No newline at end of file
@@ -0,0 +1,31 @@
+"""Экспорт метрик Prometheus для /metrics бота, API и воркеров.
+
+Несколько процессов (шарды бота, воркеры uvicorn и Celery) пишут метрики
+в каталог PROMETHEUS_MULTIPROC_DIR, эндпоинт любого процесса отдает сумму.
+Без переменной - метрики только текущего процесса.
+"""
+from typing import Tuple
+import os
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest, multiprocess
+
+def multiprocess_enabled() -> bool:
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+def metrics_registry() -> CollectorRegistry:
+    """Реестр для экспорта: сборщик по каталогу процессов или реестр процесса"""
+    if not multiprocess_enabled():
+        return REGISTRY
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+def render_metrics() -> Tuple[bytes, str]:
+    """(тело ответа, Content-Type)"""
+    return generate_latest(metrics_registry()), CONTENT_TYPE_LATEST
+
+def mark_process_dead(pid: int) -> None:
+    """Убрать live-gauge завершившегося процесса из общего каталога"""
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(pid)
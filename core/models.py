@@ -1,10 +1,11 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, JSON, Text, ForeignKey, Enum
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, JSON, Text, ForeignKey, Enum, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
-from datetime import datetime
+from datetime import date, datetime
+from typing import Any, Dict, Optional
 import enum
 
-Base = declarative_base()
+from core.database import Base
 
 class UserStatus(enum.Enum):
     TRIAL = "trial"
@@ -27,6 +28,10 @@ class Goal(enum.Enum):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Истекающие подписки (напоминания и отключение)
+        Index("ix_users_status_subscription_end", "status", "subscription_end"),
+    )
     
     id = Column(Integer, primary_key=True)
     telegram_id = Column(Integer, unique=True, index=True)
@@ -42,6 +47,7 @@ class User(Base):
     target_weight = Column(Float)
     goal = Column(Enum(Goal))
     activity_level = Column(Enum(ActivityLevel))
+    program_start = Column(Date, nullable=True)  # начало программы тренировок
     
     # Preferences
     dietary_restrictions = Column(JSON, default=list)  # ["vegetarian", "no_gluten", etc.]
@@ -80,16 +86,24 @@ class User(Base):
 
 class MealPlan(Base):
     __tablename__ = "meal_plans"
+    __table_args__ = (
+        Index("ix_meal_plans_user_active_week_day", "user_id", "is_active", "week_number", "day_number"),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     week_number = Column(Integer)
     day_number = Column(Integer)  # 1-7
     
-    breakfast = Column(JSON)  # {"name": "...", "calories": 300, "protein": 20, ...}
-    lunch = Column(JSON)
-    dinner = Column(JSON)
-    snack = Column(JSON, nullable=True)
+    # Блюда из каталога и порция пользователя (множитель к порции каталога)
+    breakfast_dish_id = Column(Integer, ForeignKey("dishes.id"))
+    breakfast_portion = Column(Float, default=1.0)
+    lunch_dish_id = Column(Integer, ForeignKey("dishes.id"))
+    lunch_portion = Column(Float, default=1.0)
+    dinner_dish_id = Column(Integer, ForeignKey("dishes.id"))
+    dinner_portion = Column(Float, default=1.0)
+    snack_dish_id = Column(Integer, ForeignKey("dishes.id"), nullable=True)
+    snack_portion = Column(Float, nullable=True)
     
     total_calories = Column(Integer)
     total_protein = Column(Integer)
@@ -102,20 +116,86 @@ class MealPlan(Base):
     is_active = Column(Boolean, default=True)
     
     user = relationship("User", back_populates="meal_plans")
+    
+    # Каталог маленький и горячий - блюда подтягиваются JOIN'ом в том же запросе
+    breakfast_dish = relationship("Dish", foreign_keys=[breakfast_dish_id], lazy="joined")
+    lunch_dish = relationship("Dish", foreign_keys=[lunch_dish_id], lazy="joined")
+    dinner_dish = relationship("Dish", foreign_keys=[dinner_dish_id], lazy="joined")
+    snack_dish = relationship("Dish", foreign_keys=[snack_dish_id], lazy="joined")
+    
+    # Приемы пищи в прежнем виде: {"name": "...", "calories": 300, "protein": 20, ...}
+    @property
+    def breakfast(self) -> Optional[Dict[str, Any]]:
+        return _serving(self.breakfast_dish, self.breakfast_portion, "breakfast")
+    
+    @property
+    def lunch(self) -> Optional[Dict[str, Any]]:
+        return _serving(self.lunch_dish, self.lunch_portion, "lunch")
+    
+    @property
+    def dinner(self) -> Optional[Dict[str, Any]]:
+        return _serving(self.dinner_dish, self.dinner_portion, "dinner")
+    
+    @property
+    def snack(self) -> Optional[Dict[str, Any]]:
+        return _serving(self.snack_dish, self.snack_portion, "snack")
+
+class Dish(Base):
+    """Блюдо каталога: одна строка на уникальное содержимое (content_hash)"""
+    __tablename__ = "dishes"
+    
+    id = Column(Integer, primary_key=True)
+    content_hash = Column(String(64), unique=True, nullable=False)  # sha256 нормализованного блюда
+    name = Column(String(255))
+    
+    # КБЖУ на порцию каталога
+    calories = Column(Integer)
+    protein = Column(Float)
+    carbs = Column(Float)
+    fats = Column(Float)
+    
+    ingredients = Column(JSON)
+    recipe = Column(Text)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+def _serving(dish: Optional[Dish], portion: Optional[float], meal_type: str) -> Optional[Dict[str, Any]]:
+    """Блюдо каталога, пересчитанное на порцию пользователя"""
+    if dish is None:
+        return None
+    
+    portion = portion or 1.0
+    return {
+        "type": meal_type,
+        "name": dish.name,
+        "calories": round((dish.calories or 0) * portion),
+        "protein": round((dish.protein or 0) * portion),
+        "carbs": round((dish.carbs or 0) * portion),
+        "fats": round((dish.fats or 0) * portion),
+        "ingredients": dish.ingredients or [],
+        "recipe": dish.recipe
+    }
 
 class WorkoutPlan(Base):
     __tablename__ = "workout_plans"
+    __table_args__ = (
+        # Одна запись на день: выполнение или отклонение от расписания
+        UniqueConstraint("user_id", "scheduled_date", name="uq_workout_plans_user_scheduled_date"),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    week_number = Column(Integer)
+    scheduled_date = Column(Date)  # день по расписанию, см. core/workout_schedule.py
+    week_number = Column(Integer)  # неделя программы
     day_number = Column(Integer)  # 1-7
     
     workout_type = Column(String(50))  # "strength", "cardio", "mixed", "rest"
     duration_minutes = Column(Integer)
     difficulty = Column(String(20))  # "beginner", "intermediate", "advanced"
     
-    exercises = Column(JSON)  # [{"name": "...", "sets": 3, "reps": 12, "rest": 60}, ...]
+    # Упражнения берутся из шаблона, в плане только правки: {"0": {"reps": 15}}
+    template_id = Column(Integer, ForeignKey("workout_templates.id"), nullable=True)
+    overrides = Column(JSON, nullable=True)
     
     calories_burned = Column(Integer)
     completed = Column(Boolean, default=False)
@@ -124,11 +204,49 @@ class WorkoutPlan(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     user = relationship("User", back_populates="workouts")
+    
+    @property
+    def exercises(self):
+        """Упражнения шаблона с правками плана (из библиотеки, загруженной при старте процесса)"""
+        from core.workout_library import workout_library
+        return workout_library.exercises(self.template_id, self.overrides)
 
-class DailyCheckIn(Base):
-    __tablename__ = "daily_checkins"
+class Exercise(Base):
+    """Упражнение библиотеки"""
+    __tablename__ = "exercises"
     
     id = Column(Integer, primary_key=True)
+    name = Column(String(255), unique=True, nullable=False)
+    description = Column(Text, nullable=True)
+    tips = Column(Text, nullable=True)
+
+class WorkoutTemplate(Base):
+    """Шаблон тренировки: упражнения и параметры для (тип, сложность, цель)"""
+    __tablename__ = "workout_templates"
+    __table_args__ = (
+        UniqueConstraint("workout_type", "difficulty", "goal", name="uq_workout_templates_type_difficulty_goal"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    workout_type = Column(String(50), nullable=False)  # "strength", "cardio", "mixed"
+    difficulty = Column(String(20), nullable=False)  # "beginner", "intermediate", "advanced"
+    goal = Column(String(20), nullable=False, default="any")  # значение Goal или "any"
+    duration_minutes = Column(Integer)
+    
+    exercises = Column(JSON)  # [{"exercise_id": 1, "sets": 3, "reps": 12, "rest": 60}, ...]
+
+class DailyCheckIn(Base):
+    __tablename__ = "daily_checkins"
+    __table_args__ = (
+        # Один чек-ин в день: ключ для upsert в CheckInService
+        UniqueConstraint("user_id", "checkin_date", name="uq_daily_checkins_user_checkin_date"),
+        # Помесячные партиции, см. core/partitions.py
+        {"postgresql_partition_by": "RANGE (checkin_date)"},
+    )
+    
+    # Первичный ключ партиционированной таблицы включает ключ партиционирования
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    checkin_date = Column(Date, primary_key=True, default=date.today)
     user_id = Column(Integer, ForeignKey("users.id"))
     date = Column(DateTime, default=datetime.utcnow)
     
@@ -146,7 +264,7 @@ class DailyCheckIn(Base):
     breakfast_photo = Column(String(255), nullable=True)  # S3 URL
     lunch_photo = Column(String(255), nullable=True)
     dinner_photo = Column(String(255), nullable=True)
-    snack_photos = Column(JSON, default=list)
+    snack_photos = Column(JSONB, default=list)  # JSONB: дописываем через ||
     
     estimated_calories = Column(Integer, nullable=True)
     adherence_score = Column(Integer, nullable=True)  # 0-100
@@ -161,11 +279,15 @@ class DailyCheckIn(Base):
 
 class WeightLog(Base):
     __tablename__ = "weight_logs"
+    __table_args__ = (
+        Index("ix_weight_logs_user_date", "user_id", "date"),
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
     
-    id = Column(Integer, primary_key=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     weight = Column(Float)
-    date = Column(DateTime, default=datetime.utcnow)
+    date = Column(DateTime, primary_key=True, default=datetime.utcnow)
     
     # Опциональные измерения
     waist_cm = Column(Float, nullable=True)
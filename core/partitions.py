@@ -0,0 +1,95 @@
+from datetime import date
+from typing import List, Optional
+import logging
+import re
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+logger = logging.getLogger(__name__)
+
+# Таблицы с помесячным RANGE-партиционированием: таблица -> ключ партиционирования
+PARTITIONED_TABLES = {
+    "daily_checkins": "checkin_date",
+    "weight_logs": "date"
+}
+
+_PARTITION_RE = re.compile(r"_(\d{4})_(\d{2})$")
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    """Имя партиции месяца: daily_checkins_2026_10"""
+    return f"{table}_{month:%Y_%m}"
+
+async def create_partition(conn: AsyncConnection, table: str, month: date) -> None:
+    """Создать партицию месяца, если ее еще нет"""
+    start = month_start(month)
+    await conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, start)} "
+        f"PARTITION OF {table} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{add_months(start, 1).isoformat()}')"
+    ))
+
+async def ensure_partitions(
+    conn: AsyncConnection,
+    months_ahead: int = 3,
+    today: Optional[date] = None
+) -> None:
+    """Партиции с текущего месяца на months_ahead вперед и DEFAULT для остальных дат"""
+    current = month_start(today or date.today())
+
+    for table in PARTITIONED_TABLES:
+        for offset in range(months_ahead + 1):
+            await create_partition(conn, table, add_months(current, offset))
+
+        # Страховка: строки вне созданных диапазонов не ломают вставку
+        await conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"
+        ))
+
+    logger.info(f"Partitions ensured up to {add_months(current, months_ahead):%Y-%m}")
+
+async def list_partitions(conn: AsyncConnection, table: str) -> List[str]:
+    """Помесячные партиции таблицы (без DEFAULT), по возрастанию"""
+    result = await conn.execute(
+        text("""
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :table
+        """),
+        {"table": table}
+    )
+    return sorted(name for name in result.scalars() if _PARTITION_RE.search(name))
+
+async def detach_partitions(
+    conn: AsyncConnection,
+    older_than: date,
+    table: Optional[str] = None
+) -> List[str]:
+    """Отсоединить партиции месяцев раньше older_than.
+
+    Отсоединенная партиция остается обычной таблицей: ее можно выгрузить
+    в архив и удалить (DROP TABLE) без блокировки основной таблицы.
+    """
+    detached = []
+    cutoff = month_start(older_than)
+
+    for name in PARTITIONED_TABLES if table is None else [table]:
+        for partition in await list_partitions(conn, name):
+            year, month = map(int, _PARTITION_RE.search(partition).groups())
+            if date(year, month, 1) >= cutoff:
+                continue
+
+            await conn.execute(text(f"ALTER TABLE {name} DETACH PARTITION {partition}"))
+            detached.append(partition)
+            logger.info(f"Partition {partition} detached from {name}")
+
+    return detached
@@ -0,0 +1,70 @@
+"""Заранее собранные запросы горячего пути.
+
+Выражение строится один раз при импорте, значения передаются параметрами
+при выполнении: session.execute(USER_BY_TELEGRAM_ID, {"telegram_id": ...}).
+Ключ кеша у неизменного выражения мемоизирован, поэтому на каждый апдейт
+не тратится ни сборка select(), ни обход дерева для ключа, а скомпилированный
+SQL берется из кеша движка. Текст SQL постоянный - asyncpg переиспользует
+подготовленное выражение соединения (кроме режима DB_PGBOUNCER).
+"""
+from sqlalchemy import DateTime, Float, Integer, String, bindparam, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from core.models import User, UserStatus, WeightLog
+
+# ORM-стратегия для INSERT/UPDATE с параметрами: иначе словарь параметров
+# включает bulk-режим, несовместимый с values() и RETURNING сущности
+_ORM_DML = {"dml_strategy": "orm", "populate_existing": True}
+
+_telegram_id = bindparam("telegram_id", type_=Integer())
+_now = bindparam("now", type_=DateTime())
+
+# Пользователь по telegram_id: {"telegram_id"}
+USER_BY_TELEGRAM_ID = select(User).where(User.telegram_id == _telegram_id)
+
+# Регистрация или отметка активности одним upsert:
+# {"telegram_id", "username", "first_name", "last_name", "now"}
+# postgresql.insert не кешируется компилятором SQLAlchemy (inherit_cache = False),
+# здесь экономится только сборка выражения
+
+UPSERT_USER = (
+    pg_insert(User)
+    .values(
+        telegram_id=_telegram_id,
+        username=bindparam("username", type_=String()),
+        first_name=bindparam("first_name", type_=String()),
+        last_name=bindparam("last_name", type_=String()),
+        status=UserStatus.TRIAL,
+        trial_start=_now,
+        created_at=_now,
+        last_activity=_now
+    )
+    # Существующему пользователю обновляем только последнюю активность
+    .on_conflict_do_update(
+        index_elements=[User.telegram_id],
+        set_={"last_activity": _now}
+    )
+    .returning(User)
+    .execution_options(**_ORM_DML)
+)
+
+# Текущий вес пользователя и запись в лог одним запросом:
+# WITH u AS (UPDATE users ... RETURNING id) INSERT INTO weight_logs SELECT ...
+# {"telegram_id", "weight", "now"}
+_weight = bindparam("weight", type_=Float())
+_updated_user = (
+    update(User)
+    .where(User.telegram_id == _telegram_id)
+    .values(weight=_weight, updated_at=_now)
+    .returning(User.id)
+    .cte("updated_user")
+)
+LOG_WEIGHT = (
+    insert(WeightLog)
+    .from_select(
+        ["user_id", "weight", "date"],
+        select(_updated_user.c.id, _weight, _now)
+    )
+    .returning(WeightLog)
+    .execution_options(**_ORM_DML)
+)
@@ -0,0 +1,147 @@
+"""Метрики SQL-запросов по отпечаткам.
+
+Отпечаток - хеш SQL без значений: $1, литералы и списки IN/VALUES
+заменяются на "?", поэтому один запрос сервиса с разными параметрами
+дает один ряд в Prometheus. Вызывающий метод сервиса берется из
+contextvar, который выставляет instrument_service.
+"""
+from contextvars import ContextVar
+from functools import lru_cache, wraps
+from typing import Any, Tuple
+import hashlib
+import inspect
+import logging
+import re
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Отпечатки сверх лимита пишутся в один ряд: динамический SQL
+# не должен раздувать число рядов
+OVERFLOW_FINGERPRINT = "other"
+UNKNOWN_CALLER = "unknown"
+
+STATEMENT_SECONDS = Histogram(
+    "db_statement_seconds",
+    "Время выполнения SQL-запроса",
+    ["fingerprint", "caller"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 10)
+)
+STATEMENT_ROWS = Histogram(
+    "db_statement_rows",
+    "Строк вернул или изменил запрос",
+    ["fingerprint", "caller"],
+    buckets=(0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+)
+STATEMENT_ERRORS = Counter(
+    "db_statement_errors_total",
+    "Запросы, завершившиеся ошибкой",
+    ["fingerprint", "caller"]
+)
+SLOW_STATEMENTS = Counter(
+    "db_slow_statements_total",
+    "Запросы дольше SQL_SLOW_QUERY_MS",
+    ["fingerprint", "caller"]
+)
+# Расшифровка отпечатка для дашбордов: значение всегда 1
+STATEMENT_FINGERPRINTS = Gauge(
+    "db_statement_fingerprint",
+    "Нормализованный SQL отпечатка",
+    ["fingerprint", "statement"],
+    multiprocess_mode="max"
+)
+
+_caller: ContextVar[str] = ContextVar("sql_caller", default=UNKNOWN_CALLER)
+
+_PLACEHOLDER = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<!:):\w+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_SPACES = re.compile(r"\s+")
+
+_seen_fingerprints = set()
+
+def normalize_statement(statement: str) -> str:
+    """SQL без значений: одинаков для любых параметров запроса"""
+    sql = _PLACEHOLDER.sub("?", statement)
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _LIST.sub("(?)", sql)
+    sql = _ROWS.sub("(?)", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> Tuple[str, str]:
+    """(отпечаток, нормализованный SQL). Текст SQL горячих запросов
+    постоянен, поэтому регулярки выполняются один раз на запрос"""
+    normalized = normalize_statement(statement)
+    digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+
+    if digest not in _seen_fingerprints:
+        if len(_seen_fingerprints) >= settings.SQL_METRICS_MAX_FINGERPRINTS:
+            return OVERFLOW_FINGERPRINT, normalized
+        _seen_fingerprints.add(digest)
+        STATEMENT_FINGERPRINTS.labels(digest, normalized[:300]).set(1)
+
+    return digest, normalized
+
+def instrument_service(cls: type) -> type:
+    """Декоратор класса сервиса: запросы публичных async-методов
+    помечаются как "<Класс>.<метод>". Во вложенных вызовах
+    запросы относятся к самому внутреннему методу."""
+    for name, method in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.iscoroutinefunction(method):
+            continue
+        setattr(cls, name, _tracked(method, f"{cls.__name__}.{name}"))
+    return cls
+
+def _tracked(method, caller: str):
+    @wraps(method)
+    async def wrapper(*args, **kwargs):
+        token = _caller.set(caller)
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            _caller.reset(token)
+    return wrapper
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._sql_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._sql_started
+    digest, normalized = fingerprint(statement)
+    caller = _caller.get()
+
+    STATEMENT_SECONDS.labels(digest, caller).observe(elapsed)
+    # -1: драйвер не знает число строк (серверный курсор)
+    rows = cursor.rowcount
+    if rows is not None and rows >= 0:
+        STATEMENT_ROWS.labels(digest, caller).observe(rows)
+
+    if settings.SQL_SLOW_QUERY_MS and elapsed * 1000 >= settings.SQL_SLOW_QUERY_MS:
+        SLOW_STATEMENTS.labels(digest, caller).inc()
+        logger.warning(
+            f"Slow query {digest} from {caller}: {elapsed * 1000:.0f} ms, "
+            f"rows {rows}{' (executemany)' if executemany else ''}: {normalized}"
+        )
+
+def _handle_error(exception_context: Any):
+    context = exception_context.execution_context
+    if context is None or not hasattr(context, "_sql_started"):
+        return
+    digest, _ = fingerprint(exception_context.statement or "")
+    STATEMENT_ERRORS.labels(digest, _caller.get()).inc()
+
+def instrument_engine(engine: Engine) -> None:
+    """Подключить метрики к движку (sync_engine у AsyncEngine)"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
@@ -0,0 +1,29 @@
+import asyncio
+import weakref
+from typing import Dict
+
+import redis.asyncio as redis
+
+from config import settings
+
+# Клиенты привязаны к event loop: Celery-задачи создают новый loop
+# на каждый asyncio.run, и переиспользовать чужой клиент нельзя
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[int, redis.Redis]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+def get_redis(db: int = 0) -> redis.Redis:
+    """Получить Redis-клиент (bytes-ответы) для текущего event loop"""
+    loop = asyncio.get_running_loop()
+    loop_clients = _clients.setdefault(loop, {})
+    
+    client = loop_clients.get(db)
+    if client is None:
+        client = redis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=db
+        )
+        loop_clients[db] = client
+    
+    return client
@@ -0,0 +1,126 @@
+from typing import Any, List, Optional, Tuple
+import logging
+
+from config import settings
+from core.models import Goal, ActivityLevel
+from core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Весовые диапазоны (кг) для бакетов советов: (название, от, до, вес для промпта)
+WEIGHT_BANDS = [
+    ("lt60", 0, 60, 55),
+    ("60_75", 60, 75, 68),
+    ("75_90", 75, 90, 82),
+    ("90_110", 90, 110, 100),
+    ("gt110", 110, 1000, 120)
+]
+
+def _value(field: Any) -> Optional[str]:
+    """Значение enum-поля модели или строка как есть"""
+    if field is None:
+        return None
+    return getattr(field, "value", field)
+
+class AdviceService:
+    """Пул заранее сгенерированных советов по тренировкам в Redis"""
+
+    KEY_PREFIX = "workout_advice"
+    # Одна перегенерация бакета за это время, сколько бы тренировок ни завершилось
+    REFRESH_LOCK_TTL = 10 * 60
+
+    def get_weight_band(self, weight: Optional[float]) -> str:
+        """Весовой диапазон пользователя"""
+        if not weight:
+            return "75_90"
+
+        for band, low, high, _ in WEIGHT_BANDS:
+            if low <= weight < high:
+                return band
+
+        return WEIGHT_BANDS[-1][0]
+
+    def get_bucket(
+        self,
+        goal: Any,
+        activity_level: Any,
+        weight: Optional[float]
+    ) -> Tuple[str, str, str]:
+        """Бакет (цель, активность, весовой диапазон)"""
+        return (
+            _value(goal) or Goal.MAINTAIN.value,
+            _value(activity_level) or ActivityLevel.MODERATE.value,
+            self.get_weight_band(weight)
+        )
+
+    def all_buckets(self) -> List[Tuple[str, str, str]]:
+        """Все бакеты для ночной генерации"""
+        return [
+            (goal.value, level.value, band)
+            for goal in Goal
+            for level in ActivityLevel
+            for band, _, _, _ in WEIGHT_BANDS
+        ]
+
+    def bucket_user_data(self, bucket: Tuple[str, str, str]) -> dict:
+        """Данные для промпта, представляющие бакет"""
+        goal, activity_level, band = bucket
+        weight = next(weight for name, _, _, weight in WEIGHT_BANDS if name == band)
+
+        return {
+            "goal": goal,
+            "activity_level": activity_level,
+            "weight": weight
+        }
+
+    def _key(self, bucket: Tuple[str, str, str]) -> str:
+        return f"{self.KEY_PREFIX}:{':'.join(bucket)}"
+
+    async def pick_workout_advice(self, user: Any) -> Optional[str]:
+        """Случайный совет из пула бакета пользователя (None, если пул пуст или Redis недоступен)"""
+        bucket = self.get_bucket(user.goal, user.activity_level, user.weight)
+        
+        try:
+            advice = await get_redis(settings.REDIS_CACHE_DB).srandmember(self._key(bucket))
+        except Exception as e:
+            logger.warning(f"Workout advice pool read failed: {e}")
+            return None
+
+        if advice is None:
+            return None
+
+        return advice.decode("utf-8")
+
+    async def claim_refresh(self, bucket: Tuple[str, str, str]) -> bool:
+        """Лок перегенерации пула бакета (SET NX EX): True - генерацию ставим мы"""
+        try:
+            return bool(await get_redis(settings.REDIS_CACHE_DB).set(
+                f"{self._key(bucket)}:refresh",
+                1,
+                nx=True,
+                ex=self.REFRESH_LOCK_TTL
+            ))
+        except Exception as e:
+            # Без Redis пул все равно не записать
+            logger.warning(f"Workout advice refresh lock failed: {e}")
+            return False
+
+    async def replace_pool(
+        self,
+        bucket: Tuple[str, str, str],
+        variants: List[str]
+    ) -> int:
+        """Атомарно заменить пул советов бакета"""
+        variants = list(dict.fromkeys(v.strip() for v in variants if v and v.strip()))
+        if not variants:
+            # Старый пул лучше пустого
+            return 0
+
+        key = self._key(bucket)
+        pipe = get_redis(settings.REDIS_CACHE_DB).pipeline(transaction=True)
+        pipe.delete(key)
+        pipe.sadd(key, *variants)
+        pipe.expire(key, settings.WORKOUT_ADVICE_POOL_TTL)
+        await pipe.execute()
+
+        return len(variants)
@@ -1,10 +1,19 @@
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional
 from datetime import datetime, date
-from sqlalchemy import select, and_
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from core.database import get_session
-from core.models import DailyCheckIn, User
+from core.query_metrics import instrument_service
+from core.models import DailyCheckIn, User, WeightLog
 
+# Один чек-ин на пользователя в день
+CHECKIN_UNIQUE = "uq_daily_checkins_user_checkin_date"
+
+# Поля, которые задает сервис, а не клиент
+_SERVICE_FIELDS = {"id", "user_id", "checkin_date", "date", "created_at"}
+
+@instrument_service
 class CheckInService:
     """Сервис для работы с чек-инами"""
     
@@ -16,43 +25,20 @@ class CheckInService:
         mood: Optional[str] = None
     ) -> DailyCheckIn:
         """Сохранить утренний чек-ин"""
-        async with get_session() as session:
-            # Проверяем, есть ли уже чек-ин за сегодня
-            today = date.today()
-            result = await session.execute(
-                select(DailyCheckIn).where(
-                    and_(
-                        DailyCheckIn.user_id == user_id,
-                        DailyCheckIn.date >= today,
-                        DailyCheckIn.date < today + timedelta(days=1)
-                    )
-                )
-            )
-            checkin = result.scalar_one_or_none()
-            
-            if checkin:
-                # Обновляем существующий
-                if morning_weight:
-                    checkin.morning_weight = morning_weight
-                if sleep_hours:
-                    checkin.sleep_hours = sleep_hours
-                if mood:
-                    checkin.mood = mood
-            else:
-                # Создаем новый
-                checkin = DailyCheckIn(
-                    user_id=user_id,
-                    date=datetime.utcnow(),
-                    morning_weight=morning_weight,
-                    sleep_hours=sleep_hours,
-                    mood=mood
-                )
-                session.add(checkin)
-            
-            await session.commit()
-            await session.refresh(checkin)
-            
-            return checkin
+        # Непереданные значения не затирают уже сохраненные
+        return await self._upsert(
+            user_id,
+            {
+                "morning_weight": morning_weight,
+                "sleep_hours": sleep_hours,
+                "mood": mood
+            },
+            lambda excluded: {
+                "morning_weight": func.coalesce(excluded.morning_weight, DailyCheckIn.morning_weight),
+                "sleep_hours": func.coalesce(excluded.sleep_hours, DailyCheckIn.sleep_hours),
+                "mood": func.coalesce(excluded.mood, DailyCheckIn.mood)
+            }
+        )
     
     async def save_food_log(
         self,
@@ -62,48 +48,96 @@ class CheckInService:
         estimated_calories: Optional[int] = None
     ) -> DailyCheckIn:
         """Сохранить лог еды"""
-        async with get_session() as session:
-            # Получаем или создаем чек-ин за сегодня
-            today = date.today()
-            result = await session.execute(
-                select(DailyCheckIn).where(
-                    and_(
-                        DailyCheckIn.user_id == user_id,
-                        DailyCheckIn.date >= today,
-                        DailyCheckIn.date < today + timedelta(days=1)
-                    )
+        values: Dict[str, Any] = {"estimated_calories": estimated_calories or None}
+        
+        def merge(excluded) -> Dict[str, Any]:
+            updates = {
+                # Калории суммируются на стороне БД, NULL с любой стороны не обнуляет сумму
+                "estimated_calories": func.coalesce(
+                    DailyCheckIn.estimated_calories + excluded.estimated_calories,
+                    DailyCheckIn.estimated_calories,
+                    excluded.estimated_calories
                 )
-            )
-            checkin = result.scalar_one_or_none()
-            
-            if not checkin:
-                checkin = DailyCheckIn(
-                    user_id=user_id,
-                    date=datetime.utcnow()
-                )
-                session.add(checkin)
+            }
             
             # Сохраняем фото в соответствующее поле
-            if meal_type == "breakfast":
-                checkin.breakfast_photo = food_photo
-            elif meal_type == "lunch":
-                checkin.lunch_photo = food_photo
-            elif meal_type == "dinner":
-                checkin.dinner_photo = food_photo
+            if meal_type in ("breakfast", "lunch", "dinner"):
+                field = f"{meal_type}_photo"
+                updates[field] = getattr(excluded, field)
             elif meal_type == "snack":
-                snack_photos = checkin.snack_photos or []
-                snack_photos.append(food_photo)
-                checkin.snack_photos = snack_photos
-            
-            # Обновляем оценку калорий
-            if estimated_calories:
-                current_calories = checkin.estimated_calories or 0
-                checkin.estimated_calories = current_calories + estimated_calories
+                # JSONB-конкатенация без чтения списка
+                updates["snack_photos"] = func.coalesce(
+                    DailyCheckIn.snack_photos,
+                    func.jsonb_build_array()
+                ).op("||")(excluded.snack_photos)
             
-            await session.commit()
-            await session.refresh(checkin)
-            
-            return checkin
+            return updates
+        
+        if meal_type in ("breakfast", "lunch", "dinner"):
+            values[f"{meal_type}_photo"] = food_photo
+        elif meal_type == "snack":
+            values["snack_photos"] = [food_photo]
+        
+        return await self._upsert(user_id, values, merge)
+    
+    async def upsert_checkin(self, user_id: int, **fields) -> DailyCheckIn:
+        """Записать поля сегодняшнего чек-ина (переданные значения заменяют старые)"""
+        values = {
+            key: value for key, value in fields.items()
+            if key in DailyCheckIn.__table__.columns and key not in _SERVICE_FIELDS
+        }
+        
+        return await self._upsert(
+            user_id,
+            values,
+            lambda excluded: {key: getattr(excluded, key) for key in values}
+        )
+    
+    async def add_counters(
+        self,
+        telegram_id: int,
+        water_ml: int = 0,
+        steps: int = 0,
+        estimated_calories: int = 0
+    ) -> Optional[DailyCheckIn]:
+        """Прибавить воду, шаги и калории к сегодняшнему чек-ину.
+        
+        Прибавление выполняется в БД (water_ml = water_ml + n) одним запросом:
+        id пользователя берется подзапросом по telegram_id, параллельные нажатия
+        не теряют обновлений. None - пользователь не найден.
+        """
+        increments = {
+            column: value for column, value in (
+                ("water_ml", water_ml),
+                ("steps", steps),
+                ("estimated_calories", estimated_calories)
+            ) if value
+        }
+        
+        if not increments:
+            raise ValueError("Nothing to add")
+        
+        stmt = pg_insert(DailyCheckIn).from_select(
+            ["user_id", "checkin_date", "date", *increments],
+            select(
+                User.id,
+                literal(date.today()),
+                literal(datetime.utcnow()),
+                *[literal(value) for value in increments.values()]
+            ).where(User.telegram_id == telegram_id)
+        )
+        stmt = stmt.on_conflict_do_update(
+            constraint=CHECKIN_UNIQUE,
+            set_={
+                column: func.coalesce(getattr(DailyCheckIn, column), 0) + getattr(stmt.excluded, column)
+                for column in increments
+            }
+        )
+        
+        async with get_session() as session:
+            return await session.scalar(
+                stmt.returning(DailyCheckIn).execution_options(populate_existing=True)
+            )
     
     async def log_weight(
         self,
@@ -113,4 +147,38 @@ class CheckInService:
         """Записать вес"""
         from core.services.user_service import UserService
         user_service = UserService()
-        return await user_service.log_weight(telegram_id, weight)
\ No newline at end of file
+        return await user_service.log_weight(telegram_id, weight)
+    
+    async def _upsert(
+        self,
+        user_id: int,
+        values: Dict[str, Any],
+        merge: Callable[[Any], Dict[str, Any]]
+    ) -> DailyCheckIn:
+        """INSERT ... ON CONFLICT (user_id, checkin_date) DO UPDATE ... RETURNING.
+        
+        Один запрос без предварительного чтения: параллельные записи за день
+        попадают в одну строку. merge получает excluded (вставляемую строку)
+        и возвращает выражения обновления существующей.
+        """
+        stmt = pg_insert(DailyCheckIn).values(
+            user_id=user_id,
+            checkin_date=date.today(),
+            date=datetime.utcnow(),
+            **values
+        )
+        updates = merge(stmt.excluded)
+        
+        if updates:
+            stmt = stmt.on_conflict_do_update(constraint=CHECKIN_UNIQUE, set_=updates)
+        else:
+            # Нечего обновлять - просто возвращаем существующую строку
+            stmt = stmt.on_conflict_do_update(
+                constraint=CHECKIN_UNIQUE,
+                set_={"user_id": stmt.excluded.user_id}
+            )
+        
+        async with get_session() as session:
+            return await session.scalar(
+                stmt.returning(DailyCheckIn).execution_options(populate_existing=True)
+            )
@@ -0,0 +1,96 @@
+from typing import Any, Dict, List, Tuple
+import hashlib
+import json
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from core.database import get_session
+from core.query_metrics import instrument_service
+from core.models import Dish
+
+# Калорийность порции каталога. Блюдо с разной калорийностью у разных
+# пользователей хранится одной строкой, у пользователя - множитель порции
+BASE_CALORIES = 100
+
+def _per_portion(value: Any, portion: float) -> float:
+    """Граммы на порцию каталога с шагом 0.5 г: шум округления не плодит дубли"""
+    return round(float(value or 0) / portion * 2) / 2
+
+def normalize_meal(meal: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
+    """Блюдо плана -> (содержимое для каталога, порция пользователя)"""
+    calories = float(meal.get("calories") or 0)
+    portion = calories / BASE_CALORIES if calories > 0 else 1.0
+
+    content = {
+        "name": meal.get("name") or "",
+        "calories": BASE_CALORIES if calories > 0 else 0,
+        "protein": _per_portion(meal.get("protein"), portion),
+        "carbs": _per_portion(meal.get("carbs"), portion),
+        "fats": _per_portion(meal.get("fats"), portion),
+        "ingredients": meal.get("ingredients") or [],
+        "recipe": meal.get("recipe") or ""
+    }
+    return content, portion
+
+def content_hash(content: Dict[str, Any]) -> str:
+    """sha256 канонического JSON содержимого блюда"""
+    payload = json.dumps(content, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+@instrument_service
+class DishService:
+    """Каталог блюд: планы питания ссылаются на блюда вместо копий JSON"""
+
+    async def resolve_meals(self, meals: List[Dict[str, Any]]) -> List[Tuple[int, float]]:
+        """(id блюда, порция) для каждого блюда; новые блюда добавляются в каталог"""
+        normalized = [normalize_meal(meal) for meal in meals]
+        contents = {content_hash(content): content for content, _ in normalized}
+        ids = await self.get_dish_ids(contents)
+
+        return [
+            (ids[content_hash(content)], portion)
+            for content, portion in normalized
+        ]
+
+    async def get_dish_ids(self, contents: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+        """id блюд по хешам содержимого.
+
+        Сначала чтение: каталог почти всегда уже содержит блюдо, и горячая
+        таблица не получает лишних записей. Отсутствующие вставляются
+        с ON CONFLICT DO NOTHING, гонку с параллельной вставкой добирает
+        повторный SELECT.
+        """
+        if not contents:
+            return {}
+
+        async with get_session() as session:
+            result = await session.execute(
+                select(Dish.content_hash, Dish.id).where(Dish.content_hash.in_(list(contents)))
+            )
+            ids = dict(result.all())
+
+            missing = [
+                dict(content, content_hash=digest)
+                for digest, content in contents.items()
+                if digest not in ids
+            ]
+
+            if missing:
+                result = await session.execute(
+                    pg_insert(Dish)
+                    .values(missing)
+                    .on_conflict_do_nothing(index_elements=[Dish.content_hash])
+                    .returning(Dish.content_hash, Dish.id)
+                )
+                ids.update(result.all())
+
+            if len(ids) < len(contents):
+                result = await session.execute(
+                    select(Dish.content_hash, Dish.id).where(
+                        Dish.content_hash.in_([digest for digest in contents if digest not in ids])
+                    )
+                )
+                ids.update(result.all())
+
+            return ids
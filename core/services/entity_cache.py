@@ -0,0 +1,286 @@
+"""Cache-aside для ORM-сущностей в Redis (общий для бота, API и воркеров).
+
+Сущность хранится как msgpack-список значений колонок в порядке маппера,
+без имен полей. Версия в ключе - хеш колонок моделей: после миграции
+новый код не читает записи старого формата. Чтение отдает detached-объекты
+модели, как после закрытия сессии.
+
+Инвалидация - после коммита транзакции, которая меняла данные
+(core.database.after_commit). Загрузка из БД идет под Redis-локом:
+если ключ инвалидировали во время загрузки, лок удален вместе с ним,
+и устаревшее значение не записывается.
+"""
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+from uuid import uuid4
+import asyncio
+import enum
+import hashlib
+import logging
+import time
+import weakref
+
+import msgpack
+from prometheus_client import Counter, Histogram
+from sqlalchemy import Enum, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from config import settings
+from core.database import after_commit, current_session
+from core.models import MealPlan, User
+from core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+ENTITY_CACHE_REQUESTS = Counter(
+    "entity_cache_requests_total",
+    "Чтения через кеш сущностей",
+    ["namespace", "result"]  # hit, miss, waited, bypass, error
+)
+ENTITY_CACHE_INVALIDATIONS = Counter(
+    "entity_cache_invalidations_total",
+    "Удаленные ключи кеша сущностей",
+    ["namespace"]
+)
+ENTITY_CACHE_LOAD_SECONDS = Histogram(
+    "entity_cache_load_seconds",
+    "Загрузка сущности из БД при промахе",
+    ["namespace"]
+)
+
+_EXT_DATETIME = 1
+_EXT_DATE = 2
+
+# Запись значения, только если лок загрузки все еще наш
+_SET_IF_LOCKED_SCRIPT = """
+if redis.call('GET', KEYS[2]) == ARGV[2] then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+    redis.call('DEL', KEYS[2])
+    return 1
+end
+return 0
+"""
+
+def _encode_ext(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return msgpack.ExtType(_EXT_DATETIME, value.isoformat().encode("utf-8"))
+    if isinstance(value, date):
+        return msgpack.ExtType(_EXT_DATE, value.isoformat().encode("utf-8"))
+    if isinstance(value, enum.Enum):
+        return value.value
+    raise TypeError(f"Cannot serialize {type(value).__name__} to entity cache")
+
+def _decode_ext(code: int, data: bytes) -> Any:
+    if code == _EXT_DATETIME:
+        return datetime.fromisoformat(data.decode("utf-8"))
+    if code == _EXT_DATE:
+        return date.fromisoformat(data.decode("utf-8"))
+    return msgpack.ExtType(code, data)
+
+class _Codec:
+    """Сущность <-> список значений колонок (и many-to-one связей)"""
+
+    def __init__(self, model: type, related: Sequence[str] = ()):
+        mapper = inspect(model)
+        self.mapper = mapper
+        self.columns = [(attr.key, attr.columns[0].type) for attr in mapper.column_attrs]
+        self.related = [
+            (key, _Codec(mapper.relationships[key].mapper.class_)) for key in related
+        ]
+
+    @property
+    def signature(self) -> str:
+        parts = [f"{key}:{type_}" for key, type_ in self.columns]
+        parts += [f"{key}({codec.signature})" for key, codec in self.related]
+        return f"{self.mapper.class_.__name__}[{','.join(parts)}]"
+
+    def dump(self, obj: Any) -> Optional[List[Any]]:
+        if obj is None:
+            return None
+        row = [getattr(obj, key) for key, _ in self.columns]
+        row.extend(codec.dump(getattr(obj, key)) for key, codec in self.related)
+        return row
+
+    def load(self, row: Optional[List[Any]]) -> Any:
+        if row is None:
+            return None
+
+        obj = self.mapper.class_manager.new_instance()
+        for (key, type_), value in zip(self.columns, row):
+            if value is not None and isinstance(type_, Enum) and type_.enum_class is not None:
+                value = type_.enum_class(value)
+            set_committed_value(obj, key, value)
+
+        offset = len(self.columns)
+        for index, (key, codec) in enumerate(self.related):
+            set_committed_value(obj, key, codec.load(row[offset + index]))
+
+        # Объект с identity, как после закрытия сессии: session.merge/add не вставит дубль
+        make_transient_to_detached(obj)
+        return obj
+
+class EntityCache:
+    """Кеш сущности (или списка сущностей) по идентификатору.
+
+    Промахи одного ключа в процессе объединяются в одну загрузку,
+    между процессами - через Redis-лок: остальные ждут значение
+    до ENTITY_CACHE_LOCK_WAIT и только потом идут в БД сами.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        model: type,
+        related: Sequence[str] = (),
+        many: bool = False,
+        ttl: int = settings.ENTITY_CACHE_TTL
+    ):
+        self.namespace = namespace
+        self.many = many
+        self.ttl = ttl
+        self._codec = _Codec(model, related)
+        self.version = hashlib.sha1(self._codec.signature.encode("utf-8")).hexdigest()[:8]
+        self._script = None
+        # Загрузки в полете: futures привязаны к event loop
+        self._inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Any, asyncio.Future]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def key(self, ident: Any) -> str:
+        return f"entity:{self.namespace}:{self.version}:{ident}"
+
+    async def get(self, ident: Any, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Значение из кеша, при промахе - loader() с записью в кеш"""
+        # После записи в текущей единице работы читаем свои же изменения из БД
+        session = current_session()
+        if session is not None and session.info.get("has_writes"):
+            ENTITY_CACHE_REQUESTS.labels(self.namespace, "bypass").inc()
+            return await loader()
+
+        inflight = self._inflight.setdefault(asyncio.get_running_loop(), {})
+        future = inflight.get(ident)
+        if future is not None:
+            ENTITY_CACHE_REQUESTS.labels(self.namespace, "waited").inc()
+            try:
+                return self._decode(await asyncio.shield(future))
+            except asyncio.CancelledError:
+                # Отменили загружающего, а не нас - загружаем сами
+                if not future.cancelled():
+                    raise
+                return await loader()
+
+        future = inflight[ident] = asyncio.get_running_loop().create_future()
+        try:
+            payload = await self._fetch(ident, loader)
+            future.set_result(payload)
+        except Exception as e:
+            future.set_exception(e)
+            # Ошибку получат ожидающие; если их нет - не ругаемся в лог loop
+            future.exception()
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            inflight.pop(ident, None)
+
+        return self._decode(payload)
+
+    async def invalidate(self, *idents: Any) -> None:
+        """Удалить значения и локи загрузки (загрузка в полете не запишет старое)"""
+        if not idents:
+            return
+
+        keys = [self.key(ident) for ident in idents]
+        try:
+            await get_redis(settings.REDIS_CACHE_DB).delete(*keys, *(f"{key}:lock" for key in keys))
+            ENTITY_CACHE_INVALIDATIONS.labels(self.namespace).inc(len(keys))
+        except Exception as e:
+            # Значение истечет по TTL
+            logger.warning(f"Entity cache invalidation failed for {keys}: {e}")
+
+    def invalidate_after_commit(self, session: AsyncSession, *idents: Any) -> None:
+        """Инвалидация после коммита транзакции session"""
+        # UPDATE ... RETURNING не проходит через flush: отмечаем запись сами,
+        # чтобы чтения до коммита шли в БД, а не в кеш
+        session.info["has_writes"] = True
+        after_commit(session, lambda: self.invalidate(*idents))
+
+    async def _fetch(self, ident: Any, loader: Callable[[], Awaitable[Any]]) -> bytes:
+        """msgpack-значение: из Redis, иначе из БД под локом"""
+        key = self.key(ident)
+        lock_key = f"{key}:lock"
+        token = uuid4().hex
+        redis = get_redis(settings.REDIS_CACHE_DB)
+
+        try:
+            cached = await redis.get(key)
+            if cached is not None:
+                ENTITY_CACHE_REQUESTS.labels(self.namespace, "hit").inc()
+                return cached
+
+            locked = await redis.set(lock_key, token, nx=True, px=int(settings.ENTITY_CACHE_LOCK_TTL * 1000))
+            if not locked:
+                cached = await self._wait_for_value(key)
+                if cached is not None:
+                    ENTITY_CACHE_REQUESTS.labels(self.namespace, "waited").inc()
+                    return cached
+        except Exception as e:
+            # Недоступный Redis не должен ломать чтение
+            logger.warning(f"Entity cache read failed for {key}: {e}")
+            ENTITY_CACHE_REQUESTS.labels(self.namespace, "error").inc()
+            return self._encode(await loader())
+
+        ENTITY_CACHE_REQUESTS.labels(self.namespace, "miss").inc()
+        started = time.perf_counter()
+        payload = self._encode(await loader())
+        ENTITY_CACHE_LOAD_SECONDS.labels(self.namespace).observe(time.perf_counter() - started)
+
+        if locked:
+            try:
+                if self._script is None:
+                    self._script = redis.register_script(_SET_IF_LOCKED_SCRIPT)
+                await self._script(keys=[key, lock_key], args=[payload, token, self.ttl], client=redis)
+            except Exception as e:
+                logger.warning(f"Entity cache write failed for {key}: {e}")
+
+        return payload
+
+    async def _wait_for_value(self, key: str) -> Optional[bytes]:
+        """Ждем, пока держатель лока запишет значение"""
+        redis = get_redis(settings.REDIS_CACHE_DB)
+        deadline = time.monotonic() + settings.ENTITY_CACHE_LOCK_WAIT
+
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+            cached = await redis.get(key)
+            if cached is not None:
+                return cached
+
+        return None
+
+    def _encode(self, value: Any) -> bytes:
+        if self.many:
+            data = [self._codec.dump(obj) for obj in value]
+        else:
+            data = self._codec.dump(value)
+        return msgpack.packb(data, default=_encode_ext, use_bin_type=True)
+
+    def _decode(self, payload: bytes) -> Any:
+        """Новые объекты на каждый вызов: вызывающий может их менять"""
+        data = msgpack.unpackb(payload, ext_hook=_decode_ext, raw=False)
+        if self.many:
+            return [self._codec.load(row) for row in data]
+        return self._codec.load(data)
+
+# Профиль по telegram_id (None тоже кешируется до регистрации)
+user_cache = EntityCache("user", User)
+
+# Активные планы питания пользователя по user_id, с блюдами каталога
+active_meal_plans_cache = EntityCache(
+    "meal_plans",
+    MealPlan,
+    related=("breakfast_dish", "lunch_dish", "dinner_dish", "snack_dish"),
+    many=True
+)
@@ -1,7 +1,16 @@
 from typing import Dict, Any, List
-import openai
 from datetime import datetime, timedelta
+from sqlalchemy import update
 
+from core.database import get_session
+from core.query_metrics import instrument_service
+from core.models import MealPlan
+from core.services.dish_service import DishService
+from core.services.entity_cache import active_meal_plans_cache
+
+MEAL_TYPES = ("breakfast", "lunch", "dinner", "snack")
+
+@instrument_service
 class NutritionService:
     """Сервис для работы с питанием"""
     
@@ -100,6 +109,28 @@ class NutritionService:
         # Для примера возвращаем заглушку
         return self._generate_sample_meal_plan(user_data, days)
     
+    async def update_meal(
+        self,
+        meal_plan_id: int,
+        meal_type: str,
+        meal: Dict[str, Any]
+    ) -> None:
+        """Заменить блюдо в плане: ссылка на блюдо каталога и порция"""
+        if meal_type not in MEAL_TYPES:
+            raise ValueError(f"Unknown meal type: {meal_type}")
+        
+        [(dish_id, portion)] = await DishService().resolve_meals([meal])
+        
+        async with get_session() as session:
+            user_id = await session.scalar(
+                update(MealPlan)
+                .where(MealPlan.id == meal_plan_id)
+                .values({f"{meal_type}_dish_id": dish_id, f"{meal_type}_portion": portion})
+                .returning(MealPlan.user_id)
+            )
+            if user_id is not None:
+                active_meal_plans_cache.invalidate_after_commit(session, user_id)
+    
     def _generate_sample_meal_plan(self, user_data: Dict, days: int) -> List[Dict]:
         """Пример генерации плана питания"""
         meal_plan = []
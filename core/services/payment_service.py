@@ -1,11 +1,13 @@
 from typing import Optional, Dict, Any
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select, insert, update
 
-from core.database import get_session
+from core.database import get_session, get_read_session
+from core.query_metrics import instrument_service
 from core.models import Payment, User
 
+@instrument_service
 class PaymentService:
     """Сервис для работы с платежами"""
     
@@ -21,22 +23,20 @@ class PaymentService:
     ) -> Payment:
         """Создание записи о платеже"""
         async with get_session() as session:
-            payment = Payment(
-                user_id=user_id,
-                amount=amount,
-                currency=currency,
-                subscription_type=subscription_type,
-                provider=provider,
-                provider_payment_id=provider_payment_id,
-                status=status,
-                paid_at=datetime.utcnow() if status == "succeeded" else None
+            return await session.scalar(
+                insert(Payment)
+                .values(
+                    user_id=user_id,
+                    amount=amount,
+                    currency=currency,
+                    subscription_type=subscription_type,
+                    provider=provider,
+                    provider_payment_id=provider_payment_id,
+                    status=status,
+                    paid_at=datetime.utcnow() if status == "succeeded" else None
+                )
+                .returning(Payment)
             )
-            
-            session.add(payment)
-            await session.commit()
-            await session.refresh(payment)
-            
-            return payment
     
     async def get_payment(self, payment_id: int) -> Optional[Payment]:
         """Получение платежа по ID"""
@@ -48,7 +48,7 @@ class PaymentService:
     
     async def get_user_payments(self, user_id: int) -> list[Payment]:
         """Получение всех платежей пользователя"""
-        async with get_session() as session:
+        async with get_read_session() as session:
             result = await session.execute(
                 select(Payment)
                 .where(Payment.user_id == user_id)
@@ -62,23 +62,18 @@ class PaymentService:
         status: str
     ) -> Optional[Payment]:
         """Обновление статуса платежа"""
+        values = {"status": status}
+        if status == "succeeded":
+            values["paid_at"] = datetime.utcnow()
+        
         async with get_session() as session:
-            result = await session.execute(
-                select(Payment).where(
-                    Payment.provider_payment_id == provider_payment_id
-                )
+            return await session.scalar(
+                update(Payment)
+                .where(Payment.provider_payment_id == provider_payment_id)
+                .values(**values)
+                .returning(Payment)
+                .execution_options(populate_existing=True)
             )
-            payment = result.scalar_one_or_none()
-            
-            if payment:
-                payment.status = status
-                if status == "succeeded":
-                    payment.paid_at = datetime.utcnow()
-                
-                await session.commit()
-                await session.refresh(payment)
-            
-            return payment
     
     async def process_webhook(self, provider: str, data: Dict[str, Any]) -> bool:
         """Обработка вебхука от платежной системы"""
@@ -3,9 +3,13 @@ from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, and_
 
-from core.database import get_session
+from core.database import get_session, get_read_session
+from core.query_metrics import instrument_service
+from core.queries import LOG_WEIGHT, UPSERT_USER, USER_BY_TELEGRAM_ID
+from core.services.entity_cache import active_meal_plans_cache, user_cache
 from core.models import User, MealPlan, DailyCheckIn, WeightLog, UserStatus
 
+@instrument_service
 class UserService:
     """Сервис для работы с пользователями"""
     
@@ -16,44 +20,26 @@ class UserService:
         first_name: Optional[str] = None,
         last_name: Optional[str] = None
     ) -> User:
-        """Получить или создать пользователя"""
+        """Получить или создать пользователя (один upsert)"""
         async with get_session() as session:
-            # Проверяем существование
-            result = await session.execute(
-                select(User).where(User.telegram_id == telegram_id)
-            )
-            user = result.scalar_one_or_none()
-            
-            if user:
-                # Обновляем последнюю активность
-                user.last_activity = datetime.utcnow()
-                await session.commit()
-                return user
-            
-            # Создаем нового пользователя
-            user = User(
-                telegram_id=telegram_id,
-                username=username,
-                first_name=first_name or "Пользователь",
-                last_name=last_name,
-                status=UserStatus.TRIAL,
-                trial_start=datetime.utcnow(),
-                created_at=datetime.utcnow()
-            )
-            
-            session.add(user)
-            await session.commit()
-            await session.refresh(user)
-            
+            user = await session.scalar(UPSERT_USER, {
+                "telegram_id": telegram_id,
+                "username": username,
+                "first_name": first_name or "Пользователь",
+                "last_name": last_name,
+                "now": datetime.utcnow()
+            })
+            user_cache.invalidate_after_commit(session, telegram_id)
             return user
     
     async def get_user(self, telegram_id: int) -> Optional[User]:
-        """Получить пользователя по telegram_id"""
-        async with get_session() as session:
-            result = await session.execute(
-                select(User).where(User.telegram_id == telegram_id)
-            )
-            return result.scalar_one_or_none()
+        """Получить пользователя по telegram_id (через кеш профилей)"""
+        async def load() -> Optional[User]:
+            async with get_session() as session:
+                result = await session.execute(USER_BY_TELEGRAM_ID, {"telegram_id": telegram_id})
+                return result.scalar_one_or_none()
+        
+        return await user_cache.get(telegram_id, load)
     
     async def update_user_profile(
         self,
@@ -61,26 +47,19 @@ class UserService:
         **kwargs
     ) -> User:
         """Обновить профиль пользователя"""
-        async with get_session() as session:
-            result = await session.execute(
-                select(User).where(User.telegram_id == telegram_id)
-            )
-            user = result.scalar_one_or_none()
-            
-            if not user:
-                raise ValueError(f"User with telegram_id {telegram_id} not found")
-            
-            # Обновляем поля
-            for key, value in kwargs.items():
-                if hasattr(user, key):
-                    setattr(user, key, value)
-            
-            user.updated_at = datetime.utcnow()
-            
-            await session.commit()
-            await session.refresh(user)
-            
-            return user
+        # Обновляем только колонки пользователя
+        values = {
+            key: value for key, value in kwargs.items()
+            if key in User.__table__.columns
+        }
+        values["updated_at"] = datetime.utcnow()
+        
+        user = await self._update_user(User.telegram_id == telegram_id, values)
+        
+        if not user:
+            raise ValueError(f"User with telegram_id {telegram_id} not found")
+        
+        return user
     
     async def update_nutrition_targets(
         self,
@@ -88,23 +67,19 @@ class UserService:
         nutrition_data: Dict[str, int]
     ) -> User:
         """Обновить целевые показатели питания"""
-        async with get_session() as session:
-            user = await session.get(User, user_id)
-            
-            if not user:
-                raise ValueError(f"User with id {user_id} not found")
-            
-            user.bmr = nutrition_data.get("bmr")
-            user.tdee = nutrition_data.get("tdee")
-            user.daily_calories = nutrition_data["calories"]
-            user.daily_protein = nutrition_data["protein"]
-            user.daily_carbs = nutrition_data["carbs"]
-            user.daily_fats = nutrition_data["fats"]
-            
-            await session.commit()
-            await session.refresh(user)
-            
-            return user
+        user = await self._update_user(User.id == user_id, {
+            "bmr": nutrition_data.get("bmr"),
+            "tdee": nutrition_data.get("tdee"),
+            "daily_calories": nutrition_data["calories"],
+            "daily_protein": nutrition_data["protein"],
+            "daily_carbs": nutrition_data["carbs"],
+            "daily_fats": nutrition_data["fats"]
+        })
+        
+        if not user:
+            raise ValueError(f"User with id {user_id} not found")
+        
+        return user
     
     async def update_subscription(
         self,
@@ -115,77 +90,65 @@ class UserService:
         subscription_end: datetime
     ) -> User:
         """Обновить подписку пользователя"""
-        async with get_session() as session:
-            user = await session.get(User, user_id)
-            
-            if not user:
-                raise ValueError(f"User with id {user_id} not found")
-            
-            user.status = UserStatus(status)
-            user.subscription_type = subscription_type
-            user.subscription_start = subscription_start
-            user.subscription_end = subscription_end
-            user.updated_at = datetime.utcnow()
-            
-            await session.commit()
-            await session.refresh(user)
-            
-            return user
+        user = await self._update_user(User.id == user_id, {
+            "status": UserStatus(status),
+            "subscription_type": subscription_type,
+            "subscription_start": subscription_start,
+            "subscription_end": subscription_end,
+            "updated_at": datetime.utcnow()
+        })
+        
+        if not user:
+            raise ValueError(f"User with id {user_id} not found")
+        
+        return user
     
     async def cancel_subscription(self, user_id: int) -> User:
         """Отменить подписку (отключить автопродление)"""
-        async with get_session() as session:
-            user = await session.get(User, user_id)
-            
-            if not user:
-                raise ValueError(f"User with id {user_id} not found")
-            
-            user.status = UserStatus.CANCELLED
-            user.updated_at = datetime.utcnow()
-            
-            await session.commit()
-            await session.refresh(user)
-            
-            return user
+        user = await self._update_user(User.id == user_id, {
+            "status": UserStatus.CANCELLED,
+            "updated_at": datetime.utcnow()
+        })
+        
+        if not user:
+            raise ValueError(f"User with id {user_id} not found")
+        
+        return user
     
     async def get_meal_plans(
         self,
         user_id: int,
         week: Optional[int] = None
     ) -> List[MealPlan]:
-        """Получить планы питания пользователя"""
-        async with get_session() as session:
-            query = select(MealPlan).where(
-                MealPlan.user_id == user_id,
-                MealPlan.is_active == True
-            )
-            
-            if week:
-                query = query.where(MealPlan.week_number == week)
-            
-            query = query.order_by(MealPlan.day_number)
-            
-            result = await session.execute(query)
-            return result.scalars().all()
+        """Получить планы питания пользователя.
+        
+        В кеше - все активные планы пользователя, неделя фильтруется здесь.
+        """
+        async def load() -> List[MealPlan]:
+            async with get_read_session() as session:
+                result = await session.execute(
+                    select(MealPlan).where(
+                        MealPlan.user_id == user_id,
+                        MealPlan.is_active == True
+                    ).order_by(MealPlan.week_number, MealPlan.day_number)
+                )
+                return result.scalars().all()
+        
+        meal_plans = await active_meal_plans_cache.get(user_id, load)
+        
+        if week:
+            meal_plans = [plan for plan in meal_plans if plan.week_number == week]
+        
+        return sorted(meal_plans, key=lambda plan: plan.day_number)
     
     async def create_checkin(
         self,
         user_id: int,
         **checkin_data
     ) -> DailyCheckIn:
-        """Создать чек-ин"""
-        async with get_session() as session:
-            checkin = DailyCheckIn(
-                user_id=user_id,
-                date=datetime.utcnow(),
-                **checkin_data
-            )
-            
-            session.add(checkin)
-            await session.commit()
-            await session.refresh(checkin)
-            
-            return checkin
+        """Создать или дополнить чек-ин за сегодня"""
+        from core.services.checkin_service import CheckInService
+        return await CheckInService().upsert_checkin(user_id, **checkin_data)
     
     async def log_weight(
         self,
@@ -194,28 +157,29 @@ class UserService:
     ) -> WeightLog:
         """Записать вес пользователя"""
         async with get_session() as session:
-            # Получаем пользователя
-            result = await session.execute(
-                select(User).where(User.telegram_id == telegram_id)
-            )
-            user = result.scalar_one_or_none()
-            
-            if not user:
+            # Текущий вес пользователя и запись в лог - один запрос (CTE)
+            weight_log = await session.scalar(LOG_WEIGHT, {
+                "telegram_id": telegram_id,
+                "weight": weight,
+                "now": datetime.utcnow()
+            })
+            
+            if not weight_log:
                 raise ValueError(f"User with telegram_id {telegram_id} not found")
             
-            # Создаем запись веса
-            weight_log = WeightLog(
-                user_id=user.id,
-                weight=weight,
-                date=datetime.utcnow()
+            user_cache.invalidate_after_commit(session, telegram_id)
+            return weight_log
+    
+    async def _update_user(self, condition, values: Dict[str, Any]) -> Optional[User]:
+        """UPDATE users ... RETURNING: обновленный пользователь за один запрос"""
+        async with get_session() as session:
+            user = await session.scalar(
+                update(User)
+                .where(condition)
+                .values(**values)
+                .returning(User)
+                .execution_options(populate_existing=True)
             )
-            
-            # Обновляем текущий вес пользователя
-            user.weight = weight
-            user.updated_at = datetime.utcnow()
-            
-            session.add(weight_log)
-            await session.commit()
-            await session.refresh(weight_log)
-            
-            return weight_log
\ No newline at end of file
+            if user:
+                user_cache.invalidate_after_commit(session, user.telegram_id)
+            return user
\ No newline at end of file
@@ -0,0 +1,253 @@
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Connection
+
+from core.database import get_read_session
+from core.models import Exercise, WorkoutTemplate
+
+logger = logging.getLogger(__name__)
+
+# Шаблон без привязки к цели - используется, если для цели нет своего
+ANY_GOAL = "any"
+
+# Параметры упражнения, которые задает шаблон и может переопределить план
+EXERCISE_PARAMS = ("sets", "reps", "duration", "rest")
+
+# Библиотека упражнений: название -> описание и совет
+EXERCISES: Dict[str, Dict[str, Optional[str]]] = {
+    "Приседания": {
+        "description": "Приседай до параллели бедер с полом",
+        "tips": "Держи спину прямо, колени не выходят за носки"
+    },
+    "Отжимания от колен": {
+        "description": "Отжимания с упором на колени",
+        "tips": "Держи корпус прямым, опускайся медленно"
+    },
+    "Планка": {
+        "description": "Статическое удержание положения",
+        "tips": "Не прогибай поясницу, дыши ровно"
+    },
+    "Выпады": {
+        "description": "Попеременные выпады вперед",
+        "tips": "Колено не касается пола, держи баланс"
+    },
+    "Приседания с прыжком": {"description": "Приседание с выпрыгиванием вверх"},
+    "Отжимания": {"description": "Классические отжимания"},
+    "Берпи": {"description": "Комплексное упражнение"},
+    "Альпинист": {"description": "Бег в упоре лежа"},
+    "Приседания на одной ноге": {},
+    "Отжимания с хлопком": {},
+    "Берпи с отжиманием": {},
+    "Прыжки на тумбу": {},
+    "Планка с подъемом ног": {},
+    "Ходьба на месте": {"description": "Разминка"},
+    "Прыжки звездочкой": {},
+    "Высокие колени": {},
+    "Бег на месте": {},
+    "Интервальный бег": {"description": "30 сек быстро, 30 сек отдых"},
+    "Прыжки на скакалке": {}
+}
+
+_CARDIO_ADVANCED = [
+    ("Интервальный бег", {"duration": 30, "sets": 8, "rest": 30}),
+    ("Берпи", {"sets": 4, "reps": 15, "rest": 45}),
+    ("Прыжки на скакалке", {"duration": 120, "sets": 3, "rest": 60})
+]
+
+# Шаблоны тренировок: (тип, сложность, цель) -> длительность и упражнения с параметрами
+TEMPLATES: Dict[Tuple[str, str, str], Dict[str, Any]] = {
+    ("strength", "beginner", ANY_GOAL): {
+        "duration_minutes": 30,
+        "exercises": [
+            ("Приседания", {"sets": 3, "reps": 12, "rest": 60}),
+            ("Отжимания от колен", {"sets": 3, "reps": 10, "rest": 60}),
+            ("Планка", {"duration": 30, "sets": 3, "rest": 45}),
+            ("Выпады", {"sets": 3, "reps": 10, "rest": 60})
+        ]
+    },
+    ("strength", "intermediate", ANY_GOAL): {
+        "duration_minutes": 45,
+        "exercises": [
+            ("Приседания с прыжком", {"sets": 4, "reps": 15, "rest": 45}),
+            ("Отжимания", {"sets": 4, "reps": 15, "rest": 45}),
+            ("Берпи", {"sets": 3, "reps": 10, "rest": 60}),
+            ("Альпинист", {"duration": 45, "sets": 3, "rest": 45}),
+            ("Планка", {"duration": 60, "sets": 3, "rest": 45})
+        ]
+    },
+    ("strength", "advanced", ANY_GOAL): {
+        "duration_minutes": 45,
+        "exercises": [
+            ("Приседания на одной ноге", {"sets": 4, "reps": 10, "rest": 60}),
+            ("Отжимания с хлопком", {"sets": 4, "reps": 12, "rest": 60}),
+            ("Берпи с отжиманием", {"sets": 4, "reps": 15, "rest": 60}),
+            ("Прыжки на тумбу", {"sets": 4, "reps": 12, "rest": 60}),
+            ("Планка с подъемом ног", {"duration": 90, "sets": 3, "rest": 45})
+        ]
+    },
+    ("cardio", "beginner", ANY_GOAL): {
+        "duration_minutes": 30,
+        "exercises": [
+            ("Ходьба на месте", {"duration": 300}),
+            ("Прыжки звездочкой", {"duration": 30, "sets": 3, "rest": 30}),
+            ("Высокие колени", {"duration": 30, "sets": 3, "rest": 30}),
+            ("Бег на месте", {"duration": 60, "sets": 3, "rest": 45})
+        ]
+    },
+    ("cardio", "intermediate", ANY_GOAL): {"duration_minutes": 45, "exercises": _CARDIO_ADVANCED},
+    ("cardio", "advanced", ANY_GOAL): {"duration_minutes": 45, "exercises": _CARDIO_ADVANCED}
+}
+
+def seed_workout_library(conn: Connection) -> None:
+    """Заполнить библиотеку упражнений и шаблоны (повторный запуск ничего не меняет)"""
+    conn.execute(
+        pg_insert(Exercise)
+        .values([
+            {"name": name, "description": fields.get("description"), "tips": fields.get("tips")}
+            for name, fields in EXERCISES.items()
+        ])
+        .on_conflict_do_nothing(index_elements=["name"])
+    )
+    exercise_ids = dict(conn.execute(select(Exercise.name, Exercise.id)).all())
+
+    conn.execute(
+        pg_insert(WorkoutTemplate)
+        .values([
+            {
+                "workout_type": workout_type,
+                "difficulty": difficulty,
+                "goal": goal,
+                "duration_minutes": template["duration_minutes"],
+                "exercises": [
+                    dict(params, exercise_id=exercise_ids[name])
+                    for name, params in template["exercises"]
+                ]
+            }
+            for (workout_type, difficulty, goal), template in TEMPLATES.items()
+        ])
+        .on_conflict_do_nothing(constraint="uq_workout_templates_type_difficulty_goal")
+    )
+
+@dataclass(frozen=True)
+class TemplateView:
+    """Неизменяемый шаблон из кеша процесса"""
+    id: int
+    workout_type: str
+    difficulty: str
+    goal: str
+    duration_minutes: int
+    exercises: Tuple[Mapping[str, Any], ...]
+
+class WorkoutLibrary:
+    """Упражнения и шаблоны тренировок, загруженные один раз на процесс.
+
+    Данные меняются только миграциями, поэтому кеш не инвалидируется:
+    после загрузки все чтения идут из памяти. load() вызывает точка входа
+    процесса при старте; чтение до загрузки - ошибка, а не пустой результат. Шаблоны и упражнения
+    неизменяемы (MappingProxyType, кортежи) - их можно безопасно
+    отдавать в обработчики без копирования.
+    """
+
+    def __init__(self):
+        self._templates: Mapping[int, TemplateView] = MappingProxyType({})
+        self._by_key: Mapping[Tuple[str, str, str], TemplateView] = MappingProxyType({})
+        self._loaded = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    async def load(self, force: bool = False) -> None:
+        """Загрузить библиотеку из БД (повторные вызовы ничего не делают)"""
+        if self._loaded and not force:
+            return
+
+        async with get_read_session() as session:
+            exercises = (await session.execute(select(Exercise))).scalars().all()
+            templates = (await session.execute(select(WorkoutTemplate))).scalars().all()
+
+        library = {
+            exercise.id: {"name": exercise.name, "description": exercise.description, "tips": exercise.tips}
+            for exercise in exercises
+        }
+
+        views = {}
+        for template in templates:
+            views[template.id] = TemplateView(
+                id=template.id,
+                workout_type=template.workout_type,
+                difficulty=template.difficulty,
+                goal=template.goal,
+                duration_minutes=template.duration_minutes,
+                exercises=tuple(
+                    MappingProxyType(self._exercise(library[item["exercise_id"]], item))
+                    for item in template.exercises or []
+                    if item.get("exercise_id") in library
+                )
+            )
+
+        # Замена целиком: читатели видят либо старую, либо новую версию
+        self._templates = MappingProxyType(views)
+        self._by_key = MappingProxyType({
+            (view.workout_type, view.difficulty, view.goal): view for view in views.values()
+        })
+        self._loaded = True
+        logger.info(f"Workout library loaded: {len(library)} exercises, {len(views)} templates")
+
+    def _require_loaded(self) -> None:
+        if not self._loaded:
+            raise RuntimeError("Workout library is not loaded: await workout_library.load() at process startup")
+
+    def get(self, template_id: Optional[int]) -> Optional[TemplateView]:
+        """Шаблон по id"""
+        self._require_loaded()
+        return self._templates.get(template_id)
+
+    def find(self, workout_type: str, difficulty: str, goal: Optional[str] = None) -> Optional[TemplateView]:
+        """Шаблон для цели, иначе общий для всех целей"""
+        self._require_loaded()
+        return self._by_key.get((workout_type, difficulty, goal)) or self._by_key.get(
+            (workout_type, difficulty, ANY_GOAL)
+        )
+
+    def exercises(
+        self,
+        template_id: Optional[int],
+        overrides: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Mapping[str, Any], ...]:
+        """Упражнения шаблона с правками плана пользователя.
+
+        overrides: {"<позиция>": {"reps": 15, ...}} - параметры упражнения
+        по его позиции в шаблоне.
+        """
+        template = self.get(template_id)
+        if template is None:
+            return ()
+
+        if not overrides:
+            return template.exercises
+
+        return tuple(
+            MappingProxyType({
+                **exercise,
+                **{
+                    key: value for key, value in (overrides.get(str(position)) or {}).items()
+                    if key in EXERCISE_PARAMS
+                }
+            })
+            for position, exercise in enumerate(template.exercises)
+        )
+
+    @staticmethod
+    def _exercise(exercise: Dict[str, Any], item: Dict[str, Any]) -> Dict[str, Any]:
+        """Упражнение библиотеки с параметрами шаблона"""
+        result = {key: value for key, value in exercise.items() if value is not None}
+        result.update({key: item[key] for key in EXERCISE_PARAMS if item.get(key) is not None})
+        return result
+
+workout_library = WorkoutLibrary()
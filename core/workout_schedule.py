@@ -0,0 +1,86 @@
+from datetime import date, timedelta
+from typing import Any, Optional, Tuple
+
+from core.models import User, WorkoutPlan
+from core.workout_library import workout_library
+
+# Сложность и дни тренировок (1 - понедельник) по уровню активности
+DIFFICULTY_BY_ACTIVITY = {
+    "sedentary": ("beginner", (1, 3, 5)),
+    "light": ("beginner", (1, 3, 5)),
+    "moderate": ("intermediate", (1, 2, 4, 5)),
+    "active": ("advanced", (1, 2, 3, 4, 5, 6)),
+    "very_active": ("advanced", (1, 2, 3, 4, 5, 6))
+}
+
+# Длительность и ккал/мин для оценки расхода
+DURATION_BY_DIFFICULTY = {"beginner": 30, "intermediate": 45, "advanced": 45}
+CALORIES_PER_MINUTE = {"strength": 5, "cardio": 8, "mixed": 6, "rest": 0}
+DIFFICULTY_MULTIPLIER = {"beginner": 0.8, "intermediate": 1.0, "advanced": 1.3}
+
+def _value(field: Any) -> Optional[str]:
+    """Значение enum-поля модели или строка как есть"""
+    return getattr(field, "value", field)
+
+def program_start(user: User) -> date:
+    """Начало программы: дата онбординга, для старых пользователей - регистрации"""
+    if user.program_start:
+        return user.program_start
+    return user.created_at.date() if user.created_at else date.today()
+
+def difficulty_for(activity_level: Any) -> Tuple[str, Tuple[int, ...]]:
+    """(сложность, дни тренировок) для уровня активности"""
+    return DIFFICULTY_BY_ACTIVITY.get(_value(activity_level), DIFFICULTY_BY_ACTIVITY["active"])
+
+def week_and_day(start: date, day: date) -> Tuple[int, int]:
+    """(неделя программы с 1, день недели 1-7); недели начинаются с понедельника"""
+    first_monday = start - timedelta(days=start.weekday())
+    return (day - first_monday).days // 7 + 1, day.isoweekday()
+
+def estimate_calories(workout_type: str, difficulty: str, weight: Optional[float]) -> int:
+    """Оценка сожженных калорий"""
+    return int(
+        CALORIES_PER_MINUTE.get(workout_type, 5) *
+        DURATION_BY_DIFFICULTY.get(difficulty, 45) *
+        DIFFICULTY_MULTIPLIER.get(difficulty, 1.0) *
+        ((weight or 70) / 70)  # Корректировка на вес
+    )
+
+def scheduled_workout(user: User, day: date) -> Optional[WorkoutPlan]:
+    """Тренировка по расписанию на дату, без обращения к БД.
+
+    Программа детерминирована: сложность и дни - по уровню активности,
+    тип чередуется по четности недели. Возвращается несохраненный
+    WorkoutPlan; в БД пишутся только выполнения и отклонения.
+    None - день отдыха или дата до начала программы.
+    """
+    start = program_start(user)
+    if day < start:
+        return None
+
+    difficulty, workout_days = difficulty_for(user.activity_level)
+    week, weekday = week_and_day(start, day)
+
+    if weekday not in workout_days:
+        return None
+
+    # Чередуем типы тренировок
+    if week % 2 == 0:
+        workout_type = "strength" if weekday % 2 == 1 else "cardio"
+    else:
+        workout_type = "cardio" if weekday % 2 == 1 else "strength"
+
+    template = workout_library.find(workout_type, difficulty, _value(user.goal))
+
+    return WorkoutPlan(
+        user_id=user.id,
+        scheduled_date=day,
+        week_number=week,
+        day_number=weekday,
+        workout_type=workout_type,
+        duration_minutes=template.duration_minutes if template else DURATION_BY_DIFFICULTY[difficulty],
+        difficulty=difficulty,
+        template_id=template.id if template else None,
+        calories_burned=estimate_calories(workout_type, difficulty, user.weight),
+        completed=False
+    )
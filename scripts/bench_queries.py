@@ -0,0 +1,123 @@
+"""Микробенчмарк подготовки горячих запросов: сборка в методе против core.queries.
+
+На каждый execute SQLAlchemy строит выражение, вычисляет ключ кеша
+и ищет скомпилированный SQL в кеше движка. Скрипт повторяет этот путь
+(_compile_w_cache с общим LRU-кешем и диалектом asyncpg) без обращения
+к БД: "inline" - выражение собирается при каждом вызове, как раньше
+в сервисах, "precompiled" - неизменное выражение из core.queries.
+С --with-db дополнительно замеряется полный запрос через get_session.
+
+Запуск: python scripts/bench_queries.py --iterations 20000 --with-db
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "bot")]
+
+from sqlalchemy import insert, literal, select, update  # noqa: E402
+from sqlalchemy.dialects.postgresql import insert as pg_insert  # noqa: E402
+from sqlalchemy.dialects.postgresql.asyncpg import dialect as asyncpg_dialect  # noqa: E402
+from sqlalchemy.util import LRUCache  # noqa: E402
+
+from core.database import dispose_engines, get_session, set_database_role  # noqa: E402
+from core.models import User, UserStatus, WeightLog  # noqa: E402
+from core.queries import LOG_WEIGHT, UPSERT_USER, USER_BY_TELEGRAM_ID  # noqa: E402
+
+BENCH_TELEGRAM_ID = 999999002
+
+def inline_user(telegram_id: int):
+    return select(User).where(User.telegram_id == telegram_id)
+
+def inline_upsert(telegram_id: int):
+    now = datetime.utcnow()
+    return (
+        pg_insert(User)
+        .values(
+            telegram_id=telegram_id, username=None, first_name="bench", last_name=None,
+            status=UserStatus.TRIAL, trial_start=now, created_at=now, last_activity=now
+        )
+        .on_conflict_do_update(index_elements=[User.telegram_id], set_={"last_activity": now})
+        .returning(User)
+    )
+
+def inline_log_weight(telegram_id: int):
+    now = datetime.utcnow()
+    updated_user = (
+        update(User)
+        .where(User.telegram_id == telegram_id)
+        .values(weight=70.0, updated_at=now)
+        .returning(User.id)
+        .cte("updated_user")
+    )
+    return insert(WeightLog).from_select(
+        ["user_id", "weight", "date"],
+        select(updated_user.c.id, literal(70.0), literal(now))
+    ).returning(WeightLog)
+
+CASES = {
+    "user_by_telegram_id": (inline_user, lambda telegram_id: USER_BY_TELEGRAM_ID),
+    "upsert_user": (inline_upsert, lambda telegram_id: UPSERT_USER),
+    "log_weight": (inline_log_weight, lambda telegram_id: LOG_WEIGHT)
+}
+
+def prepare_cost(build, iterations: int) -> tuple:
+    """(мкс на вызов, промахов кеша) для сборки выражения и поиска в кеше компиляции"""
+    dialect = asyncpg_dialect()
+    cache = LRUCache(500)
+    misses = 0
+
+    started = time.perf_counter()
+    for i in range(iterations):
+        stmt = build(BENCH_TELEGRAM_ID + i % 100)
+        _, _, cache_hit = stmt._compile_w_cache(dialect, compiled_cache=cache, column_keys=[])
+        misses += cache_hit is not dialect.CACHE_HIT
+    elapsed = time.perf_counter() - started
+
+    return elapsed / iterations * 1e6, misses
+
+async def roundtrip_cost(iterations: int) -> dict:
+    """Мкс на полный SELECT пользователя по telegram_id через сессию"""
+    results = {}
+    try:
+        for name, run in (
+            ("inline", lambda session: session.execute(inline_user(BENCH_TELEGRAM_ID))),
+            ("precompiled", lambda session: session.execute(
+                USER_BY_TELEGRAM_ID, {"telegram_id": BENCH_TELEGRAM_ID}
+            ))
+        ):
+            async with get_session() as session:
+                await run(session)  # прогрев: соединение и подготовленное выражение
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    await run(session)
+                results[name] = (time.perf_counter() - started) / iterations * 1e6
+    finally:
+        await dispose_engines()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--with-db", action="store_true", help="замерить полный запрос (нужна БД)")
+    args = parser.parse_args()
+
+    print(f"{'запрос':>22} {'inline, мкс':>12} {'precompiled, мкс':>17} {'промахи кеша':>13}")
+    for name, (inline, precompiled) in CASES.items():
+        inline_us, _ = prepare_cost(inline, args.iterations)
+        precompiled_us, misses = prepare_cost(precompiled, args.iterations)
+        print(f"{name:>22} {inline_us:>12.1f} {precompiled_us:>17.1f} {misses:>13}")
+
+    if args.with_db:
+        set_database_role("script")
+        results = asyncio.run(roundtrip_cost(args.iterations // 10))
+        print("\nSELECT по telegram_id с БД, мкс на запрос:")
+        for name, us in results.items():
+            print(f"{name:>22} {us:>12.1f}")
+
+if __name__ == "__main__":
+    main()
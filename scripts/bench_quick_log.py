@@ -0,0 +1,102 @@
+"""Бенчмарк быстрой отметки воды при параллельных нажатиях.
+
+Сравнивает атомарное прибавление в БД (CheckInService.add_counters:
+INSERT ... ON CONFLICT DO UPDATE SET water_ml = water_ml + n) с прежним
+read-modify-write в Python. Все нажатия идут от одного пользователя
+в сегодняшний чек-ин. Считаются нажатия в секунду и потерянные обновления.
+Тестовый пользователь создается и удаляется скриптом.
+
+Запуск: python scripts/bench_quick_log.py --taps 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "bot")]
+
+from sqlalchemy import delete, select  # noqa: E402
+
+from core.database import dispose_engines, get_session  # noqa: E402
+from core.models import DailyCheckIn, User  # noqa: E402
+from core.services.checkin_service import CheckInService  # noqa: E402
+from core.services.user_service import UserService  # noqa: E402
+
+BENCH_TELEGRAM_ID = 999999001
+AMOUNT = 250
+
+checkin_service = CheckInService()
+
+async def atomic_tap() -> None:
+    await checkin_service.add_counters(BENCH_TELEGRAM_ID, water_ml=AMOUNT)
+
+async def read_modify_write_tap() -> None:
+    """Прежний подход: прочитать строку, прибавить в Python, записать"""
+    async with get_session() as session:
+        user_id = await session.scalar(select(User.id).where(User.telegram_id == BENCH_TELEGRAM_ID))
+        checkin = await session.scalar(
+            select(DailyCheckIn).where(
+                DailyCheckIn.user_id == user_id,
+                DailyCheckIn.checkin_date == date.today()
+            )
+        )
+        checkin.water_ml = (checkin.water_ml or 0) + AMOUNT
+
+async def reset(user_id: int) -> None:
+    async with get_session() as session:
+        await session.execute(delete(DailyCheckIn).where(DailyCheckIn.user_id == user_id))
+    # Строка для read-modify-write должна существовать заранее
+    await checkin_service.add_counters(BENCH_TELEGRAM_ID, steps=1)
+
+async def run(tap, taps: int, concurrency: int, user_id: int) -> tuple:
+    await reset(user_id)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited():
+        async with semaphore:
+            await tap()
+
+    started = time.perf_counter()
+    await asyncio.gather(*[limited() for _ in range(taps)])
+    elapsed = time.perf_counter() - started
+
+    async with get_session() as session:
+        total = await session.scalar(
+            select(DailyCheckIn.water_ml).where(
+                DailyCheckIn.user_id == user_id,
+                DailyCheckIn.checkin_date == date.today()
+            )
+        )
+
+    lost = taps - (total or 0) // AMOUNT
+    return taps / elapsed, lost
+
+async def main_async(taps: int, concurrency: int) -> None:
+    user = await UserService().get_or_create_user(
+        BENCH_TELEGRAM_ID, first_name="bench"
+    )
+
+    try:
+        print(f"нажатий: {taps}, параллельно: {concurrency}")
+        print(f"{'способ':>20} {'нажатий/с':>10} {'потеряно':>9}")
+        for name, tap in (("read-modify-write", read_modify_write_tap), ("atomic upsert", atomic_tap)):
+            rate, lost = await run(tap, taps, concurrency, user.id)
+            print(f"{name:>20} {rate:>10.0f} {lost:>9}")
+    finally:
+        async with get_session() as session:
+            await session.execute(delete(DailyCheckIn).where(DailyCheckIn.user_id == user.id))
+            await session.execute(delete(User).where(User.id == user.id))
+        await dispose_engines()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--taps", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main_async(args.taps, args.concurrency))
+
+if __name__ == "__main__":
+    main()
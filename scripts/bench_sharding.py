@@ -0,0 +1,123 @@
+"""Бенчмарк шардирования: апдейтов в секунду в зависимости от числа процессов.
+
+Моделирует CPU-часть обработки апдейта (разбор JSON, рендер Markdown
+плана дня) без Telegram, БД и Redis. Апдейты раскладываются по процессам
+тем же способом, что и в bot/sharding.py (crc32 от id чата), и в каждом
+процессе проверяется порядок апдейтов внутри чата.
+
+Запуск: python scripts/bench_sharding.py --updates 50000 --chats 2000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+import zlib
+
+MEAL = {"name": "Куриная грудка с рисом", "calories": 620, "protein": 48, "carbs": 70, "fats": 14}
+
+def render_day(update: dict) -> str:
+    """Аналог show_day_plan: сборка Markdown-текста плана"""
+    text = f"📅 **День {update['day']}**\n\n"
+    for title in ("🌅 **Завтрак**", "☀️ **Обед**", "🌙 **Ужин**"):
+        text += f"{title} ({MEAL['calories']} ккал)\n"
+        text += f"{MEAL['name']}\n"
+        text += f"Б: {MEAL['protein']}г | У: {MEAL['carbs']}г | Ж: {MEAL['fats']}г\n\n"
+    return text
+
+def handle(raw: bytes) -> int:
+    update = json.loads(raw)
+    payload = update["message"]
+    for _ in range(20):
+        render_day(payload)
+    return payload["chat"]["id"]
+
+def shard_worker(queue, results, work_factor: int):
+    last_seq = {}
+    processed = 0
+    errors = 0
+
+    while True:
+        batch = queue.get()
+        if batch is None:
+            break
+        for raw in batch:
+            update = json.loads(raw)
+            chat_id = update["message"]["chat"]["id"]
+            seq = update["message"]["seq"]
+            if last_seq.get(chat_id, -1) >= seq:
+                errors += 1
+            last_seq[chat_id] = seq
+            for _ in range(work_factor):
+                handle(raw)
+            processed += 1
+
+    results.put((processed, errors))
+
+def run(shards: int, updates: list, work_factor: int) -> tuple:
+    context = multiprocessing.get_context("spawn")
+    queues = [context.Queue() for _ in range(shards)]
+    results = context.Queue()
+    processes = [
+        context.Process(target=shard_worker, args=(queues[i], results, work_factor))
+        for i in range(shards)
+    ]
+    for process in processes:
+        process.start()
+
+    started = time.perf_counter()
+    batches = [[] for _ in range(shards)]
+    for chat_id, raw in updates:
+        shard = zlib.crc32(str(chat_id).encode("utf-8")) % shards
+        batches[shard].append(raw)
+        if len(batches[shard]) >= 200:
+            queues[shard].put(batches[shard])
+            batches[shard] = []
+    for shard, batch in enumerate(batches):
+        if batch:
+            queues[shard].put(batch)
+        queues[shard].put(None)
+
+    processed = errors = 0
+    for _ in processes:
+        count, errs = results.get()
+        processed += count
+        errors += errs
+    elapsed = time.perf_counter() - started
+
+    for process in processes:
+        process.join()
+
+    return processed / elapsed, errors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=50000)
+    parser.add_argument("--chats", type=int, default=2000)
+    parser.add_argument("--work", type=int, default=1, help="множитель CPU-нагрузки на апдейт")
+    parser.add_argument("--max-shards", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    seq = {}
+    updates = []
+    for update_id in range(args.updates):
+        chat_id = 100000 + (update_id * 7919) % args.chats
+        seq[chat_id] = seq.get(chat_id, -1) + 1
+        update = {
+            "update_id": update_id,
+            "message": {"chat": {"id": chat_id}, "seq": seq[chat_id], "day": update_id % 7 + 1}
+        }
+        updates.append((chat_id, json.dumps(update).encode("utf-8")))
+
+    shard_counts = sorted({1, 2, 4, 8, 16, args.max_shards} & set(range(1, args.max_shards + 1)))
+    print(f"CPU: {os.cpu_count()}, апдейтов: {args.updates}, чатов: {args.chats}")
+    print(f"{'шардов':>7} {'апдейт/с':>12} {'ускорение':>10} {'нарушений порядка':>18}")
+
+    baseline = None
+    for shards in shard_counts:
+        rate, errors = run(shards, updates, args.work)
+        baseline = baseline or rate
+        print(f"{shards:>7} {rate:>12.0f} {rate / baseline:>9.2f}x {errors:>18}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Бенчмарк холодного старта: время импорта точек входа и инициализации БД.
+
+Каждый модуль импортируется в отдельном процессе (python -X importtime),
+так что замер не зависит от кеша модулей текущего интерпретатора.
+Выводится полное время импорта и самые тяжелые модули.
+
+Запуск: python scripts/bench_startup.py --runs 5 [--with-db]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+ENTRYPOINTS = {
+    "bot": "main",
+    "api": "api.main",
+    "worker": "workers.tasks"
+}
+
+INIT_DB_CODE = """
+import asyncio, time
+from core.database import init_db
+started = time.perf_counter()
+asyncio.run(init_db())
+print(f"init_db: {(time.perf_counter() - started) * 1000:.1f} ms")
+"""
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([str(ROOT), str(ROOT / "bot")])
+    env.setdefault("BOT_TOKEN", "0:bench")
+    return env
+
+def import_profile(module: str) -> tuple:
+    """Полное время импорта (мс) и список (мс, модуль) из -X importtime"""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=_env(),
+        capture_output=True,
+        text=True
+    )
+    elapsed = (time.perf_counter() - started) * 1000
+
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    modules = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):
+            modules.append((int(cumulative) / 1000, name.strip()))
+
+    return elapsed, modules
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="сколько тяжелых модулей показать")
+    parser.add_argument("--with-db", action="store_true", help="замерить init_db (нужна БД)")
+    args = parser.parse_args()
+
+    for name, module in ENTRYPOINTS.items():
+        try:
+            runs = [import_profile(module) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{name:>7}: не импортируется ({e})")
+            continue
+
+        timings = [elapsed for elapsed, _ in runs]
+        print(
+            f"{name:>7}: медиана {statistics.median(timings):.0f} мс, "
+            f"мин {min(timings):.0f} мс ({module})"
+        )
+        for cumulative, top_module in sorted(runs[-1][1], reverse=True)[:args.top]:
+            print(f"{'':>9}{cumulative:>8.1f} мс  {top_module}")
+
+    if args.with_db:
+        result = subprocess.run(
+            [sys.executable, "-c", INIT_DB_CODE],
+            cwd=ROOT,
+            env=_env(),
+            capture_output=True,
+            text=True
+        )
+        print(result.stdout.strip() or result.stderr.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    main()
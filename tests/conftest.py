@@ -0,0 +1,71 @@
+"""Общие настройки тестов.
+
+Модули импортируются так же, как в контейнерах: корень репозитория и bot/
+в sys.path (from config import settings, from utils... import ...).
+"""
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "bot")]
+
+# Обязательные настройки без значений по умолчанию
+os.environ.setdefault("BOT_TOKEN", "123456:test")
+os.environ.setdefault("S3_ACCESS_KEY", "test")
+os.environ.setdefault("S3_SECRET_KEY", "test")
+
+# Тесты с БД идут на отдельную базу со схемой `alembic upgrade head`;
+# каждый тест работает в транзакции, которая откатывается
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ.pop("DATABASE_REPLICA_URL", None)
+    os.environ["DB_ROLE"] = "script"
+
+# .env в корне - для docker-compose, с его собственными переменными:
+# настройки тестов берутся только из окружения
+_cwd = os.getcwd()
+os.chdir(ROOT / "tests")
+try:
+    import config  # noqa: E402,F401
+finally:
+    os.chdir(_cwd)
+
+import pytest  # noqa: E402
+
+@pytest.fixture
+async def db_connection(monkeypatch):
+    """Соединение в откатываемой транзакции; сессии сервисов работают в нем.
+
+    Коммиты сервисов и unit_of_work() фиксируют только SAVEPOINT.
+    Инвалидация кеша сущностей отключена - Redis тестам не нужен.
+    """
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+    from core import database
+    from core.services.entity_cache import EntityCache
+
+    async def no_invalidate(self, *idents):
+        pass
+
+    monkeypatch.setattr(EntityCache, "invalidate", no_invalidate)
+
+    async with database.get_engine().connect() as conn:
+        transaction = await conn.begin()
+        session_maker = async_sessionmaker(
+            bind=conn,
+            class_=AsyncSession,
+            expire_on_commit=False,
+            join_transaction_mode="create_savepoint"
+        )
+        monkeypatch.setattr(database, "get_session_maker", lambda: session_maker)
+        try:
+            yield conn
+        finally:
+            await transaction.rollback()
+
+    await database.dispose_engines()
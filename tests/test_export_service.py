@@ -0,0 +1,27 @@
+from datetime import date, datetime
+
+from core.services.export_service import DATASETS
+
+def test_date_period_covers_partial_days():
+    since, until = DATASETS["checkins"].period_bounds(
+        datetime(2025, 12, 31, 18, 0),
+        datetime(2026, 1, 1, 12, 0)
+    )
+
+    assert (since, until) == (date(2025, 12, 31), date(2026, 1, 2))
+
+def test_date_period_end_is_exclusive():
+    since, until = DATASETS["checkins"].period_bounds(
+        datetime(2026, 1, 1),
+        datetime(2026, 1, 8)
+    )
+
+    assert (since, until) == (date(2026, 1, 1), date(2026, 1, 8))
+
+def test_open_date_period():
+    assert DATASETS["checkins"].period_bounds(None, None) == (None, None)
+
+def test_datetime_period_is_unchanged():
+    since, until = datetime(2026, 1, 1, 6, 30), datetime(2026, 1, 1, 12, 0)
+
+    assert DATASETS["payments"].period_bounds(since, until) == (since, until)
@@ -0,0 +1,73 @@
+import pytest
+
+from utils.ingredients import (
+    CATEGORY_ORDER,
+    OTHER_CATEGORY,
+    categorize_ingredient,
+    categorize_shopping_list
+)
+
+@pytest.mark.parametrize("name, category", [
+    # Падежи и числа
+    ("Помидоры", "Овощи"),
+    ("помидоров", "Овощи"),
+    ("Огурцы свежие", "Овощи"),
+    ("Куриная грудка", "Мясо/Рыба"),
+    ("филе куриное", "Мясо/Рыба"),
+    ("Творога 5%", "Молочные"),
+    ("Яйца", "Молочные"),
+    ("яиц", "Молочные"),
+    ("Гречки", "Крупы"),
+    ("Овсяные хлопья", "Крупы"),
+    ("Яблоки", "Фрукты"),
+    ("Свёкла", "Овощи"),
+    ("свекла отварная", "Овощи"),
+    ("Грецкие орехи", "Орехи/Сухофрукты"),
+    # Основы, которые легко спутать
+    ("Курага", "Орехи/Сухофрукты"),
+    ("Масло сливочное", "Молочные"),
+    ("Оливковое масло", "Бакалея"),
+    ("Печенье овсяное", "Бакалея"),
+    ("Печень говяжья", "Мясо/Рыба")
+])
+def test_inflected_forms(name, category):
+    assert categorize_ingredient(name) == category
+
+@pytest.mark.parametrize("name", ["Тофу", "Вода минеральная", "xyz", ""])
+def test_unknown_items_go_to_other(name):
+    assert categorize_ingredient(name) == OTHER_CATEGORY
+
+def test_weekly_list_in_one_pass():
+    shopping_list = {
+        "Куриное филе": "1.2 кг",
+        "Лосось": "400 г",
+        "Творог 5%": "800 г",
+        "Кефир": "2 л",
+        "Яйца": "20 шт",
+        "Брокколи": "600 г",
+        "Помидоры черри": "500 г",
+        "Морковь": "1 кг",
+        "Бананы": "1 кг",
+        "Ягоды замороженные": "300 г",
+        "Гречка": "500 г",
+        "Рис бурый": "500 г",
+        "Овсяные хлопья": "400 г",
+        "Миндаль": "200 г",
+        "Оливковое масло": "250 мл",
+        "Мед": "100 г",
+        "Тофу": "300 г"
+    }
+    categorize_ingredient.cache_clear()
+
+    categorized = categorize_shopping_list(shopping_list)
+
+    # Каждый продукт категоризуется один раз
+    info = categorize_ingredient.cache_info()
+    assert info.misses == len(shopping_list)
+    assert info.hits == 0
+
+    assert list(categorized) == CATEGORY_ORDER
+    lines = [line for items in categorized.values() for line in items]
+    assert sorted(lines) == sorted(f"• {item}: {amount}" for item, amount in shopping_list.items())
+    assert "• Тофу: 300 г" in categorized[OTHER_CATEGORY]
+    assert "• Лосось: 400 г" in categorized["Мясо/Рыба"]
@@ -0,0 +1,138 @@
+"""Планы горячих запросов: тест падает, если запрос читает таблицу Seq Scan.
+
+Запросы повторяют запросы сервисов и воркеров. Для каждого выполняется
+EXPLAIN (FORMAT JSON) на синтетических данных в откатываемой транзакции.
+Для партиционированных таблиц проверяется и отсечение партиций: запрос
+не должен читать больше партиций, чем покрывает его диапазон дат.
+
+Планировщику запрещен Seq Scan (enable_seqscan = off): на маленьких
+таблицах он всегда дешевле, а проверяем мы, что для запроса есть
+подходящий индекс.
+"""
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import select, text
+
+from core.models import DailyCheckIn, MealPlan, User, UserStatus, WeightLog, WorkoutPlan
+
+SEED_TELEGRAM_ID = 900000000
+SEED_USERS = 300
+SEED_DAYS = 90
+
+SEED_SQL = [
+    """
+    INSERT INTO users (telegram_id, first_name, status, subscription_end, created_at)
+    SELECT :base + g, 'seed',
+           (CASE WHEN g % 3 = 0 THEN 'ACTIVE' ELSE 'TRIAL' END)::userstatus,
+           now() + (g % 60) * interval '1 day', now()
+    FROM generate_series(1, :users) g
+    """,
+    """
+    INSERT INTO daily_checkins (user_id, checkin_date, date, water_ml, steps)
+    SELECT u.id, (now() - d * interval '1 day')::date, now() - d * interval '1 day', 0, 0
+    FROM users u, generate_series(0, :days - 1) d
+    WHERE u.telegram_id > :base
+    """,
+    """
+    INSERT INTO weight_logs (user_id, weight, date)
+    SELECT u.id, 70 + random() * 10, now() - d * interval '1 day'
+    FROM users u, generate_series(0, :days - 1, 3) d
+    WHERE u.telegram_id > :base
+    """,
+    """
+    INSERT INTO meal_plans (user_id, week_number, day_number, total_calories, is_active, created_at)
+    SELECT u.id, w, d, 2000, w = 1, now()
+    FROM users u, generate_series(1, 4) w, generate_series(1, 7) d
+    WHERE u.telegram_id > :base
+    """,
+    """
+    INSERT INTO workout_plans (user_id, scheduled_date, workout_type, completed, completed_at, created_at)
+    SELECT u.id, (now() - d * interval '1 day')::date, 'strength', true, now() - d * interval '1 day', now()
+    FROM users u, generate_series(0, :days - 1, 2) d
+    WHERE u.telegram_id > :base
+    """
+]
+
+def hot_queries(user_id: int) -> dict:
+    """Горячие запросы: {название: (таблица, запрос, максимум партиций)}"""
+    today = date.today()
+    now = datetime.utcnow()
+
+    return {
+        # CheckInService: чек-ин за сегодня
+        "checkin_today": ("daily_checkins", select(DailyCheckIn).where(
+            DailyCheckIn.user_id == user_id,
+            DailyCheckIn.checkin_date == today
+        ), 1),
+        # Еженедельный отчет: последние записи веса
+        "weight_history": ("weight_logs", select(WeightLog).where(
+            WeightLog.user_id == user_id,
+            WeightLog.date >= now - timedelta(days=30)
+        ).order_by(WeightLog.date.desc()).limit(7), 2),
+        # UserService.get_meal_plans
+        "meal_plans": ("meal_plans", select(MealPlan).where(
+            MealPlan.user_id == user_id,
+            MealPlan.is_active == True,
+            MealPlan.week_number == 1
+        ).order_by(MealPlan.day_number), None),
+        # WorkoutService.get_workout_for_date: выполнение или отклонение за день
+        "today_workout": ("workout_plans", select(WorkoutPlan).where(
+            WorkoutPlan.user_id == user_id,
+            WorkoutPlan.scheduled_date == today
+        ), None),
+        # WorkoutService.get_workout_history
+        "workout_history": ("workout_plans", select(WorkoutPlan).where(
+            WorkoutPlan.user_id == user_id
+        ).order_by(WorkoutPlan.scheduled_date.desc()).limit(10), None),
+        # Напоминания об окончании подписки
+        "expiring_subscriptions": ("users", select(User).where(
+            User.status == UserStatus.ACTIVE,
+            User.subscription_end <= now + timedelta(days=3),
+            User.subscription_end > now
+        ), None)
+    }
+
+def scanned_relations(plan: dict, table: str) -> list:
+    """(тип узла, relation) для всех чтений таблицы и ее партиций table_*"""
+    found = []
+    relation = plan.get("Relation Name", "")
+    if relation == table or relation.startswith(f"{table}_"):
+        found.append((plan["Node Type"], relation))
+    for child in plan.get("Plans", []):
+        found.extend(scanned_relations(child, table))
+    return found
+
+@pytest.fixture
+async def seeded(db_connection):
+    """Синтетические данные в транзакции теста; id последнего пользователя"""
+    for sql in SEED_SQL:
+        await db_connection.execute(
+            text(sql),
+            {"base": SEED_TELEGRAM_ID, "users": SEED_USERS, "days": SEED_DAYS}
+        )
+    await db_connection.execute(text("ANALYZE"))
+    await db_connection.execute(text("SET LOCAL enable_seqscan = off"))
+
+    return (await db_connection.execute(
+        select(User.id).order_by(User.id.desc()).limit(1)
+    )).scalar_one()
+
+@pytest.mark.parametrize("name", list(hot_queries(0)))
+async def test_hot_query_uses_index(db_connection, seeded, name):
+    table, query, max_partitions = hot_queries(seeded)[name]
+
+    sql = query.compile(dialect=db_connection.dialect, compile_kwargs={"literal_binds": True})
+    plan = (await db_connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))).scalar()
+    plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+
+    relations = scanned_relations(plan, table)
+    seq_scans = [relation for node, relation in relations if node == "Seq Scan"]
+    assert not seq_scans, f"Seq Scan on {', '.join(seq_scans)}"
+
+    if max_partitions is not None:
+        # DEFAULT-партиция пуста, пока партиции создаются заранее, но
+        # не отсекается для открытых диапазонов (date >= ...)
+        partitions = {relation for _, relation in relations if not relation.endswith("_default")}
+        assert len(partitions) <= max_partitions, f"Reads partitions: {', '.join(sorted(partitions))}"
@@ -0,0 +1,54 @@
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core import database
+
+metadata = MetaData()
+items = Table("items", metadata, Column("id", Integer, primary_key=True), Column("value", Integer))
+
+def make_session() -> Session:
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    return Session(engine)
+
+def test_core_dml_marks_writes():
+    for statement in (
+        insert(items).values(id=1, value=1),
+        insert(items).values(id=1, value=1).returning(items.c.id),
+        update(items).where(items.c.id == 1).values(value=2).returning(items.c.value)
+    ):
+        with make_session() as session:
+            session.execute(statement)
+            assert session.info.get("has_writes")
+
+def test_reads_do_not_mark_writes():
+    with make_session() as session:
+        session.execute(select(items))
+        session.execute(text("SELECT 1"))
+        assert not session.info.get("has_writes")
+
+async def test_replica_read_is_retried_on_primary(monkeypatch):
+    async def connection_reset(self, *args, **kwargs):
+        raise OSError("connection reset")
+
+    class Primary:
+        closed = False
+
+        async def execute(self, *args, **kwargs):
+            return "primary"
+
+        async def close(self):
+            self.closed = True
+
+    primary = Primary()
+    monkeypatch.setattr(AsyncSession, "execute", connection_reset)
+    monkeypatch.setattr(database, "get_session_maker", lambda: lambda: primary)
+    monkeypatch.setattr(database.replica_router, "check_interval", 60)
+
+    session = database.ReplicaSession()
+    assert await session.execute(select(items)) == "primary"
+    assert await database.replica_router.is_usable() is False
+
+    await session.close()
+    assert primary.closed
@@ -0,0 +1,21 @@
+import json
+
+from sharding import _decode_entry, shard_for
+
+def test_decode_entry():
+    update = {"update_id": 1, "message": {"chat": {"id": 42}}}
+
+    assert _decode_entry({b"update": json.dumps(update).encode()}) == update
+
+def test_decode_trimmed_or_broken_entries():
+    # Запись из PEL, удаленная обрезкой Stream, приходит без полей
+    assert _decode_entry(None) is None
+    assert _decode_entry({}) is None
+    assert _decode_entry({b"update": b"{not json"}) is None
+    assert _decode_entry({b"update": b"[1, 2]"}) is None
+
+def test_chat_updates_go_to_one_shard():
+    message = {"update_id": 1, "message": {"chat": {"id": 42}, "from": {"id": 42}}}
+    callback = {"update_id": 2, "callback_query": {"from": {"id": 42}, "message": {"chat": {"id": 42}}}}
+
+    assert shard_for(message, 4) == shard_for(callback, 4)
@@ -0,0 +1,21 @@
+import pytest
+
+from core.models import WorkoutPlan
+from core.workout_library import WorkoutLibrary, workout_library
+
+def test_reads_before_load_raise():
+    library = WorkoutLibrary()
+
+    with pytest.raises(RuntimeError):
+        library.get(1)
+    with pytest.raises(RuntimeError):
+        library.find("strength", "beginner")
+    with pytest.raises(RuntimeError):
+        library.exercises(1)
+
+def test_plan_exercises_require_loaded_library():
+    if workout_library.loaded:
+        pytest.skip("library is already loaded in this process")
+
+    with pytest.raises(RuntimeError):
+        WorkoutPlan(template_id=1).exercises
@@ -0,0 +1,133 @@
+"""Каждая запись сервиса - один запрос к БД (INSERT/UPDATE ... RETURNING)"""
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from core.database import unit_of_work
+from core.models import ActivityLevel, Goal, WorkoutPlan
+from core.services.payment_service import PaymentService
+from core.services.user_service import UserService
+from core.services.workout_service import WorkoutService
+from core.workout_library import workout_library
+
+TELEGRAM_ID = 2000000001
+
+user_service = UserService()
+payment_service = PaymentService()
+workout_service = WorkoutService()
+
+_SAVEPOINT_PREFIXES = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+@pytest.fixture
+def statements(db_connection):
+    """Выполненные запросы (без SAVEPOINT тестовой транзакции)"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(_SAVEPOINT_PREFIXES):
+            executed.append(statement)
+
+    engine = db_connection.sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+@pytest.fixture
+async def user(db_connection):
+    async with unit_of_work():
+        return await user_service.get_or_create_user(TELEGRAM_ID, first_name="Test")
+
+async def test_get_or_create_user(db_connection, statements):
+    async with unit_of_work():
+        created = await user_service.get_or_create_user(TELEGRAM_ID, first_name="Test")
+        assert len(statements) == 1
+
+        statements.clear()
+        existing = await user_service.get_or_create_user(TELEGRAM_ID, first_name="Test")
+        assert len(statements) == 1
+
+    assert existing.id == created.id
+
+async def test_update_user(user, statements):
+    async with unit_of_work():
+        updated = await user_service.update_user_profile(TELEGRAM_ID, age=30, height=180.0)
+        assert len(statements) == 1
+
+    assert updated.age == 30
+    assert updated.height == 180.0
+
+async def test_log_weight(user, statements):
+    async with unit_of_work():
+        weight_log = await user_service.log_weight(TELEGRAM_ID, 72.5)
+        assert len(statements) == 1
+
+    assert weight_log.user_id == user.id
+    assert weight_log.weight == 72.5
+
+async def test_payment_writes(user, statements):
+    async with unit_of_work():
+        payment = await payment_service.create_payment(
+            user_id=user.id,
+            amount=129000,
+            currency="RUB",
+            subscription_type="monthly",
+            provider="yukassa",
+            provider_payment_id="test-payment"
+        )
+        assert len(statements) == 1
+
+        statements.clear()
+        updated = await payment_service.update_payment_status("test-payment", "succeeded")
+        assert len(statements) == 1
+
+    assert updated.id == payment.id
+    assert updated.paid_at is not None
+
+async def test_mark_workout_completed(user, statements):
+    # Понедельник - тренировочный день при любом уровне активности
+    monday = date.today() - timedelta(days=date.today().weekday())
+    async with unit_of_work():
+        user = await user_service.update_user_profile(
+            TELEGRAM_ID,
+            activity_level=ActivityLevel.MODERATE,
+            goal=Goal.MAINTAIN,
+            program_start=monday
+        )
+    await workout_library.load()
+
+    statements.clear()
+    async with unit_of_work():
+        workout = await workout_service.mark_workout_completed(user, monday)
+        assert len(statements) == 1
+
+    assert workout.completed
+    assert workout.scheduled_date == monday
+
+async def test_mark_stored_workout_on_rest_day(user, statements):
+    # Воскресенье - день отдыха при любом уровне активности
+    monday = date.today() - timedelta(days=date.today().weekday())
+    sunday = monday + timedelta(days=6)
+    async with unit_of_work():
+        user = await user_service.update_user_profile(
+            TELEGRAM_ID,
+            activity_level=ActivityLevel.MODERATE,
+            goal=Goal.MAINTAIN,
+            program_start=monday
+        )
+    await workout_library.load()
+
+    async with unit_of_work():
+        with pytest.raises(ValueError):
+            await workout_service.mark_workout_completed(user, sunday)
+
+    # Запись дня сохранена раньше (до смены расписания)
+    async with unit_of_work() as session:
+        session.add(WorkoutPlan(user_id=user.id, scheduled_date=sunday, workout_type="cardio"))
+
+    statements.clear()
+    async with unit_of_work():
+        workout = await workout_service.mark_workout_completed(user, sunday)
+        assert len(statements) == 1
+
+    assert workout.completed
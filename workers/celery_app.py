@@ -1,6 +1,33 @@
+import logging
+
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_init, worker_process_shutdown
+from prometheus_client import start_http_server
+
 from config import settings
+from core.database import set_database_role
+from core.metrics import mark_process_dead, metrics_registry, multiprocess_enabled
+
+logger = logging.getLogger(__name__)
+
+# Пул без удержания соединений: asyncio.run на задачу, prefork-процессы
+set_database_role("worker")
+
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    """/metrics воркера в главном процессе: prefork-дочерние пишут в PROMETHEUS_MULTIPROC_DIR"""
+    if settings.WORKER_METRICS_PORT is None:
+        return
+
+    if not multiprocess_enabled():
+        logger.warning("PROMETHEUS_MULTIPROC_DIR is not set, metrics of pool processes are not exported")
+
+    start_http_server(settings.WORKER_METRICS_PORT, registry=metrics_registry())
+
+@worker_process_shutdown.connect
+def forget_process_metrics(pid=None, **kwargs):
+    mark_process_dead(pid)
 
 # Создание Celery приложения
 celery_app = Celery(
@@ -59,4 +86,16 @@ celery_app.conf.beat_schedule = {
         'task': 'workers.tasks.analyze_user_progress',
         'schedule': crontab(hour=23, minute=0),
     },
+    
+    # Партиции чек-инов и веса на следующие месяцы (ежедневно в 04:00)
+    'maintain-partitions': {
+        'task': 'workers.tasks.maintain_partitions',
+        'schedule': crontab(hour=4, minute=0),
+    },
+    
+    # Пул советов после тренировки (ежедневно в 03:00)
+    'refresh-workout-advice-pool': {
+        'task': 'workers.tasks.refresh_workout_advice_pool',
+        'schedule': crontab(hour=3, minute=0),
+    },
 }
\ No newline at end of file
@@ -1,18 +1,27 @@
 from celery import shared_task
 from typing import Dict, Any, List
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import asyncio
 from aiogram import Bot
 
-from core.database import get_session
+from core.database import get_engine, get_session
+from core.partitions import add_months, detach_partitions, ensure_partitions, month_start
 from core.models import User, MealPlan, DailyCheckIn, WeightLog
 from core.services.nutrition_service import NutritionService
+from core.services.dish_service import DishService
+from core.services.entity_cache import active_meal_plans_cache, user_cache
+from core.workout_library import workout_library
+from core.workout_schedule import scheduled_workout
 from core.services.notification_service import NotificationService
+from core.services.advice_service import AdviceService
+from utils.ai_helpers import generate_workout_advice, WORKOUT_ADVICE_FALLBACK
 from config import settings
 
 # Инициализация сервисов
 nutrition_service = NutritionService()
+dish_service = DishService()
 notification_service = NotificationService()
+advice_service = AdviceService()
 
 @shared_task
 def generate_meal_plan_task(user_id: int):
@@ -44,25 +53,34 @@ async def _generate_meal_plan(user_id: int):
         # Генерируем план на неделю
         meal_plans = await nutrition_service.generate_meal_plan(user_data, days=7)
         
+        # Блюда недели - в каталог одним проходом, в плане только ссылки и порции
+        dishes = iter(await dish_service.resolve_meals(
+            [meal for plan in meal_plans for meal in plan["meals"]]
+        ))
+        
         # Сохраняем в БД
         for plan in meal_plans:
+            meals = {}
+            for meal in plan["meals"]:
+                dish_id, portion = next(dishes)
+                meals[f"{meal['type']}_dish_id"] = dish_id
+                meals[f"{meal['type']}_portion"] = portion
+            
             meal_plan = MealPlan(
                 user_id=user_id,
                 week_number=1,  # Номер недели
                 day_number=plan["day"],
-                breakfast=plan["meals"][0],
-                lunch=plan["meals"][1],
-                dinner=plan["meals"][2],
-                snack=plan["meals"][3] if len(plan["meals"]) > 3 else None,
+                **meals,
                 total_calories=plan["total_calories"],
                 total_protein=plan["total_protein"],
                 total_carbs=plan["total_carbs"],
                 total_fats=plan["total_fats"],
-                shopping_list=self._generate_shopping_list(plan["meals"])
+                shopping_list=_generate_shopping_list(plan["meals"])
             )
             session.add(meal_plan)
         
         await session.commit()
+        await active_meal_plans_cache.invalidate(user_id)
         
         # Отправляем уведомление пользователю
         bot = Bot(token=settings.BOT_TOKEN)
@@ -134,8 +152,9 @@ def send_workout_reminder():
 async def _send_workout_reminders():
     """Асинхронная отправка напоминаний о тренировке"""
     async with get_session() as session:
-        # Получаем пользователей с тренировкой сегодня
-        today = datetime.now().weekday() + 1  # 1-7
+        # Расписание считается в памяти, библиотека шаблонов - один запрос на процесс
+        today = date.today()
+        await workout_library.load()
         
         users = await session.execute(
             select(User).where(
@@ -148,7 +167,7 @@ async def _send_workout_reminders():
         
         for user in users:
             # Проверяем, есть ли тренировка сегодня
-            if today in [1, 3, 5]:  # Пн, Ср, Пт
+            if scheduled_workout(user, today) is not None:
                 try:
                     await bot.send_message(
                         user.telegram_id,
@@ -185,7 +204,7 @@ async def _send_evening_reminders():
             today_checkin = await session.execute(
                 select(DailyCheckIn).where(
                     DailyCheckIn.user_id == user.id,
-                    DailyCheckIn.date >= datetime.now().date()
+                    DailyCheckIn.checkin_date == datetime.now().date()
                 )
             )
             
@@ -272,10 +291,11 @@ async def _analyze_progress(user_id: int = None):
             if not user:
                 continue
             
-            # Получаем последние 7 дней взвешиваний
+            # Получаем последние 7 взвешиваний за месяц (нижняя граница отсекает старые партиции)
             weight_logs = await session.execute(
                 select(WeightLog).where(
-                    WeightLog.user_id == user.id
+                    WeightLog.user_id == user.id,
+                    WeightLog.date >= datetime.utcnow() - timedelta(days=30)
                 ).order_by(WeightLog.date.desc()).limit(7)
             )
             weight_logs = weight_logs.scalars().all()
@@ -308,6 +328,7 @@ async def _analyze_progress(user_id: int = None):
                 
                 if message:
                     await session.commit()
+                    await user_cache.invalidate(user.telegram_id)
                     
                     try:
                         await bot.send_message(user.telegram_id, message)
@@ -336,4 +357,49 @@ async def _generate_weekly_plans():
             # Запускаем генерацию для каждого пользователя
             generate_meal_plan_task.delay(user.id)
     
-    return {"generated_for": len(users)}
\ No newline at end of file
+    return {"generated_for": len(users)}
+
+@shared_task
+def refresh_workout_advice_pool(bucket: List[str] = None):
+    """Генерация пула советов по тренировкам (все бакеты или один)"""
+    refreshed = asyncio.run(_refresh_workout_advice_pool(bucket))
+    return {"status": "success", "type": "workout_advice_pool", "buckets": refreshed}
+
+async def _refresh_workout_advice_pool(bucket: List[str] = None) -> int:
+    """Асинхронная генерация вариантов советов по бакетам"""
+    buckets = [tuple(bucket)] if bucket else advice_service.all_buckets()
+    refreshed = 0
+    
+    for current_bucket in buckets:
+        user_data = advice_service.bucket_user_data(current_bucket)
+        
+        variants = await asyncio.gather(*[
+            generate_workout_advice(user_data)
+            for _ in range(settings.WORKOUT_ADVICE_POOL_SIZE)
+        ])
+        
+        # Заглушку при ошибке модели в пул не кладем
+        variants = [v for v in variants if v != WORKOUT_ADVICE_FALLBACK]
+        
+        if await advice_service.replace_pool(current_bucket, variants):
+            refreshed += 1
+    
+    return refreshed
+
+
+@shared_task
+def maintain_partitions():
+    """Создание будущих партиций чек-инов и веса, отсоединение старых"""
+    detached = asyncio.run(_maintain_partitions())
+    return {"status": "success", "type": "partitions", "detached": detached}
+
+async def _maintain_partitions() -> List[str]:
+    """Асинхронное обслуживание партиций"""
+    async with get_engine().begin() as conn:
+        await ensure_partitions(conn, settings.PARTITION_MONTHS_AHEAD)
+        
+        if not settings.PARTITION_RETENTION_MONTHS:
+            return []
+        
+        cutoff = add_months(month_start(date.today()), -settings.PARTITION_RETENTION_MONTHS)
+        return await detach_partitions(conn, cutoff)